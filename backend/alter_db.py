@@ -1,3 +1,4 @@
+# Superseded by migrations/0001_base_schema.up.sql (`python migrate.py up`), which makes the same changes.
 import os
 from dotenv import load_dotenv
 import psycopg2
@@ -1,40 +1,414 @@
+import base64
+import contextvars
+import json
+import logging
 import os
+import shutil
+import tempfile
+import threading
+import time
 import uuid
-from flask import Flask, request, session, jsonify
+from flask import Flask, request, session, jsonify, send_from_directory, g
 from flask_cors import CORS
 from dotenv import load_dotenv
 # import psycopg2 (Removed - switching to Supabase Client for HTTP compatibility)
 # import psycopg2.extras
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import timedelta, datetime
-from supabase import create_client, Client
+from datetime import date, timedelta, datetime
+from concurrent.futures import ThreadPoolExecutor
+from supabase import Client
+from search_index import PropertySearchIndex, DEFAULT_FIELDS, PROPERTY_FIELDS
+from availability import RoomAvailabilityIndex, OccupancySnapshotCache
+from occupancy import OccupancyBitmap
+from cache import create_cache, MISS
+from supabase_pool import SupabasePool, ThreadLocalClient
+from storage import SupabaseStorage, LocalStorage
+from images import CONTENT_TYPES, make_variants, variant_names
+from uploads import UploadSpool, UploadRejected, check_declared, spool_stream
+from auth import AuthManager, OwnerMap, TokenVerifier, create_revocations
+from jobs import JobQueue, PermanentJobError
+from profiling import RequestProfiler
+from responses import Compression, ConditionalGet, FastJSONProvider, RawJSON, VersionStamps, json_passthrough, skip_etag
+from bulk import BulkError, parse_rows, validate_room, validate_amenity, chunks
+from repository import SupabaseRepository, RepositoryError
+from sql_repository import SQLiteRepository
+from pg_repository import PostgresRepository, conninfo_from_env
+
+log = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY")
+if not app.secret_key:
+    # It signs the session cookie and the bearer tokens; an empty key lets anyone forge either
+    raise RuntimeError("SECRET_KEY is not set. Set it to a long random value (see .env.example).")
 app.permanent_session_lifetime = timedelta(minutes=60)
+# jsonify()/get_json() on orjson or msgspec when installed (see responses.py)
+app.json = FastJSONProvider(app, os.getenv("JSON_ENCODER", "auto"))
 
 CORS(app, supports_credentials=True, origins=["http://localhost:3000"])
 
 # ==============================
-# SUPABASE CLIENT (for Storage)
+# SUPABASE CLIENTS (pooled, see supabase_pool.py)
 # ==============================
-supabase: Client = create_client(
+# Every thread gets its own lightweight Client; all of them share one keep-alive
+# HTTP/2 connection pool. Auth calls use supabase_pool.auth_client() so a user's
+# session never ends up on the clients that serve data queries.
+supabase_pool = SupabasePool(
     os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_KEY")
+    os.getenv("SUPABASE_KEY"),
+    max_connections=int(os.getenv("SUPABASE_POOL_SIZE", 50)),
+    max_keepalive=int(os.getenv("SUPABASE_POOL_KEEPALIVE", 20)),
+    connect_timeout=float(os.getenv("SUPABASE_CONNECT_TIMEOUT", 5)),
+    read_timeout=float(os.getenv("SUPABASE_READ_TIMEOUT", 15))
 )
+supabase: Client = ThreadLocalClient(supabase_pool)
+
+# ==============================
+# DATA ACCESS (see repository.py)
+# ==============================
+# Every table/RPC call goes through `repo`. DATA_BACKEND=postgres queries the database over
+# a pooled direct connection instead of PostgREST; DATA_BACKEND=sqlite runs the data layer on
+# a local file (benchmark.py, offline development). Auth and Storage still use Supabase.
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase")
+if DATA_BACKEND == "postgres":
+    repo = PostgresRepository(
+        conninfo_from_env(),
+        min_size=int(os.getenv("PG_POOL_MIN", 1)),
+        max_size=int(os.getenv("PG_POOL_MAX", 10)),
+        timeout=float(os.getenv("PG_POOL_TIMEOUT", 10)),
+        prepare=os.getenv("PG_PREPARE", "1") == "1",
+        prepare_threshold=int(os.getenv("PG_PREPARE_THRESHOLD", 5)),
+        binary=os.getenv("PG_BINARY", "1") == "1"
+    )
+elif DATA_BACKEND == "sqlite":
+    repo = SQLiteRepository(os.getenv("SQLITE_PATH", os.path.join("data", "stayngo.sqlite3")))
+else:
+    # The raw HTTP client lets the *_json reads forward PostgREST's body without decoding it
+    repo = SupabaseRepository(supabase, http=supabase_pool.http, url=os.getenv("SUPABASE_URL"),
+                              key=os.getenv("SUPABASE_KEY"))
+
+# ==============================
+# REQUEST METRICS / PROFILING (see profiling.py; exposed on /metrics)
+# ==============================
+profiler = RequestProfiler(
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0)),
+    slow_ms=float(os.getenv("PROFILE_SLOW_MS", 500)),
+    profile_dir=os.getenv("PROFILE_DIR", "profiles"),
+    engine=os.getenv("PROFILER", "cprofile"),
+    metrics_dir=os.getenv("METRICS_DIR") or None
+)
+profiler.init_app(app)
+supabase_pool.transport.add_listener(profiler.on_upstream)
+if DATA_BACKEND != "supabase":
+    repo.add_listener(profiler.on_query)
+
+# ==============================
+# RESPONSE COMPRESSION (see responses.py; after the profiler so it is timed)
+# ==============================
+compression = Compression(
+    min_bytes=int(os.getenv("COMPRESS_MIN_BYTES", 1024)),
+    gzip_level=int(os.getenv("GZIP_LEVEL", 6)),
+    brotli_quality=int(os.getenv("BROTLI_QUALITY", 5)),
+    registry=profiler.registry
+)
+compression.init_app(app)
 
 STORAGE_BUCKET = "property-images"
 
+# Largest accepted image; Flask rejects bigger request bodies (413) before anything is read
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", 20)) * 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 64 * 1024  # + multipart framing
+
+# Reviews embedded per room on the property detail page; the rest are paged via /api/room_reviews
+REVIEWS_PER_ROOM = int(os.getenv("REVIEWS_PER_ROOM", 5))
+MAX_REVIEWS_PAGE = 50
+MAX_BOOKINGS_PAGE = 100
+
+# ==============================
+# CONCURRENT UPSTREAM CALLS
+# ==============================
+# Threads become greenlets under the gevent workers (SERVER_MODE=async), so this works in both modes.
+io_pool = ThreadPoolExecutor(max_workers=int(os.getenv("IO_POOL_SIZE", 16)), thread_name_prefix="supabase-io")
+
+
+def run_concurrently(*calls):
+    """Runs independent upstream calls in parallel and returns their results in order."""
+    # Each call runs in a copy of the caller's context so its upstream calls count toward the request trace
+    futures = [io_pool.submit(contextvars.copy_context().run, call) for call in calls]
+    return [future.result() for future in futures]
+
+
+# ==============================
+# BACKGROUND JOB QUEUE (see jobs.py; handlers are registered in JOB_HANDLERS below)
+# ==============================
+# Requests only make the minimum synchronous write and enqueue the rest. Jobs are run by the
+# worker processes that gunicorn.conf.py starts (JOB_WORKERS) or by `python jobs_worker.py`.
+job_queue = JobQueue(
+    os.getenv("JOB_QUEUE_PATH", os.path.join("data", "jobs.sqlite3")),
+    retry_base_seconds=float(os.getenv("JOB_RETRY_BASE_SECONDS", 5)),
+    retry_max_seconds=float(os.getenv("JOB_RETRY_MAX_SECONDS", 3600))
+)
+
+
+# ==============================
+# PAGINATION CURSORS
+# ==============================
+def make_cursor(**values):
+    """Opaque keyset cursor, e.g. make_cursor(t=created_at, id=review_id)."""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def iso_date(value):
+    return date.fromisoformat(value).isoformat()
+
+
+def iso_timestamp(value):
+    datetime.fromisoformat(value)  # the database compares the original text
+    return value
+
+
+def cursor_id(value):
+    if type(value) is not int:
+        raise ValueError(f"Not a row id: {value!r}")
+    return value
+
+
+def read_cursor(cursor, **fields):
+    """
+    Decodes a make_cursor() cursor. Cursors come back from the client, so every key in
+    `fields` must be present and pass its check, e.g. read_cursor(c, d=iso_date, id=cursor_id).
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, dict) or set(values) != set(fields):
+            raise ValueError
+        return {key: check(values[key]) for key, check in fields.items()}
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+# ==============================
+# READ-THROUGH CACHE (see cache.py for cross-worker semantics)
+# ==============================
+cache = create_cache()
+
+# ETag version tokens live next to the data they describe (see responses.py)
+stamps = VersionStamps(cache, ttl=int(os.getenv("VERSION_STAMP_TTL_SECONDS", 3600)))
+http_cache = ConditionalGet(
+    identity=lambda: f"{g.principal.user_id}:{g.principal.role}" if g.get("principal") else None,
+    registry=profiler.registry
+)
+
+
+def invalidate_property(property_id, room_ids=()):
+    """Drops every cached read that depends on a property; called from each Admin/Guest write."""
+    if property_id is None:
+        return
+    cache.delete(
+        f"property:{property_id}:details",
+        f"property:{property_id}:rooms",
+        f"property:{property_id}:rooms.json",
+        f"property:{property_id}:amenities.json",
+        stamps.key(f"property:{property_id}"),
+        *[f"room:{room_id}" for room_id in room_ids]
+    )
+
+
+def owner_version():
+    """ETag stamp for the owner's property list; it is not read through the cache, so only when shared."""
+    return stamps.get(f"owner:{g.principal.user_id}") if stamps.shared else None
+
+
+# ==============================
+# AUTH (request principal + ownership, see auth.py)
+# ==============================
+owners = OwnerMap(repo.property_owner, repo.room_property, repo.amenity_property)
+
+
+def require_row(row):
+    """Raises for a missing row so it is never cached and the route's fallback applies."""
+    if row is None:
+        raise LookupError("Row not found")
+    return row
+
+
+auth_manager = AuthManager(
+    TokenVerifier(
+        app.secret_key,
+        max_age=int(app.permanent_session_lifetime.total_seconds()),
+        revocations=create_revocations(cache),
+        cache_seconds=int(os.getenv("AUTH_TOKEN_CACHE_SECONDS", 60))
+    ),
+    owners,
+    # Admin/Guest are defined further down; the factory only runs inside requests
+    actor_factory=lambda p: (Admin if p.role == 'admin' else Guest)(p.user_id, p.name, None, p.role),
+    mode=os.getenv("AUTH_MODE", "session")
+)
+require_role = auth_manager.require_role
+
+
+# ==============================
+# LOGIN PROFILES (auth_id + role -> USERS row)
+# ==============================
+# Registration writes the caller's USERS rows into the Supabase auth user's app_metadata
+# and the cache, so login reads the profile from the sign-in response (JWT claims) and
+# skips the USERS round trip. The cache, then the table, are only fallbacks.
+PROFILE_CLAIM = "stayngo_profiles"
+PROFILE_CACHE_SECONDS = int(os.getenv("PROFILE_CACHE_SECONDS", 7 * 24 * 3600))
+
+
+def remember_profile(auth_id, row):
+    profile = {"user_id": row['user_id'], "name": row['name'], "role": row['role']}
+    cache.set(f"auth_user:{auth_id}:{row['role']}", profile, ttl=PROFILE_CACHE_SECONDS)
+    return profile
+
+
+def publish_profile_claims(auth_id, rows, existing=None):
+    """Stores {role: {user_id, name}} in app_metadata (needs the service-role key). Runs as a job."""
+    profiles = dict(existing or {})
+    profiles.update({r['role']: {"user_id": r['user_id'], "name": r['name']} for r in rows})
+    supabase_pool.auth_client().auth.admin.update_user_by_id(auth_id, {"app_metadata": {PROFILE_CLAIM: profiles}})
+
+
+def enqueue_profile_claims(auth_id, rows, existing=None):
+    job_queue.enqueue(
+        'publish_profile_claims',
+        {"auth_id": auth_id, "rows": rows, "existing": existing},
+        key=f"claims:{auth_id}:{','.join(str(r['user_id']) for r in rows)}"
+    )
+
+
+def resolve_profile(auth_user, role):
+    """USERS profile for a signed-in auth user: JWT claims, then cache, then the table."""
+    claims = (getattr(auth_user, "app_metadata", None) or {}).get(PROFILE_CLAIM) or {}
+    if role in claims:
+        return {**claims[role], "role": role}
+    profile = cache.get(f"auth_user:{auth_user.id}:{role}")
+    if profile is not MISS:
+        return profile
+    rows = repo.user_profiles(auth_user.id, role)
+    # A missing account is not cached; registration may create it at any moment
+    if not rows:
+        return None
+    # Accounts created before claims existed get them on their first login
+    enqueue_profile_claims(auth_user.id, rows, claims)
+    return remember_profile(auth_user.id, rows[0])
+
+
+# ==============================
+# PROPERTY SEARCH INDEX
+# ==============================
+search_index = PropertySearchIndex(refresh_seconds=int(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", 300)))
+
+
+def load_search_catalog():
+    return repo.search_catalog()
+
+
+# ==============================
+# ROOM AVAILABILITY INDEX
+# ==============================
+# The bitmap (bit per room-night) rides along with the interval index and backs /api/availability
+occupancy = OccupancyBitmap(horizon_days=int(os.getenv("AVAILABILITY_HORIZON_DAYS", 730)))
+availability = RoomAvailabilityIndex(
+    refresh_seconds=int(os.getenv("AVAILABILITY_INDEX_REFRESH_SECONDS", 60)),
+    bitmap=occupancy
+)
+
+
+def load_active_bookings():
+    return (repo.active_bookings(datetime.now().date().isoformat()),)
+
+
+# Every worker's index misses the other workers' writes until its next refresh. A booking made
+# elsewhere is caught by book_room; a cancellation would hide a free room, so with a shared
+# cache each cancel bumps this stamp and workers that see the bump refresh early.
+CANCELLATIONS = "bookings:cancelled"
+_cancellations_seen = [None]
+
+
+def ensure_availability():
+    availability.ensure_loaded(load_active_bookings)
+    if stamps.shared:
+        token = stamps.get(CANCELLATIONS)
+        seen, _cancellations_seen[0] = _cancellations_seen[0], token
+        if seen is not None and seen != token:
+            availability.expire()
+
+
+# Per-property "booked tonight" sets for the admin room status page
+room_status_snapshots = OccupancySnapshotCache(ttl_seconds=int(os.getenv("ROOM_STATUS_SNAPSHOT_SECONDS", 30)))
+
+
+def search_version():
+    """ETag stamp for /api/user_dashboard: this worker's index versions (see warm_index.py)."""
+    # Runs the load / background refresh that searchRooms would, since a 304 skips it
+    search_index.ensure_loaded(load_search_catalog)
+    versions = [search_index.version]
+    if request.args.get('check_in') and request.args.get('check_out'):
+        ensure_availability()
+        versions.append(availability.version)
+    return versions
+
+
+def warm_availability():
+    try:
+        ensure_availability()
+        return True
+    except Exception as err:
+        log.warning("Availability index unavailable: %s", err)
+        return False
+
+
+def warm_indexes():
+    """Loads the availability index as a worker starts (gunicorn post_worker_init) instead of on first use."""
+    threading.Thread(target=warm_availability, daemon=True).start()
+
+# ==============================
+# IMAGE STORAGE / UPLOAD PIPELINE
+# ==============================
+# STORAGE_BACKEND=local keeps files under LOCAL_STORAGE_DIR (served by /api/media) for dev and tests.
+if os.getenv("STORAGE_BACKEND", "supabase") == "local":
+    storage = LocalStorage(os.getenv("LOCAL_STORAGE_DIR", "media"))
+else:
+    storage = SupabaseStorage(supabase_pool.http, os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"), STORAGE_BUCKET)
+
+upload_spool = UploadSpool(os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "stayngo-uploads")), MAX_UPLOAD_BYTES)
+
+def store_image(local_path, ext):
+    """
+    Streams the original from disk to storage, then queues the resized variants as an
+    'image_variants' job. Takes ownership of `local_path`, which stays in the upload spool
+    until the job has used it. Variant URLs resolve once the job finishes.
+    """
+    stem = uuid.uuid4().hex
+    file_name = f"{stem}{ext}"
+    try:
+        storage.upload_file(file_name, local_path, CONTENT_TYPES[ext])
+    except Exception:
+        os.unlink(local_path)
+        raise
+    job_queue.enqueue('image_variants', {"local_path": local_path, "stem": stem}, key=f"variants:{stem}")
+    return {
+        "image_url": storage.public_url(file_name),
+        "variants": {name: storage.public_url(path) for name, path in variant_names(stem).items()},
+    }
+
+
 @app.route('/api/test_supabase')
 def test_supabase():
-    """Simple test route to verify Supabase Client connection."""
+    """Simple test route to verify the database connection."""
     try:
         # Tries to select from USERS table (already created in Step 2 of plan)
-        response = supabase.table('USERS').select("count", count='exact').limit(0).execute()
-        return jsonify({"status": "success", "message": "Supabase Connection OK", "count": response.count})
+        count = repo.ping()
+        return jsonify({"status": "success", "message": f"{repo.backend} connection OK", "count": count})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -42,7 +416,7 @@ def test_supabase():
 # ==============================
 # DATABASE UTILITY (Removed legacy psycopg2 connection)
 # ==============================
-# All DB operations now use the 'supabase' client defined above.
+# All DB operations go through the 'repo' defined above (see repository.py).
 
 
 # ==============================
@@ -57,9 +431,11 @@ class User:
 
     @staticmethod
     def register(name, email, password, role, phone_number):
+        recovered = False
         try:
             # 1. Sign up user inside Supabase Auth
-            auth_response = supabase.auth.sign_up({
+            auth = supabase_pool.auth_client().auth
+            auth_response = auth.sign_up({
                 "email": email,
                 "password": password
             })
@@ -69,16 +445,17 @@ class User:
         except Exception as e:
             error_msg = str(e).lower()
             if "already" in error_msg and "registered" in error_msg:
-                print("DEBUG: User already in Auth, trying to recover UUID via sign_in...")
+                log.info("User already in Auth, trying to recover UUID via sign_in")
                 try:
                     # Attempt a sign_in just to get the auth_id (user might be in Auth but missing from DB)
-                    login_res = supabase.auth.sign_in_with_password({"email": email, "password": password})
+                    login_res = auth.sign_in_with_password({"email": email, "password": password})
                     user_auth_id = login_res.user.id
+                    recovered = True
                 except Exception as login_err:
-                    print(f"DEBUG: Recovery sign_in failed: {str(login_err)}")
+                    log.warning("Recovery sign_in failed: %s", login_err)
                     return jsonify({"status": "error", "message": f"User exists in Auth but cannot be recovered. Error: {str(login_err)}"}), 400
             else:
-                print(f"DEBUG: Supabase auth sign_up error: {error_msg}")
+                log.warning("Supabase auth sign_up error: %s", error_msg)
                 return jsonify({"status": "error", "message": f"Supabase auth failed: {error_msg}"}), 400
 
         # 2. Insert into local USERS table and map to Auth UUID
@@ -90,54 +467,72 @@ class User:
                 "phone_number": phone_number,
                 "auth_id": user_auth_id
             }
-            response = supabase.table('USERS').insert(user_data).execute()
-            return jsonify({"status": "success", "message": "Account created successfully! Please log in."})
+            rows = repo.create_user(user_data)
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
 
+        # 3. Everything else is a side effect: cache the profile, queue claims + welcome email
+        try:
+            for row in rows:
+                remember_profile(user_auth_id, row)
+                job_queue.enqueue(
+                    'send_notification', {"user_id": row['user_id'], "template": "welcome", "context": {"role": role}},
+                    key=f"notify:welcome:{row['user_id']}"
+                )
+            if rows and recovered:
+                # Existing auth user: the job merges the profiles of its other roles into the claims
+                job_queue.enqueue('refresh_profile_claims', {"auth_id": user_auth_id}, key=f"claims:{user_auth_id}:refresh:{rows[0]['user_id']}")
+            else:
+                enqueue_profile_claims(user_auth_id, rows)
+        except Exception as err:
+            log.warning("Profile warm-up after registration failed: %s", err)
+        return jsonify({"status": "success", "message": "Account created successfully! Please log in."})
+
     @staticmethod
     def login(email, password, role):
         try:
-            # 1. Authenticate with Supabase
-            auth_response = supabase.auth.sign_in_with_password({
+            # 1. Authenticate with Supabase (throwaway auth client, shared connections)
+            auth_response = supabase_pool.auth_client().auth.sign_in_with_password({
                 "email": email,
                 "password": password
             })
-            user_auth_id = auth_response.user.id
         except Exception as e:
-            print(f"DEBUG: Supabase auth login error: {str(e)}")
+            log.info("Supabase auth login error: %s", e)
             return jsonify({"status": "error", "message": "Login failed. Check your credentials and try again."}), 401
 
-        # 2. Fetch from our linked local table
+        # 2. Local profile: from the token's claims when present, else cache, else USERS
         try:
-            response = supabase.table('USERS').select("*").eq("auth_id", user_auth_id).eq("role", role).execute()
-            user_data = response.data[0] if response.data else None
+            user_data = resolve_profile(auth_response.user, role)
         except Exception as e:
             return jsonify({"status": "error", "message": f"Database fetch failed: {str(e)}"}), 500
 
         if user_data:
-            session.permanent = True
-            session['logged_in'] = True
-            session['user_id'] = user_data['user_id']
-            session['name'] = user_data['name']
-            session['role'] = user_data['role']
-            # Optionally store Supabase tokens in session if you ever need to access RLS later
-            session['access_token'] = auth_response.session.access_token
-            return jsonify({
+            token = auth_manager.login(user_data['user_id'], user_data['name'], user_data['role'])
+            if token is None:
+                # Optionally store Supabase tokens in session if you ever need to access RLS later
+                session['access_token'] = auth_response.session.access_token
+            result = {
                 "status": "success",
                 "message": "Logged in successfully.",
                 "role": user_data['role'],
                 "name": user_data['name'],
                 "user_id": user_data['user_id']
-            })
+            }
+            if token:
+                result["token"] = token
+            return jsonify(result)
         else:
             return jsonify({"status": "error", "message": "Account does not exist with that role."}), 401
 
     @staticmethod
     def logout():
+        access_token = session.get('access_token')
+        auth_manager.logout()
         session.clear()
         try:
-            supabase.auth.sign_out()
+            # Revoke this user's refresh tokens without touching any shared client state
+            if access_token:
+                supabase_pool.auth_client().auth.admin.sign_out(access_token)
         except:
             pass
         return jsonify({"status": "success", "message": "You have been logged out."})
@@ -159,10 +554,13 @@ class Admin(User):
                 "image_url": image_url,
                 "image_description": image_description
             }
-            response = supabase.table('PROPERTIES').insert(property_data).execute()
-            if not response.data:
+            rows = repo.insert_property(property_data)
+            if not rows:
                 return jsonify({"status": "error", "message": "Failed to add property"}), 400
-            property_id = response.data[0]['property_id']
+            property_id = rows[0]['property_id']
+            search_index.upsert_property(rows[0])
+            owners.remember('property', property_id, self.user_id)
+            stamps.bump(f"owner:{self.user_id}")
             return jsonify({"status": "success", "message": "Property added successfully!", "property_id": property_id})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
@@ -178,39 +576,68 @@ class Admin(User):
                 "image_url": image_url,
                 "image_description": image_description
             }
-            response = supabase.table('PROPERTIES')\
-                .update(update_data)\
-                .eq("property_id", property_id)\
-                .eq("owner_id", self.user_id)\
-                .execute()
+            for row in repo.update_property(property_id, self.user_id, update_data):
+                search_index.upsert_property(row)
+            invalidate_property(property_id)
+            stamps.bump(f"owner:{self.user_id}")
             return jsonify({"status": "success", "message": "Property updated successfully!"})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
 
-    def deleteProperty(self, property_id):
-        try:
-            # Note: We perform deletes sequentially as Supabase client doesn't 
-            # support multi-table transactions in one call easily.
-            # In production, RLS or DB Triggers would handle cascading deletes.
-            supabase.table('ROOMS').delete().eq("property_id", property_id).execute()
-            supabase.table('AMENITIES').delete().eq("property_id", property_id).execute()
-            response = supabase.table('PROPERTIES')\
-                .delete()\
-                .eq("property_id", property_id)\
-                .eq("owner_id", self.user_id)\
-                .execute()
-            
-            if not response.data:
+    def deleteProperty(self, property_id, mode="archive"):
+        """
+        mode="archive" (default) tombstones the property instantly; scheduler.py purges it later.
+        mode="purge" deletes the property, its rooms, amenities, bookings, payments and
+        reviews in one transaction. Either way it is a single RPC round trip.
+        """
+        try:
+            result = repo.delete_property(property_id, self.user_id, purge=mode == "purge")
+            if not result:
                 return jsonify({"status": "error", "message": "Property not found or no permission."}), 403
-            return jsonify({"status": "success", "message": "Property deleted successfully!"})
+            room_ids = result.get('room_ids') or []
+            search_index.remove_property(property_id)
+            invalidate_property(property_id, room_ids)
+            stamps.bump(f"owner:{self.user_id}")
+            if mode == "purge":
+                owners.forget('property', property_id)
+                for room_id in room_ids:
+                    owners.forget('room', room_id)
+            message = "Property deleted successfully!" if mode == "purge" else "Property archived; it will be purged shortly."
+            return jsonify({"status": "success", "message": message, "result": result})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
 
     def viewDashboard(self):
         try:
-            response = supabase.table('PROPERTIES').select("*").eq("owner_id", self.user_id).execute()
-            properties = response.data
-            return jsonify({"properties": properties, "name": self.name, "role": self.role})
+            properties = RawJSON(repo.owner_properties_json(self.user_id))
+            return json_passthrough(properties=properties, name=self.name, role=self.role)
+        except Exception as err:
+            return jsonify({"status": "error", "message": str(err)}), 400
+
+    def viewDashboardSummary(self, upcoming_days=7):
+        """
+        Per-property room count, occupancy tonight, revenue month-to-date, check-ins in the next
+        `upcoming_days` and average rating, read from the trigger-maintained stats tables
+        (sql/owner_dashboard.sql) in one round trip.
+        """
+        try:
+            properties = repo.owner_dashboard(self.user_id, upcoming_days)
+            for p in properties:
+                p['occupancy_rate'] = round(p['occupied_today'] / p['room_count'], 3) if p['room_count'] else 0.0
+            room_count = sum(p['room_count'] for p in properties)
+            occupied = sum(p['occupied_today'] for p in properties)
+            totals = {
+                "properties": len(properties),
+                "room_count": room_count,
+                "occupied_today": occupied,
+                "occupancy_rate": round(occupied / room_count, 3) if room_count else 0.0,
+                "revenue_mtd": round(sum(float(p['revenue_mtd']) for p in properties), 2),
+                "upcoming_check_ins": sum(p['upcoming_check_ins'] for p in properties)
+            }
+            return jsonify({
+                "properties": properties, "totals": totals, "upcoming_days": upcoming_days,
+                "name": self.name, "role": self.role
+            })
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
 
@@ -218,23 +645,32 @@ class Admin(User):
     def addAmenity(property_id, name, description):
         try:
             amenity_data = {"property_id": property_id, "name": name, "description": description}
-            supabase.table('AMENITIES').insert(amenity_data).execute()
+            for row in repo.insert_rows('AMENITIES', [amenity_data]):
+                owners.remember('amenity', row['amenity_id'], property_id)
+            invalidate_property(property_id)
             return jsonify({"status": "success", "message": "Amenity added successfully!"})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
 
     @staticmethod
     def viewAmenities(property_id):
+        """The property's amenities as JSON text (RawJSON), cached as text."""
         try:
-            response = supabase.table('AMENITIES').select("*").eq("property_id", property_id).execute()
-            return response.data
+            return RawJSON(cache.get_or_load(
+                f"property:{property_id}:amenities.json",
+                lambda: repo.property_children_json('AMENITIES', property_id)
+            ))
         except Exception:
-            return []
+            skip_etag()
+            return RawJSON("[]")
 
     @staticmethod
     def deleteAmenity(amenity_id, property_id):
         try:
-            supabase.table('AMENITIES').delete().eq("amenity_id", amenity_id).execute()
+            rows = repo.delete_row('AMENITIES', amenity_id)
+            owners.forget('amenity', amenity_id)
+            for row in rows:
+                invalidate_property(row['property_id'])
             return jsonify({"status": "success", "message": "Amenity deleted successfully!"})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
@@ -243,7 +679,8 @@ class Admin(User):
     def editAmenity(amenity_id, name, description, property_id):
         try:
             update_data = {"name": name, "description": description}
-            supabase.table('AMENITIES').update(update_data).eq("amenity_id", amenity_id).execute()
+            for row in repo.update_row('AMENITIES', amenity_id, update_data):
+                invalidate_property(row['property_id'])
             return jsonify({"status": "success", "message": "Amenity updated successfully!"})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
@@ -259,7 +696,10 @@ class Admin(User):
                 "price_per_night": float(price_per_night),
                 "availability_status": bool(availability_status)
             }
-            supabase.table('ROOMS').insert(room_data).execute()
+            for row in repo.insert_rows('ROOMS', [room_data]):
+                search_index.upsert_room(row)
+                owners.remember('room', row['room_id'], property_id)
+            invalidate_property(property_id)
             return jsonify({"status": "success", "message": "Room added successfully!"})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
@@ -267,15 +707,34 @@ class Admin(User):
     @staticmethod
     def viewRooms(property_id):
         try:
-            response = supabase.table('ROOMS').select("*").eq("property_id", property_id).execute()
-            return response.data
+            return cache.get_or_load(
+                f"property:{property_id}:rooms",
+                lambda: repo.property_children('ROOMS', property_id)
+            )
         except Exception:
+            skip_etag()
             return []
 
+    @staticmethod
+    def viewRoomsJSON(property_id):
+        """viewRooms() as JSON text (RawJSON), for the routes that only forward it."""
+        try:
+            return RawJSON(cache.get_or_load(
+                f"property:{property_id}:rooms.json",
+                lambda: repo.property_children_json('ROOMS', property_id)
+            ))
+        except Exception:
+            skip_etag()
+            return RawJSON("[]")
+
     @staticmethod
     def deleteRoom(room_id, property_id):
         try:
-            supabase.table('ROOMS').delete().eq("room_id", room_id).execute()
+            rows = repo.delete_row('ROOMS', room_id)
+            search_index.remove_room(room_id)
+            owners.forget('room', room_id)
+            for row in rows:
+                invalidate_property(row['property_id'], [room_id])
             return jsonify({"status": "success", "message": "Room deleted successfully!"})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
@@ -289,34 +748,149 @@ class Admin(User):
                 "price_per_night": float(price_per_night),
                 "availability_status": bool(availability_status)
             }
-            supabase.table('ROOMS').update(update_data).eq("room_id", room_id).execute()
+            for row in repo.update_row('ROOMS', room_id, update_data):
+                search_index.upsert_room(row)
+                invalidate_property(row['property_id'], [room_id])
             return jsonify({"status": "success", "message": "Room updated successfully!"})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
         return property_id
 
     @staticmethod
-    def getRoomStatus(property_id, owner_id):
+    def _bulkWrite(table, id_field, property_id, rows, validate):
+        """
+        Validates every row first, then writes creates/updates/deletes as one multi-row
+        request per chunk. Returns (per-row results, saved rows, deleted ids).
+        """
+        results = [{"row": i} for i in range(len(rows))]
+        creates, updates, deletes, seen = [], [], [], set()
+        for i, row in enumerate(rows):
+            try:
+                op, row_id, values = validate(row)
+                if row_id is not None:
+                    if row_id in seen:
+                        raise ValueError(f"{id_field} {row_id} appears more than once")
+                    seen.add(row_id)
+            except ValueError as err:
+                results[i].update(status="error", message=str(err))
+                continue
+            results[i].update(op=op, **({id_field: row_id} if row_id is not None else {}))
+            if op == "create":
+                creates.append((i, values))
+            elif op == "update":
+                updates.append((i, row_id, values))
+            else:
+                deletes.append((i, row_id))
+
+        def not_found(i, row_id):
+            results[i].update(status="error", message=f"{id_field} {row_id} not found in this property")
+
+        # Deletes may only touch rows of this property (one lookup per chunk). Updates are
+        # scoped by the UPDATE itself, so a row deleted meanwhile is reported, not re-created.
+        if deletes:
+            existing = set()
+            for ids in chunks(sorted(row_id for _, row_id in deletes)):
+                existing.update(repo.existing_ids(table, ids, property_id))
+            for i, row_id in deletes:
+                if row_id not in existing:
+                    not_found(i, row_id)
+            deletes = [d for d in deletes if d[1] in existing]
+
+        def fail(batch, err):
+            for item in batch:
+                results[item[0]].update(status="error", message=str(err))
+
+        saved, deleted = [], []
+        for batch in chunks(creates):
+            try:
+                inserted = repo.insert_rows(table, [{**values, "property_id": property_id} for _, values in batch])
+                for (i, _), row in zip(batch, inserted):
+                    results[i].update(status="created", **{id_field: row[id_field]})
+                saved.extend(inserted)
+            except Exception as err:
+                fail(batch, err)
+        for batch in chunks(updates):
+            try:
+                updated = repo.update_rows(table, [{id_field: row_id, **values} for _, row_id, values in batch],
+                                           property_id)
+                updated_ids = {row[id_field] for row in updated}
+                for i, row_id, _ in batch:
+                    if row_id in updated_ids:
+                        results[i]["status"] = "updated"
+                    else:
+                        not_found(i, row_id)
+                saved.extend(updated)
+            except Exception as err:
+                fail(batch, err)
+        for batch in chunks(deletes):
+            try:
+                repo.delete_ids(table, [row_id for _, row_id in batch], property_id)
+                for i, row_id in batch:
+                    results[i]["status"] = "deleted"
+                    deleted.append(row_id)
+            except Exception as err:
+                fail(batch, err)
+        return results, saved, deleted
+
+    @staticmethod
+    def _bulkResponse(property_id, results):
+        counts = {"created": 0, "updated": 0, "deleted": 0, "error": 0}
+        for result in results:
+            counts[result["status"]] += 1
+        ok = len(results) - counts["error"]
+        status = "success" if not counts["error"] else ("partial" if ok else "error")
+        return jsonify({"status": status, "property_id": property_id, "counts": counts, "results": results}), 200 if ok else 400
+
+    @staticmethod
+    def bulkRooms(property_id, rows):
         try:
-            # 1. Fetch property details
-            p_res = supabase.table('PROPERTIES').select("*").eq("property_id", property_id).eq("owner_id", owner_id).execute()
-            if not p_res.data:
-                return None, None
-            property_details = p_res.data[0]
+            results, saved, deleted = Admin._bulkWrite('ROOMS', 'room_id', property_id, rows, validate_room)
+        except Exception as err:
+            return jsonify({"status": "error", "message": str(err)}), 400
+        for row in saved:
+            search_index.upsert_room(row)
+            owners.remember('room', row['room_id'], property_id)
+        for room_id in deleted:
+            search_index.remove_room(room_id)
+            owners.forget('room', room_id)
+        invalidate_property(property_id, [r['room_id'] for r in saved] + deleted)
+        return Admin._bulkResponse(property_id, results)
 
-            # 2. Fetch rooms
-            r_res = supabase.table('ROOMS').select("*").eq("property_id", property_id).execute()
-            rooms = r_res.data
+    @staticmethod
+    def bulkAmenities(property_id, rows):
+        try:
+            results, saved, deleted = Admin._bulkWrite('AMENITIES', 'amenity_id', property_id, rows, validate_amenity)
+        except Exception as err:
+            return jsonify({"status": "error", "message": str(err)}), 400
+        for row in saved:
+            owners.remember('amenity', row['amenity_id'], property_id)
+        for amenity_id in deleted:
+            owners.forget('amenity', amenity_id)
+        invalidate_property(property_id)
+        return Admin._bulkResponse(property_id, results)
 
-            # 3. Fetch active bookings (for room status)
+    @staticmethod
+    def getRoomStatus(property_id, owner_id):
+        try:
             today = datetime.now().date().isoformat()
-            # Find bookings where current date is between check_in and check_out
-            b_res = supabase.table('BOOKINGS')\
-                .select("room_id")\
-                .lte("check_in_date", today)\
-                .gt("check_out_date", today)\
-                .execute()
-            booked_room_ids = {b['room_id'] for b in b_res.data}
+            booked_room_ids = room_status_snapshots.get(property_id, today)
+
+            # 1. Property details with its rooms, 2. rooms occupied tonight
+            fetch_property = lambda: repo.property_with_rooms(property_id, owner_id)
+            fetch_booked = lambda: repo.booked_room_ids(property_id, today)
+
+            # Both queries are independent, so on a snapshot miss they run concurrently
+            if booked_room_ids is None:
+                (property_details, rooms), booked = run_concurrently(fetch_property, fetch_booked)
+            else:
+                (property_details, rooms), booked = fetch_property(), None
+
+            if property_details is None:
+                return None, None
+
+            if booked is not None:
+                booked_room_ids = booked
+                room_status_snapshots.put(property_id, today, booked_room_ids)
 
             for room in rooms:
                 room['is_booked'] = room['room_id'] in booked_room_ids
@@ -331,149 +905,172 @@ class Guest(User):
     def __init__(self, user_id, name, email, role):
         super().__init__(user_id, name, email, role)
 
-    def searchRooms(self):
+    def searchRooms(self, filters):
         try:
-            response = supabase.table('PROPERTIES').select("*").execute()
-            return jsonify({"properties": response.data, "name": self.name, "role": self.role})
+            search_index.ensure_loaded(load_search_catalog)
+
+            # Date filter: drop rooms with a booking overlapping [check_in, check_out)
+            room_filter = None
+            check_in, check_out = filters.pop('check_in', None), filters.pop('check_out', None)
+            if check_in and check_out:
+                ensure_availability()
+                room_filter = lambda room_id: availability.is_free(room_id, check_in, check_out)
+
+            properties, next_cursor = search_index.search(room_filter=room_filter, **filters)
+            return jsonify({"properties": properties, "next_cursor": next_cursor, "name": self.name, "role": self.role})
+        except ValueError as err:
+            return jsonify({"status": "error", "message": str(err)}), 400
         except Exception:
-            return jsonify({"properties": [], "name": self.name, "role": self.role})
+            log.exception("Property search failed")
+            skip_etag()
+            return jsonify({"properties": [], "next_cursor": None, "name": self.name, "role": self.role})
 
     def bookRoom(self, room_id, property_id, check_in_date, check_out_date, payment_method):
         try:
-            # 1. Fetch room details
-            res = supabase.table('ROOMS').select("*").eq("room_id", room_id).single().execute()
-            room = res.data
-            if not room or not bool(room['availability_status']):
-                return jsonify({"status": "error", "message": "This room is currently turned off by the admin."}), 400
-
             check_in = datetime.strptime(check_in_date, '%Y-%m-%d')
             check_out = datetime.strptime(check_out_date, '%Y-%m-%d')
             num_days = (check_out - check_in).days
             if num_days <= 0:
                 return jsonify({"status": "error", "message": "Invalid date range."}), 400
 
-            # 2. Check for overlaps
-            # Overlap logic: existing.check_in < new.check_out AND existing.check_out > new.check_in
-            bookings_res = supabase.table('BOOKINGS')\
-                .select("booking_id")\
-                .eq("room_id", room_id)\
-                .lt("check_in_date", check_out_date)\
-                .gt("check_out_date", check_in_date)\
-                .execute()
-            
-            if bookings_res.data:
+            # 1. The index is only a hint (it can miss a cancellation on another worker), so a
+            #    room it reports as taken still goes to the database
+            index_says_taken = warm_availability() and not availability.is_free(room_id, check_in_date, check_out_date)
+
+            # 2. Room validation, overlap check (row lock + exclusion constraint), price and the
+            #    BOOKINGS insert run as one transaction (see sql/book_room.sql)
+            booking = repo.book_room(self.user_id, room_id, check_in_date, check_out_date, payment_method,
+                                     record_payment=False)
+            booking_id = booking['booking_id']
+
+            # 3. PAYMENTS row and confirmation email are recorded by the job workers. The booking
+            #    is committed by now, so a queue failure must not turn into an error response
+            payment = {"booking_id": booking_id, "amount": booking['total_price'], "payment_method": payment_method}
+            payment_status = "processing"
+            try:
+                job_queue.enqueue('record_payment', payment, key=f"payment:{booking_id}")
+            except Exception:
+                log.exception("Could not queue the payment of booking %s; recording it inline", booking_id)
+                try:
+                    record_payment_job(payment)
+                    payment_status = "completed"
+                except Exception:
+                    log.exception("Payment of booking %s was not recorded", booking_id)
+            try:
+                job_queue.enqueue(
+                    'send_notification',
+                    {"user_id": self.user_id, "template": "booking_confirmed",
+                     "context": {"booking_id": booking_id, "check_in_date": check_in_date,
+                                 "check_out_date": check_out_date, "total_price": booking['total_price']}},
+                    key=f"notify:booking_confirmed:{booking_id}"
+                )
+            except Exception:
+                log.exception("Could not queue the confirmation email of booking %s", booking_id)
+
+            if index_says_taken:
+                availability.expire()  # the database had the room free
+            availability.add(booking_id, room_id, check_in_date, check_out_date)
+            room_status_snapshots.invalidate(booking['property_id'])
+
+            # The payment is normally only queued here; My Bookings reports its payment_status once the job has run
+            message = "Booking confirmed; payment processing." if payment_status == "processing" else "Booking confirmed."
+            return jsonify({"status": "success", "message": message,
+                            "booking_id": booking_id, "payment_status": payment_status})
+        except RepositoryError as err:
+            if err.code == '23P01':
                 return jsonify({"status": "error", "message": "Room is already booked for these dates."}), 400
-
-            total_price = num_days * float(room['price_per_night'])
-
-            # 3. Create booking
-            booking_data = {
-                "user_id": self.user_id,
-                "room_id": room_id,
-                "check_in_date": check_in_date,
-                "check_out_date": check_out_date,
-                "total_price": total_price,
-            }
-            b_res = supabase.table('BOOKINGS').insert(booking_data).execute()
-            booking_id = b_res.data[0]['booking_id']
-
-            # 4. Create payment
-            payment_data = {
-                "booking_id": booking_id,
-                "payment_method": payment_method,
-                "amount": total_price,
-                "payment_status": 'completed',
-                "payment_date": datetime.now().isoformat()
-            }
-            supabase.table('PAYMENTS').insert(payment_data).execute()
-
-            return jsonify({"status": "success", "message": "Booking and payment successful!", "booking_id": booking_id})
+            return jsonify({"status": "error", "message": err.message}), 400
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
 
     def cancelBooking(self, booking_id):
         try:
             # 1. Verify access
-            res = supabase.table('BOOKINGS').select("*").eq("booking_id", booking_id).eq("user_id", self.user_id).execute()
-            if not res.data:
+            booking = repo.user_booking(booking_id, self.user_id)
+            if not booking:
                 return jsonify({"status": "error", "message": "Booking not found or no permission."}), 404
 
-            # 2. Delete related records
-            supabase.table('PAYMENTS').delete().eq("booking_id", booking_id).execute()
-            supabase.table('BOOKINGS').delete().eq("booking_id", booking_id).execute()
+            # 2. Delete the booking (its payment goes with it, ON DELETE CASCADE)
+            repo.delete_booking(booking_id)
+            availability.remove(booking_id)
+            stamps.bump(CANCELLATIONS)
+            room_status_snapshots.invalidate(booking.get('property_id'))
+            job_queue.enqueue(
+                'send_notification',
+                {"user_id": self.user_id, "template": "booking_cancelled", "context": {"booking_id": booking_id}},
+                key=f"notify:booking_cancelled:{booking_id}"
+            )
             return jsonify({"status": "success", "message": "Booking cancelled successfully."})
         except Exception as err:
             return jsonify({"status": "error", "message": str(err)}), 400
 
-    def viewBookings(self):
+    BOOKING_SCOPES = ("all", "upcoming", "past")
+
+    def viewBookings(self, scope="all", cursor=None, limit=20):
+        """
+        One keyset page of the guest's bookings from the USER_BOOKINGS view (sql/user_bookings.sql).
+        upcoming (not checked out yet) runs soonest first; past and all run newest first.
+        """
         try:
-            # Use PostgREST's logic to fetch joined data
-            # Format: ROOMS(*) fetches the related room, ROOMS(PROPERTIES(*)) fetches the related property
-            res = supabase.table('BOOKINGS')\
-                .select("*, ROOMS(*, PROPERTIES(*))")\
-                .eq("user_id", self.user_id)\
-                .execute()
-            
-            result = []
-            for b in res.data:
-                # Flatten the data to match the expected frontend format
-                room = b.get('ROOMS') or {}
-                prop = room.get('PROPERTIES') or {}
-                bd = {
-                    "booking_id": b['booking_id'],
-                    "check_in_date": b['check_in_date'],
-                    "check_out_date": b['check_out_date'],
-                    "total_price": b['total_price'],
-                    "room_type": room.get('room_type'),
-                    "address": prop.get('address')
-                }
-                result.append(bd)
-            return jsonify({"bookings": result})
+            after = read_cursor(cursor, d=iso_date, id=cursor_id)
+        except ValueError as err:
+            return jsonify({"status": "error", "message": str(err)}), 400
+        try:
+            today = datetime.now().date().isoformat()
+            rows = repo.user_bookings(self.user_id, scope, today, after, limit + 1)
+
+            bookings = rows[:limit]
+            # No PAYMENTS row yet: still queued, unless the record_payment job was dead-lettered
+            failed = job_queue.dead_keys([f"payment:{b['booking_id']}" for b in bookings
+                                          if b['payment_status'] == 'processing'])
+            for booking in bookings:
+                if f"payment:{booking['booking_id']}" in failed:
+                    booking['payment_status'] = 'failed'
+            next_cursor = None
+            if len(rows) > limit:
+                next_cursor = make_cursor(d=bookings[-1]['check_in_date'], id=bookings[-1]['booking_id'])
+            return jsonify({"bookings": bookings, "scope": scope, "next_cursor": next_cursor})
         except Exception as err:
             return jsonify({"bookings": [], "error": str(err)})
 
     @staticmethod
     def viewPropertyDetails(property_id):
         try:
-            # 1. Fetch property, amenities, and rooms in one nested query
-            # We can't easily fetch reviews nested under rooms in one call with PostgREST 
-            # if the relationship is complex, so we'll fetch property depth 1 first.
-            p_res = supabase.table('PROPERTIES')\
-                .select("*, AMENITIES(*), ROOMS(*)")\
-                .eq("property_id", property_id)\
-                .single().execute()
-            
-            p_data = p_res.data
-            amenities = p_data.get('AMENITIES') or []
-            rooms = p_data.get('ROOMS') or []
-            
-            # 2. Fetch reviews for these rooms
-            room_ids = [r['room_id'] for r in rooms]
-            rev_res = supabase.table('REVIEWS')\
-                .select("*, USERS(name)")\
-                .in_("room_id", room_ids)\
-                .order("created_at", desc=True)\
-                .execute()
-            
-            room_reviews = {str(rid): [] for rid in room_ids}
-            for rev in rev_res.data:
-                r_id = str(rev['room_id'])
-                rev_formatted = {
-                    "rating": rev['rating'],
-                    "comment": rev['comment'],
-                    "user_name": rev.get('USERS', {}).get('name', 'Unknown User'),
-                    "created_at": rev['created_at']
-                }
-                if r_id in room_reviews:
-                    room_reviews[r_id].append(rev_formatted)
-
-            # Cleanup the property dictionary to remove nested lists
-            clean_p = {k: v for k, v in p_data.items() if k not in ['AMENITIES', 'ROOMS']}
-            
-            return clean_p, amenities, rooms, room_reviews
+            return cache.get_or_load(
+                f"property:{property_id}:details",
+                lambda: Guest._loadPropertyDetails(property_id)
+            )
         except Exception as e:
-            print(f"Error in viewPropertyDetails: {e}")
-            return None, [], [], {}
+            log.warning("viewPropertyDetails(%s) failed: %s", property_id, e)
+            skip_etag()
+            return {"property": None, "amenities": [], "rooms": [], "room_reviews": {}, "room_ratings": {}, "review_cursors": {}}
+
+    @staticmethod
+    def _loadPropertyDetails(property_id):
+        # Property, amenities, rooms, newest N reviews per room and per-room rating
+        # aggregates come back from one RPC (see sql/property_details.sql)
+        details = repo.property_details(property_id, REVIEWS_PER_ROOM)
+        if not details:
+            raise LookupError(f"Property {property_id} not found.")
+
+        # Rooms with more reviews than the first page get a cursor for /api/room_reviews
+        details['review_cursors'] = {}
+        for room_id, reviews in details['room_reviews'].items():
+            total = details['room_ratings'].get(room_id, {}).get('count', 0)
+            last = reviews[-1] if reviews else None
+            details['review_cursors'][room_id] = make_cursor(t=last['created_at'], id=last['review_id']) \
+                if last and total > len(reviews) else None
+        return details
+
+    @staticmethod
+    def viewRoomReviews(room_id, cursor, limit):
+        """One newest-first page of a room's reviews, keyset-paginated on (created_at, review_id)."""
+        rows = repo.room_reviews(room_id, read_cursor(cursor, t=iso_timestamp, id=cursor_id), limit + 1)
+        reviews = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = make_cursor(t=reviews[-1]['created_at'], id=reviews[-1]['review_id'])
+        return reviews, next_cursor
 
     @staticmethod
     def addReview(room_id, user_id, rating, comment, property_id):
@@ -484,43 +1081,254 @@ class Guest(User):
                 "rating": int(rating),
                 "comment": comment
             }
-            supabase.table('REVIEWS').insert(review_data).execute()
+            # ROOM_RATINGS / PROPERTY_RATINGS are updated by the REVIEWS trigger (sql/ratings.sql)
+            repo.insert_review(review_data)
+            property_id = search_index.property_of_room(room_id) or property_id
+            search_index.record_review(property_id, review_data['rating'])
+            invalidate_property(property_id)
             return jsonify({"status": "success", "message": "Your review has been added."})
-        except Exception as err:
+        except Exception:
             return jsonify({"status": "error", "message": "An error occurred. Please try again."}), 400
 
 
 class Scheduler:
+    AVAILABILITY_JOB = 'update_room_availability'
+    PURGE_JOB = 'purge_archived_properties'
+    JOB_PRUNE_JOB = 'prune_finished_jobs'
+    # PostgREST filters travel in the URL, so very large in_() lists are split
+    BULK_CHUNK_SIZE = 500
+
     @staticmethod
     def updateRoomAvailability():
+        started = time.perf_counter()
+        today = datetime.now().date().isoformat()
         try:
-            today = datetime.now().date().isoformat()
-            # Fetch bookings that have ended
-            res = supabase.table('BOOKINGS').select("room_id").lte("check_out_date", today).execute()
-            expired_room_ids = {b['room_id'] for b in res.data}
-            
-            if expired_room_ids:
-                # Update room availability status
-                for rid in expired_room_ids:
-                    supabase.table('ROOMS').update({"availability_status": True}).eq("room_id", rid).execute()
-                print(f"Updated availability for {len(expired_room_ids)} room(s).")
-        except Exception as err:
-            print(f"Error updating room availability: {err}")
+            # 1. Read the watermark: the last check-out date already processed
+            watermark = repo.scheduler_watermark(Scheduler.AVAILABILITY_JOB)
+
+            # 2. Only bookings that ended since the last run
+            expired = repo.checked_out_bookings(watermark, today)
+            expired_room_ids = sorted({b['room_id'] for b in expired})
+
+            # 3. Release rooms with one bulk UPDATE ... WHERE room_id IN (...)
+            rooms_updated = 0
+            for i in range(0, len(expired_room_ids), Scheduler.BULK_CHUNK_SIZE):
+                chunk = expired_room_ids[i:i + Scheduler.BULK_CHUNK_SIZE]
+                released = repo.release_rooms(chunk)
+                rooms_updated += len(released)
+                by_property = {}
+                for row in released:
+                    search_index.upsert_room(row)
+                    by_property.setdefault(row['property_id'], []).append(row['room_id'])
+                # Cached room lists and their ETags carry availability_status
+                for property_id, room_ids in by_property.items():
+                    invalidate_property(property_id, room_ids)
+
+            # 4. Advance the watermark and record run metrics
+            metrics = {
+                "job": Scheduler.AVAILABILITY_JOB,
+                "watermark": today,
+                "bookings_scanned": len(expired),
+                "rows_touched": rooms_updated,
+                "duration_ms": int((time.perf_counter() - started) * 1000)
+            }
+            repo.save_scheduler_state({
+                "job_name": Scheduler.AVAILABILITY_JOB,
+                "watermark": today,
+                "last_run_at": datetime.now().isoformat(),
+                "last_duration_ms": metrics["duration_ms"],
+                "last_rows_touched": rooms_updated
+            })
+            log.info("Updated availability for %d room(s): %s", rooms_updated, metrics)
+            return metrics
+        except Exception:
+            log.exception("Error updating room availability")
+            return None
+
+    @staticmethod
+    def purgeArchivedProperties(batch_size=None, grace_minutes=None):
+        """Hard-deletes archived properties in small transactions until none are left."""
+        started = time.perf_counter()
+        batch_size = batch_size or int(os.getenv("PURGE_BATCH_SIZE", 10))
+        grace_minutes = int(os.getenv("PURGE_GRACE_MINUTES", 0)) if grace_minutes is None else grace_minutes
+        purged = []
+        try:
+            while True:
+                batch = repo.purge_archived(batch_size, grace_minutes)
+                for item in batch:
+                    owners.forget('property', item['property_id'])
+                    for room_id in item.get('room_ids') or []:
+                        owners.forget('room', room_id)
+                purged.extend(batch)
+                if len(batch) < batch_size:
+                    break
+            metrics = {
+                "job": Scheduler.PURGE_JOB,
+                "properties_purged": len(purged),
+                "bookings_deleted": sum(p['bookings'] for p in purged),
+                "duration_ms": int((time.perf_counter() - started) * 1000)
+            }
+            log.info("Purged %d archived property(ies): %s", len(purged), metrics)
+            return metrics
+        except Exception:
+            log.exception("Error purging archived properties")
+            return None
+
+    @staticmethod
+    def pruneFinishedJobs(retention_hours=None):
+        """Drops finished background jobs (and their idempotency keys) after JOB_RETENTION_HOURS."""
+        retention_hours = float(os.getenv("JOB_RETENTION_HOURS", 72)) if retention_hours is None else retention_hours
+        try:
+            pruned = job_queue.prune(retention_hours * 3600)
+            metrics = {"job": Scheduler.JOB_PRUNE_JOB, "jobs_pruned": pruned, **job_queue.stats()}
+            log.info("Pruned %d finished job(s): %s", pruned, metrics)
+            return metrics
+        except Exception:
+            log.exception("Error pruning finished jobs")
+            return None
+
+
+# ==============================
+# BACKGROUND JOB HANDLERS (run by jobs_worker.py, never inside a request)
+# ==============================
+# Each handler must be safe to run more than once for the same payload: a job whose
+# worker died mid-run is picked up again when its lease expires.
+NOTIFICATION_TEMPLATES = {
+    "welcome": ("Welcome to StayNGo", "Hi {name},\n\nYour {role} account is ready."),
+    "booking_confirmed": (
+        "Booking #{booking_id} confirmed",
+        "Hi {name},\n\nYour stay from {check_in_date} to {check_out_date} is booked. Total: {total_price}."
+    ),
+    "booking_cancelled": ("Booking #{booking_id} cancelled", "Hi {name},\n\nYour booking #{booking_id} was cancelled."),
+}
+
+
+def record_payment_job(payload):
+    row = {
+        "booking_id": payload['booking_id'],
+        "payment_method": payload['payment_method'],
+        "amount": payload['amount'],
+        "payment_status": 'completed',
+        "payment_date": datetime.now().isoformat()
+    }
+    # payments_booking_id_key makes a replayed job a no-op
+    if not repo.record_payment(row):
+        # The booking was cancelled before its payment was recorded; nothing left to do
+        log.info("Booking %s is gone, payment not recorded", payload['booking_id'])
+
+
+def send_notification_job(payload):
+    template = NOTIFICATION_TEMPLATES.get(payload['template'])
+    if template is None:
+        raise PermanentJobError(f"Unknown notification template '{payload['template']}'")
+    user = repo.user_contact(payload['user_id'])
+    if not user:
+        raise PermanentJobError(f"User {payload['user_id']} not found")
+    subject, body = (part.format(**user, **payload.get('context', {})) for part in template)
+
+    if not os.getenv("SMTP_HOST"):
+        log.info("[email to %s] %s", user['email'], subject)
+        return
+    import smtplib
+    from email.message import EmailMessage
+    message = EmailMessage()
+    message["From"] = os.getenv("SMTP_FROM", "no-reply@stayngo.app")
+    message["To"] = user['email']
+    message["Subject"] = subject
+    message.set_content(body)
+    with smtplib.SMTP(os.getenv("SMTP_HOST"), int(os.getenv("SMTP_PORT", 587)), timeout=30) as smtp:
+        smtp.starttls()
+        if os.getenv("SMTP_USER"):
+            smtp.login(os.getenv("SMTP_USER"), os.getenv("SMTP_PASSWORD", ""))
+        smtp.send_message(message)
+
+
+def image_variants_job(payload):
+    local_path = payload['local_path']
+    if not os.path.exists(local_path):
+        # A previous attempt already published the variants and cleaned up (or the spool was swept)
+        raise PermanentJobError(f"Spooled original {local_path} is gone")
+    work_dir = tempfile.mkdtemp(prefix="stayngo-variants-")
+    try:
+        for storage_path, variant_path, content_type in make_variants(local_path, work_dir, payload['stem']):
+            storage.upload_file(storage_path, variant_path, content_type)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    os.unlink(local_path)
+
+
+def publish_profile_claims_job(payload):
+    publish_profile_claims(payload['auth_id'], payload['rows'], payload.get('existing'))
+
+
+def refresh_profile_claims_job(payload):
+    rows = repo.user_profiles(payload['auth_id'])
+    if rows:
+        publish_profile_claims(payload['auth_id'], rows)
+
+
+JOB_HANDLERS = {
+    'record_payment': record_payment_job,
+    'send_notification': send_notification_job,
+    'image_variants': image_variants_job,
+    'publish_profile_claims': publish_profile_claims_job,
+    'refresh_profile_claims': refresh_profile_claims_job,
+}
 
 
 # ==============================
 # API ROUTES
 # ==============================
 
+def parse_search_filters(args):
+    """Turns /api/user_dashboard query parameters into PropertySearchIndex.search() kwargs."""
+    filters = {
+        "city": args.get('city'),
+        "state": args.get('state'),
+        "country": args.get('country'),
+        "q": args.get('q'),
+        "cursor": args.get('cursor'),
+        "limit": args.get('limit', type=int),
+    }
+    for key in ('min_price', 'max_price'):
+        if args.get(key):
+            filters[key] = float(args[key])
+    if args.get('guests'):
+        filters['guests'] = int(args['guests'])
+    if args.get('min_rating'):
+        filters['min_rating'] = float(args['min_rating'])
+    if args.get('sort'):
+        filters['sort'] = args['sort']
+
+    check_in, check_out = args.get('check_in'), args.get('check_out')
+    if bool(check_in) != bool(check_out):
+        raise ValueError("Both check_in and check_out are required for a date search.")
+    if check_in:
+        if datetime.strptime(check_out, '%Y-%m-%d') <= datetime.strptime(check_in, '%Y-%m-%d'):
+            raise ValueError("Invalid date range.")
+        filters['check_in'], filters['check_out'] = check_in, check_out
+
+    if args.get('fields'):
+        fields = tuple(f.strip() for f in args['fields'].split(',') if f.strip())
+        unknown = [f for f in fields if f not in PROPERTY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        filters['fields'] = fields
+    else:
+        filters['fields'] = DEFAULT_FIELDS
+    return filters
+
+
 @app.route('/api/me')
 def me():
-    if 'logged_in' not in session:
+    principal = auth_manager.current_principal()
+    if principal is None:
         return jsonify({"logged_in": False}), 401
     return jsonify({
         "logged_in": True,
-        "user_id": session['user_id'],
-        "name": session['name'],
-        "role": session['role']
+        "user_id": principal.user_id,
+        "name": principal.name,
+        "role": principal.role
     })
 
 @app.route('/api/register', methods=['POST'])
@@ -541,96 +1349,239 @@ def logout():
     return User.logout()
 
 @app.route('/api/dashboard')
+@require_role('admin')
+@http_cache.conditional(owner_version)
 def dashboard():
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-    admin = Admin(session['user_id'], session['name'], None, 'admin')
+    admin = g.principal.actor
     return admin.viewDashboard()
 
+@app.route('/api/dashboard_summary')
+@require_role('admin')
+def dashboard_summary():
+    try:
+        upcoming_days = int(request.args.get('upcoming_days', 7))
+    except ValueError:
+        return jsonify({"status": "error", "message": "upcoming_days must be an integer."}), 400
+    if not 1 <= upcoming_days <= 90:
+        return jsonify({"status": "error", "message": "upcoming_days must be between 1 and 90."}), 400
+    admin = g.principal.actor
+    return admin.viewDashboardSummary(upcoming_days)
+
+@app.route('/api/job_stats')
+@require_role('admin')
+def job_stats():
+    # Queue depth only; payloads and dead-letter details stay with `python jobs_worker.py --dead`
+    try:
+        return jsonify({"status": "success", "jobs": job_queue.stats()})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route('/api/user_dashboard')
+@require_role('user')
+@http_cache.conditional(search_version)
 def user_dashboard():
-    if 'logged_in' not in session or session['role'] != 'user':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-    guest = Guest(session['user_id'], session['name'], None, 'user')
-    return guest.searchRooms()
+    try:
+        filters = parse_search_filters(request.args)
+    except ValueError as err:
+        return jsonify({"status": "error", "message": str(err)}), 400
+    guest = g.principal.actor
+    return guest.searchRooms(filters)
 
 @app.route('/api/book_room/<int:room_id>/<int:property_id>', methods=['GET', 'POST'])
+@require_role('user')
 def book_room(room_id, property_id):
-    if 'logged_in' not in session or session['role'] != 'user':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-
     if request.method == 'POST':
         data = request.get_json()
-        guest = Guest(session['user_id'], session['name'], None, 'user')
+        guest = g.principal.actor
         return guest.bookRoom(
             room_id, property_id,
             data['check_in_date'], data['check_out_date'], data['payment_method']
         )
 
     try:
-        res = supabase.table('ROOMS').select("*").eq("room_id", room_id).single().execute()
-        room = res.data
+        room = cache.get_or_load(
+            f"room:{room_id}",
+            lambda: require_row(repo.child_row('ROOMS', room_id))
+        )
         return jsonify({"room": room, "property_id": property_id})
     except Exception:
         return jsonify({"room": None, "property_id": property_id})
 
+@app.route('/api/free_rooms/<int:property_id>')
+@require_role()
+def free_rooms(property_id):
+    """Rooms of a property that are free for [check_in, check_out), with the next free window for the rest."""
+    check_in, check_out = request.args.get('check_in'), request.args.get('check_out')
+    try:
+        nights = (datetime.strptime(check_out, '%Y-%m-%d') - datetime.strptime(check_in, '%Y-%m-%d')).days
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "check_in and check_out must be YYYY-MM-DD."}), 400
+    if nights <= 0:
+        return jsonify({"status": "error", "message": "Invalid date range."}), 400
+    if not warm_availability():
+        return jsonify({"status": "error", "message": "Availability is temporarily unavailable."}), 503
+
+    rooms = Admin.viewRooms(property_id)
+    free, booked = [], []
+    for room in rooms:
+        if not room.get('availability_status', True):
+            continue
+        if availability.is_free(room['room_id'], check_in, check_out):
+            free.append(room)
+        else:
+            next_in, next_out = availability.next_free_window(room['room_id'], check_in, nights)
+            booked.append({**room, "next_free_check_in": next_in, "next_free_check_out": next_out})
+    return jsonify({"property_id": property_id, "free_rooms": free, "booked_rooms": booked})
+
+@app.route('/api/availability/<int:property_id>')
+@require_role()
+def availability_calendar(property_id):
+    """
+    Per-room nightly occupancy for `months` (1-12) months from `start` (YYYY-MM, default this month).
+    format=ranges (default) lists booked runs as [first night, check-out) offsets from window_start;
+    format=bitmap returns base64 packed bits, one per night. With check_in/check_out the rooms
+    free for every night of that stay are listed too.
+    """
+    try:
+        months = request.args.get('months', 1, type=int)
+        if not 1 <= months <= 12:
+            raise ValueError("months must be between 1 and 12.")
+        today = datetime.now().date()
+        first = datetime.strptime(request.args['start'], '%Y-%m').date() if request.args.get('start') else today.replace(day=1)
+        end_month = first.month - 1 + months
+        window_end = first.replace(year=first.year + end_month // 12, month=end_month % 12 + 1)
+        window_start = max(first, today)  # past nights are not tracked
+        if window_start >= window_end:
+            raise ValueError("The requested window is in the past.")
+        fmt = request.args.get('format', 'ranges')
+        if fmt not in ('ranges', 'bitmap'):
+            raise ValueError("format must be ranges or bitmap.")
+        days = (window_end - window_start).days
+        if not warm_availability():
+            return jsonify({"status": "error", "message": "Availability is temporarily unavailable."}), 503
+
+        rooms = [room for room in Admin.viewRooms(property_id) if room.get('availability_status', True)]
+        room_ids = [room['room_id'] for room in rooms]
+        booked = occupancy.matrix(room_ids, window_start, days)
+        calendar = []
+        for room, row in zip(rooms, booked):
+            entry = {"room_id": room['room_id'], "room_type": room.get('room_type'), "booked_nights": int(row.sum())}
+            if fmt == 'bitmap':
+                entry["bitmap"] = OccupancyBitmap.encode(row)
+            else:
+                entry["booked"] = OccupancyBitmap.ranges(row)
+            calendar.append(entry)
+        result = {
+            "property_id": property_id,
+            "window_start": window_start.isoformat(),
+            "window_end": window_end.isoformat(),
+            "days": days,
+            "rooms": calendar
+        }
+        check_in, check_out = request.args.get('check_in'), request.args.get('check_out')
+        if check_in and check_out:
+            result["free_room_ids"] = occupancy.free_for_range(room_ids, check_in, check_out)
+        return jsonify(result)
+    except ValueError as err:
+        return jsonify({"status": "error", "message": str(err)}), 400
+
+@app.route('/api/cache_stats')
+@require_role('admin')
+def cache_stats():
+    """Hit ratio and estimated upstream time saved, per cached entity type (this worker / shared store)."""
+    return jsonify(cache.report())
+
+@app.route('/api/pool_stats')
+@require_role('admin')
+def pool_stats():
+    """Connection pool saturation and reuse for this worker."""
+    return jsonify({**supabase_pool.stats(), "database": repo.pool_stats()})
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint. Set METRICS_TOKEN to require `Authorization: Bearer <token>`."""
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+    gauges = []
+    try:
+        jobs = job_queue.stats()
+        gauges = [
+            ("stayngo_jobs_queued", "Background jobs waiting to run.", jobs['queued']),
+            ("stayngo_jobs_dead", "Dead-lettered background jobs.", jobs['dead']),
+            ("stayngo_jobs_oldest_queued_seconds", "Age of the oldest queued job.", jobs['oldest_queued_seconds'])
+        ]
+    except Exception as err:
+        log.warning("Job queue stats unavailable: %s", err)
+    return profiler.render(gauges), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
 @app.route('/api/room_status/<int:property_id>')
+@require_role('admin', owns="property_id")
 def room_status(property_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-    property_details, rooms = Admin.getRoomStatus(property_id, session['user_id'])
+    property_details, rooms = Admin.getRoomStatus(property_id, g.principal.user_id)
     if not property_details:
         return jsonify({"status": "error", "message": "Property not found."}), 404
     return jsonify({"property": property_details, "rooms": rooms})
 
 @app.route('/api/view_more/<int:property_id>')
+@require_role('user')
+@http_cache.conditional(lambda property_id: stamps.get(f"property:{property_id}"))
 def view_more(property_id):
-    if 'logged_in' not in session or session['role'] != 'user':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-    property_details, amenities, rooms, room_reviews = Guest.viewPropertyDetails(property_id)
-    return jsonify({
-        "property": property_details,
-        "amenities": amenities,
-        "rooms": rooms,
-        "room_reviews": room_reviews
-    })
+    return jsonify(Guest.viewPropertyDetails(property_id))
+
+@app.route('/api/room_reviews/<int:room_id>')
+@require_role()
+def room_reviews(room_id):
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_REVIEWS_PAGE))
+    try:
+        reviews, next_cursor = Guest.viewRoomReviews(room_id, request.args.get('cursor'), limit)
+    except Exception as err:
+        return jsonify({"status": "error", "message": str(err)}), 400
+    return jsonify({"room_id": room_id, "reviews": reviews, "next_cursor": next_cursor})
 
 @app.route('/api/add_review/<int:room_id>', methods=['POST'])
+@require_role()
 def add_review(room_id):
-    if 'user_id' not in session:
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
     data = request.get_json()
     return Guest.addReview(
-        room_id, session['user_id'],
+        room_id, g.principal.user_id,
         int(data['rating']), data['comment'], data.get('property_id')
     )
 
 @app.route('/api/my_bookings')
+@require_role('user')
 def my_bookings():
-    if 'logged_in' not in session or session['role'] != 'user':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-    guest = Guest(session['user_id'], session['name'], None, 'user')
-    return guest.viewBookings()
+    scope = request.args.get('scope', 'all')
+    if scope not in Guest.BOOKING_SCOPES:
+        return jsonify({"status": "error", "message": f"scope must be one of: {', '.join(Guest.BOOKING_SCOPES)}"}), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_BOOKINGS_PAGE))
+    guest = g.principal.actor
+    return guest.viewBookings(scope, request.args.get('cursor'), limit)
 
 @app.route('/api/cancel_booking/<int:booking_id>', methods=['POST'])
+@require_role('user')
 def cancel_booking(booking_id):
-    if 'logged_in' not in session or session['role'] != 'user':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-    guest = Guest(session['user_id'], session['name'], None, 'user')
+    guest = g.principal.actor
     return guest.cancelBooking(booking_id)
 
 @app.route('/api/delete_property/<int:property_id>', methods=['DELETE'])
+@require_role('admin', owns="property_id")
 def delete_property(property_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-    admin = Admin(session['user_id'], session['name'], None, 'admin')
-    return admin.deleteProperty(property_id)
+    mode = request.args.get('mode', 'archive')
+    if mode not in ('archive', 'purge'):
+        return jsonify({"status": "error", "message": "mode must be archive or purge."}), 400
+    admin = g.principal.actor
+    return admin.deleteProperty(property_id, mode)
 
 @app.route('/api/upload_property_image', methods=['POST'])
+@require_role('admin')
 def upload_property_image():
-    """Upload a property image to Supabase Storage and return the public URL."""
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+    """Upload a property image to storage and return its public URL plus resized variant URLs."""
+    # Size is checked from the header before the body is touched
+    if request.content_length is None:
+        return jsonify({"status": "error", "message": "Content-Length required"}), 411
+    if request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({"status": "error", "message": f"Image is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB."}), 413
 
     if 'image' not in request.files:
         return jsonify({"status": "error", "message": "No image file provided"}), 400
@@ -639,109 +1590,140 @@ def upload_property_image():
     if image_file.filename == '':
         return jsonify({"status": "error", "message": "Empty filename"}), 400
 
-    # Determine extension and build a unique storage path
-    ext = os.path.splitext(image_file.filename)[1].lower() or '.jpg'
-    file_name = f"{uuid.uuid4()}{ext}"
-    file_bytes = image_file.read()
-    content_type = image_file.content_type or 'image/jpeg'
+    local_path = None
+    try:
+        ext = check_declared(image_file.filename, None, MAX_UPLOAD_BYTES)
+        # Copy to a temp file in fixed-size chunks; the whole image is never held in memory
+        with tempfile.NamedTemporaryFile(dir=upload_spool.root, suffix=ext, delete=False) as tmp:
+            local_path = tmp.name
+            spool_stream(image_file.stream, tmp, MAX_UPLOAD_BYTES)
+    except UploadRejected as err:
+        if local_path:
+            os.unlink(local_path)
+        return jsonify({"status": "error", "message": str(err)}), err.status
 
     try:
-        # Upload to Supabase Storage
-        supabase.storage.from_(STORAGE_BUCKET).upload(
-            path=file_name,
-            file=file_bytes,
-            file_options={"content-type": content_type}
-        )
-        # Build public URL
-        public_url = f"{os.getenv('SUPABASE_URL')}/storage/v1/object/public/{STORAGE_BUCKET}/{file_name}"
-        return jsonify({"status": "success", "image_url": public_url})
+        result = store_image(local_path, ext)
+        return jsonify({"status": "success", **result})
+    except Exception as err:
+        log.exception("Image upload failed")
+        return jsonify({"status": "error", "message": str(err)}), 500
+
+# Resumable uploads: POST creates a session, PATCH appends a chunk at Upload-Offset,
+# GET reports the current offset so an interrupted client can continue.
+@app.route('/api/uploads', methods=['POST'])
+@require_role('admin')
+def create_upload():
+    data = request.get_json() or {}
+    try:
+        upload_id = upload_spool.create(g.principal.user_id, data.get('filename'), int(data.get('size') or 0), data.get('content_type'))
+        return jsonify({"status": "success", "upload_id": upload_id, "offset": 0, "chunk_size": 5 * 1024 * 1024}), 201
+    except (UploadRejected, ValueError) as err:
+        return jsonify({"status": "error", "message": str(err)}), getattr(err, "status", 400)
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'PATCH', 'DELETE'])
+@require_role('admin')
+def resumable_upload(upload_id):
+    try:
+        if request.method == 'GET':
+            meta = upload_spool.status(upload_id, g.principal.user_id)
+            return jsonify({"upload_id": upload_id, "offset": meta["offset"], "size": meta["size"]})
+        if request.method == 'DELETE':
+            upload_spool.status(upload_id, g.principal.user_id)
+            upload_spool.discard(upload_id)
+            return jsonify({"status": "success", "message": "Upload discarded."})
+
+        offset = int(request.headers.get('Upload-Offset', -1))
+        meta = upload_spool.append(upload_id, g.principal.user_id, offset, request.stream)
+        if meta["offset"] < meta["size"]:
+            return jsonify({"upload_id": upload_id, "offset": meta["offset"], "size": meta["size"]})
+        result = store_image(upload_spool.take(upload_id), meta["ext"])
+        return jsonify({"status": "success", "upload_id": upload_id, **result})
+    except UploadRejected as err:
+        return jsonify({"status": "error", "message": str(err)}), err.status
+    except ValueError:
+        return jsonify({"status": "error", "message": "Upload-Offset header required"}), 400
     except Exception as err:
-        print(f"DEBUG: Image upload error: {str(err)}")
+        log.exception("Resumable upload failed")
         return jsonify({"status": "error", "message": str(err)}), 500
 
+@app.route('/api/media/<path:path>')
+def media(path):
+    """Serves files written by the local storage backend."""
+    if not isinstance(storage, LocalStorage):
+        return jsonify({"status": "error", "message": "Not found"}), 404
+    return send_from_directory(os.path.abspath(storage.root), path, max_age=31536000)
+
 @app.route('/api/add_property', methods=['POST'])
+@require_role('admin')
 def add_property():
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
     data = request.get_json()
-    admin = Admin(session['user_id'], session['name'], None, 'admin')
+    admin = g.principal.actor
     return admin.addProperty(
         data['address'], data['city'], data['state'], data['country'],
         data['description'], data.get('image_url', ''), data.get('image_description', '')
     )
 
 @app.route('/api/edit_property/<int:property_id>', methods=['GET', 'PUT'])
+@require_role('admin', owns="property_id")
 def edit_property(property_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
     if request.method == 'PUT':
         data = request.get_json()
-        admin = Admin(session['user_id'], session['name'], None, 'admin')
+        admin = g.principal.actor
         return admin.editProperty(
             property_id,
             data['address'], data['city'], data['state'], data['country'],
             data['description'], data.get('image_url', ''), data.get('image_description', '')
         )
     try:
-        res = supabase.table('PROPERTIES')\
-            .select("*")\
-            .eq("property_id", property_id)\
-            .eq("owner_id", session['user_id'])\
-            .single().execute()
-        return jsonify({"property": res.data})
+        return jsonify({"property": repo.owner_property(property_id, g.principal.user_id)})
     except Exception:
         return jsonify({"property": None})
 
 @app.route('/api/view_amenities/<int:property_id>')
+@require_role('admin', owns="property_id")
+@http_cache.conditional(lambda property_id: stamps.get(f"property:{property_id}"))
 def view_amenities(property_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
     amenities = Admin.viewAmenities(property_id)
-    return jsonify({"amenities": amenities, "property_id": property_id})
+    return json_passthrough(amenities=amenities, property_id=property_id)
 
 @app.route('/api/add_amenities/<int:property_id>', methods=['POST'])
+@require_role('admin', owns="property_id")
 def add_amenities(property_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
     data = request.get_json()
     return Admin.addAmenity(property_id, data['amenity_name'], data['amenity_description'])
 
 @app.route('/api/delete_amenity/<int:amenity_id>', methods=['DELETE'])
+@require_role('admin', owns="amenity_id")
 def delete_amenity(amenity_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
     return Admin.deleteAmenity(amenity_id, None)
 
 @app.route('/api/edit_amenity/<int:amenity_id>', methods=['GET', 'PUT'])
+@require_role('admin', owns="amenity_id")
 def edit_amenity(amenity_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
     if request.method == 'PUT':
         data = request.get_json()
         return Admin.editAmenity(amenity_id, data['amenity_name'], data['amenity_description'], data.get('property_id'))
     try:
-        res = supabase.table('AMENITIES').select("*").eq("amenity_id", amenity_id).single().execute()
-        return jsonify({"amenity": res.data})
+        return jsonify({"amenity": repo.child_row('AMENITIES', amenity_id)})
     except Exception:
         return jsonify({"amenity": None})
 
 @app.route('/api/view_rooms/<int:property_id>')
+@require_role('admin', owns="property_id")
+@http_cache.conditional(lambda property_id: stamps.get(f"property:{property_id}"))
 def view_rooms(property_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-    rooms = Admin.viewRooms(property_id)
-    return jsonify({"rooms": rooms, "property_id": property_id})
+    rooms = Admin.viewRoomsJSON(property_id)
+    return json_passthrough(rooms=rooms, property_id=property_id)
 
 @app.route('/api/delete_room/<int:room_id>', methods=['DELETE'])
+@require_role('admin', owns="room_id")
 def delete_room(room_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
     return Admin.deleteRoom(room_id, None)
 
 @app.route('/api/add_room/<int:property_id>', methods=['POST'])
+@require_role('admin', owns="property_id")
 def add_room(property_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
     data = request.get_json()
     return Admin.addRoom(
         property_id, data['room_type'], data['capacity'],
@@ -749,10 +1731,8 @@ def add_room(property_id):
     )
 
 @app.route('/api/edit_room/<int:room_id>', methods=['GET', 'PUT'])
+@require_role('admin', owns="room_id")
 def edit_room(room_id):
-    if 'logged_in' not in session or session['role'] != 'admin':
-        return jsonify({"status": "error", "message": "Unauthorized"}), 401
-
     if request.method == 'PUT':
         data = request.get_json()
         return Admin.editRoom(
@@ -761,11 +1741,33 @@ def edit_room(room_id):
             data.get('property_id')
         )
     try:
-        res = supabase.table('ROOMS').select("*, PROPERTIES(property_id)").eq("room_id", room_id).single().execute()
-        return jsonify({"room": res.data})
+        room = require_row(repo.child_row('ROOMS', room_id))
+        room['PROPERTIES'] = {"property_id": room['property_id']}
+        return jsonify({"room": room})
     except Exception:
         return jsonify({"status": "error", "message": "Room not found."}), 404
 
+# Bulk create/update/delete: a JSON array or {"create": [...], "update": [...], "delete": [...]},
+# or a CSV / JSON Lines body or "file" upload. Rows with an id default to update, others to create.
+@app.route('/api/bulk_rooms/<int:property_id>', methods=['POST'])
+@require_role('admin', owns="property_id")
+def bulk_rooms(property_id):
+    try:
+        rows = parse_rows(request)
+    except BulkError as err:
+        return jsonify({"status": "error", "message": str(err)}), 400
+    return Admin.bulkRooms(property_id, rows)
+
+@app.route('/api/bulk_amenities/<int:property_id>', methods=['POST'])
+@require_role('admin', owns="property_id")
+def bulk_amenities(property_id):
+    try:
+        rows = parse_rows(request)
+    except BulkError as err:
+        return jsonify({"status": "error", "message": str(err)}), 400
+    return Admin.bulkAmenities(property_id, rows)
+
 if __name__ == '__main__':
+    warm_indexes()
     port = int(os.getenv("PORT", 5001))
     app.run(debug=True, port=port)
@@ -0,0 +1,291 @@
+# auth.py
+"""
+Request-scoped authentication and ownership checks.
+
+The principal (user_id, name, role) is resolved once per request and kept on flask.g.
+It comes from one of two places:
+
+- the Flask session cookie (default, AUTH_MODE=session), or
+- an `Authorization: Bearer <token>` header carrying a signed token. Login hands these
+  out when AUTH_MODE=token. A verified token is cached, so repeat requests skip the
+  HMAC check and payload decoding. Logout revokes the token in a store every worker
+  reads (create_revocations).
+
+Routes declare what they need with @auth_manager.require_role("admin", owns="room_id").
+The ownership check reads an OwnerMap instead of querying the database per request.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, jsonify, request, session
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+log = logging.getLogger(__name__)
+
+
+class Principal:
+    """The authenticated caller. `actor` is the matching Admin/Guest object, built once."""
+
+    __slots__ = ("user_id", "name", "role", "token", "_actor", "_factory")
+
+    def __init__(self, user_id, name, role, factory=None, token=None):
+        self.user_id = user_id
+        self.name = name
+        self.role = role
+        self.token = token
+        self._factory = factory
+        self._actor = None
+
+    @property
+    def actor(self):
+        if self._actor is None:
+            self._actor = self._factory(self)
+        return self._actor
+
+
+class _LRU:
+    """Small thread-safe LRU map with optional per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RevocationStore:
+    """
+    Revoked tokens in a SQLite file (AUTH_REVOCATIONS_PATH) shared by the gunicorn workers
+    of one machine, like the job queue. Rows are kept until the token would have expired
+    anyway. Replicas on other machines do not see these revocations; use Redis there.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS revoked_tokens (token_hash TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def revoke(self, token_hash, ttl):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO revoked_tokens VALUES (?, ?)", (token_hash, now + ttl))
+        conn.execute("DELETE FROM revoked_tokens WHERE expires_at < ?", (now,))
+
+    def is_revoked(self, token_hash):
+        row = self._connect().execute(
+            "SELECT 1 FROM revoked_tokens WHERE token_hash = ? AND expires_at >= ?", (token_hash, time.time())
+        ).fetchone()
+        return row is not None
+
+
+class RedisRevocations:
+    """Revoked tokens as expiring keys in the shared RedisCache: every worker and replica sees them."""
+
+    backend = "redis"
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def revoke(self, token_hash, ttl):
+        self._cache.set(f"revoked_token:{token_hash}", True, ttl=ttl)
+
+    def is_revoked(self, token_hash):
+        return self._cache.get(f"revoked_token:{token_hash}") is True
+
+
+def create_revocations(cache):
+    if cache.backend == "redis":
+        return RedisRevocations(cache)
+    return RevocationStore(os.getenv("AUTH_REVOCATIONS_PATH", os.path.join("data", "revocations.sqlite3")))
+
+
+class TokenVerifier:
+    """
+    Stateless signed tokens (itsdangerous, keyed by SECRET_KEY).
+
+    Verified tokens are cached per worker for `cache_seconds`; only a cache miss consults
+    the revocation store. After a logout, a worker that verified the token shortly before
+    keeps accepting it for at most `cache_seconds`; every other worker rejects it at once.
+    """
+
+    def __init__(self, secret, max_age, revocations, cache_seconds=60, max_entries=10000):
+        if not secret:
+            raise ValueError("TokenVerifier needs a non-empty secret; an empty HMAC key lets anyone mint tokens.")
+        self.max_age = max_age
+        self.cache_seconds = cache_seconds
+        self._serializer = URLSafeTimedSerializer(secret, salt="stayngo-auth")
+        self._verified = _LRU(max_entries)
+        self._revocations = revocations
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _hash(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def issue(self, user_id, name, role):
+        return self._serializer.dumps({"uid": user_id, "name": name, "role": role})
+
+    def verify(self, token):
+        """Returns the token's claims dict, or None when it is invalid, expired or revoked."""
+        claims = self._verified.get(token)
+        if claims is not None:
+            self.hits += 1
+            return claims
+        self.misses += 1
+        try:
+            claims = self._serializer.loads(token, max_age=self.max_age)
+        except BadSignature:
+            return None
+        if self._revocations.is_revoked(self._hash(token)):
+            return None
+        self._verified.set(token, claims, ttl=self.cache_seconds)
+        return claims
+
+    def revoke(self, token):
+        self._verified.pop(token)
+        self._revocations.revoke(self._hash(token), self.max_age)
+
+
+class OwnerMap:
+    """
+    Who owns what: property -> owner_id, room -> property_id, amenity -> property_id.
+
+    Entries are filled on first lookup through the given loaders. These links never
+    change after a row is created, so the entries need no expiry. Deleted rows are
+    dropped with forget().
+    """
+
+    def __init__(self, property_owner, room_property, amenity_property, max_entries=50000):
+        self._loaders = {"property": property_owner, "room": room_property, "amenity": amenity_property}
+        self._maps = {kind: _LRU(max_entries) for kind in self._loaders}
+
+    def _lookup(self, kind, key):
+        value = self._maps[kind].get(key)
+        if value is None:
+            value = self._loaders[kind](key)
+            if value is not None:
+                self._maps[kind].set(key, value)
+        return value
+
+    def remember(self, kind, key, parent):
+        if key is not None and parent is not None:
+            self._maps[kind].set(key, parent)
+
+    def forget(self, kind, key):
+        self._maps[kind].pop(key)
+
+    def property_owner(self, property_id):
+        return self._lookup("property", property_id)
+
+    def owns(self, user_id, kind, key):
+        """True when `user_id` owns the property that the property/room/amenity `key` belongs to."""
+        property_id = key if kind == "property" else self._lookup(kind, key)
+        return property_id is not None and self.property_owner(property_id) == user_id
+
+
+class AuthManager:
+    def __init__(self, verifier, owners, actor_factory, mode="session"):
+        self.verifier = verifier
+        self.owners = owners
+        self.actor_factory = actor_factory
+        self.mode = mode
+
+    def login(self, user_id, name, role):
+        """Records a successful login; returns a bearer token in token mode, else None."""
+        if self.mode == "token":
+            return self.verifier.issue(user_id, name, role)
+        session.permanent = True
+        session['logged_in'] = True
+        session['user_id'] = user_id
+        session['name'] = name
+        session['role'] = role
+        return None
+
+    def logout(self):
+        principal = self.current_principal()
+        if principal is not None and principal.token:
+            self.verifier.revoke(principal.token)
+
+    def current_principal(self):
+        """The caller for this request (resolved once and kept on flask.g), or None."""
+        if "principal" in g:
+            return g.principal
+        principal = None
+        header = request.headers.get("Authorization", "")
+        if header.startswith("Bearer "):
+            token = header[7:].strip()
+            claims = self.verifier.verify(token)
+            if claims is not None:
+                principal = Principal(claims["uid"], claims["name"], claims["role"], self.actor_factory, token)
+        elif session.get('logged_in'):
+            principal = Principal(session['user_id'], session['name'], session['role'], self.actor_factory)
+        g.principal = principal
+        return principal
+
+    def require_role(self, *roles, owns=None):
+        """
+        Rejects the request with 401 unless the caller is logged in (with one of `roles`,
+        when given). owns="property_id" | "room_id" | "amenity_id" also requires the caller
+        to own the property behind that URL parameter (403 otherwise).
+        """
+        kind = owns[:-3] if owns else None
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                principal = self.current_principal()
+                if principal is None or (roles and principal.role not in roles):
+                    return jsonify({"status": "error", "message": "Unauthorized"}), 401
+                if kind:
+                    try:
+                        allowed = self.owners.owns(principal.user_id, kind, kwargs[owns])
+                    except Exception as err:
+                        log.warning("Ownership lookup failed: %s", err)
+                        return jsonify({"status": "error", "message": "Could not verify ownership."}), 500
+                    if not allowed:
+                        return jsonify({"status": "error", "message": "Not found or no permission."}), 403
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
@@ -0,0 +1,191 @@
+# availability.py
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from warm_index import WarmIndex
+
+
+def _day(value):
+    """Accepts a date, datetime or 'YYYY-MM-DD' string and returns its ordinal."""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10]).toordinal()
+    if hasattr(value, "date"):
+        value = value.date()
+    return value.toordinal()
+
+
+def _iso(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+
+class RoomAvailabilityIndex(WarmIndex):
+    """
+    Per-room sorted arrays of booked [check_in, check_out) intervals.
+
+    Bookings of one room never overlap, so starts and ends are both sorted and a
+    bisect on the starts answers overlap, occupancy and free-window questions in
+    O(log n) per room. Only bookings that have not checked out yet are loaded.
+    """
+
+    def __init__(self, refresh_seconds=60, bitmap=None):
+        super().__init__(refresh_seconds)
+        self.bitmap = bitmap  # optional OccupancyBitmap kept in step with this index
+        self._journal = None
+        self._reset()
+
+    def _reset(self):
+        self._starts = {}     # room_id -> [check_in ordinal]
+        self._ends = {}       # room_id -> [check_out ordinal]
+        self._ids = {}        # room_id -> [booking_id]
+        self._bookings = {}   # booking_id -> (room_id, check_in ordinal)
+
+    def _refresh(self, loader):
+        # A booking written while loader() reads may or may not be in its result. Writes are
+        # journaled from before the read and replayed once the new arrays are in; add() and
+        # remove() are idempotent, so a booking the read already saw is not doubled.
+        with self._lock:
+            self._journal = []
+        try:
+            super()._refresh(loader)
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def _record(self, method, *args):
+        """Journals a write made during a refresh (call with the lock held)."""
+        if self._journal is not None:
+            self._journal.append((method, args))
+
+    def load(self, bookings):
+        with self._lock:
+            self._reset()
+            for row in sorted(bookings, key=lambda b: b["check_in_date"]):
+                room_id = row["room_id"]
+                self._starts.setdefault(room_id, []).append(_day(row["check_in_date"]))
+                self._ends.setdefault(room_id, []).append(_day(row["check_out_date"]))
+                self._ids.setdefault(room_id, []).append(row["booking_id"])
+                self._bookings[row["booking_id"]] = (room_id, _day(row["check_in_date"]))
+            if self.bitmap is not None:
+                self.bitmap.load(bookings)
+            self._loaded_at = time.monotonic()
+            journal, self._journal = self._journal or [], None
+            for method, args in journal:
+                method(*args)
+            self._changed()
+
+    # ------------------------------
+    # Maintenance (booking create / cancel)
+    # ------------------------------
+    def add(self, booking_id, room_id, check_in, check_out):
+        start, end = _day(check_in), _day(check_out)
+        with self._lock:
+            self._record(self.add, booking_id, room_id, check_in, check_out)
+            if not self.loaded or booking_id in self._bookings:
+                return
+            starts = self._starts.setdefault(room_id, [])
+            pos = bisect_right(starts, start)
+            starts.insert(pos, start)
+            self._ends.setdefault(room_id, []).insert(pos, end)
+            self._ids.setdefault(room_id, []).insert(pos, booking_id)
+            self._bookings[booking_id] = (room_id, start)
+            if self.bitmap is not None:
+                self.bitmap.add(booking_id, room_id, check_in, check_out)
+            self._changed()
+
+    def remove(self, booking_id):
+        with self._lock:
+            self._record(self.remove, booking_id)
+            if not self.loaded:
+                return
+            if self.bitmap is not None:
+                self.bitmap.remove(booking_id)
+            entry = self._bookings.pop(booking_id, None)
+            if not entry:
+                return
+            room_id, start = entry
+            starts, ids = self._starts[room_id], self._ids[room_id]
+            pos = bisect_left(starts, start)
+            while pos < len(ids) and ids[pos] != booking_id:
+                pos += 1
+            if pos < len(ids):
+                del starts[pos], self._ends[room_id][pos], ids[pos]
+            self._changed()
+
+    # ------------------------------
+    # Queries
+    # ------------------------------
+    def is_free(self, room_id, check_in, check_out):
+        """True when no booking overlaps [check_in, check_out)."""
+        start, end = _day(check_in), _day(check_out)
+        with self._lock:
+            starts = self._starts.get(room_id)
+            if not starts:
+                return True
+            # Last booking that starts before the requested check-out is the only candidate
+            pos = bisect_left(starts, end) - 1
+            return pos < 0 or self._ends[room_id][pos] <= start
+
+    def booking_on(self, room_id, day):
+        """booking_id occupying the night of `day`, or None."""
+        target = _day(day)
+        with self._lock:
+            starts = self._starts.get(room_id)
+            if not starts:
+                return None
+            pos = bisect_right(starts, target) - 1
+            if pos >= 0 and self._ends[room_id][pos] > target:
+                return self._ids[room_id][pos]
+            return None
+
+    def next_free_window(self, room_id, start, nights):
+        """Earliest (check_in, check_out) on or after `start` with `nights` free nights."""
+        candidate = _day(start)
+        with self._lock:
+            starts, ends = self._starts.get(room_id, []), self._ends.get(room_id, [])
+            pos = bisect_right(ends, candidate)  # first booking still running at `candidate`
+            while pos < len(starts) and starts[pos] < candidate + nights:
+                candidate = max(candidate, ends[pos])
+                pos += 1
+        return _iso(candidate), _iso(candidate + nights)
+
+    def occupancy_on(self, room_ids, day):
+        """Set of the given rooms that are occupied on the night of `day`."""
+        return {room_id for room_id in room_ids if self.booking_on(room_id, day) is not None}
+
+    def free_rooms(self, room_ids, check_in, check_out):
+        return [room_id for room_id in room_ids if self.is_free(room_id, check_in, check_out)]
+
+
+
+class OccupancySnapshotCache:
+    """
+    Per-property set of room ids occupied on a given night.
+
+    Entries are dropped on booking writes for the property; the TTL bounds how
+    long a booking made on another worker can go unseen.
+    """
+
+    def __init__(self, ttl_seconds=30):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}  # property_id -> (day, room_ids, stored_at)
+
+    def get(self, property_id, day):
+        with self._lock:
+            entry = self._entries.get(property_id)
+        if not entry:
+            return None
+        cached_day, room_ids, stored_at = entry
+        if cached_day != day or time.monotonic() - stored_at > self.ttl_seconds:
+            return None
+        return room_ids
+
+    def put(self, property_id, day, room_ids):
+        with self._lock:
+            self._entries[property_id] = (day, frozenset(room_ids), time.monotonic())
+
+    def invalidate(self, property_id):
+        with self._lock:
+            self._entries.pop(property_id, None)
@@ -0,0 +1,18 @@
+# backfill_dashboard.py
+import os
+from dotenv import load_dotenv
+from supabase import create_client
+
+load_dotenv()
+
+def backfill_dashboard_stats():
+    print("Rebuilding PROPERTY_STATS and PROPERTY_DAILY_STATS from ROOMS and BOOKINGS...")
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    try:
+        result = supabase.rpc('backfill_dashboard_stats', {}).execute()
+        print(f"Dashboard stats rebuilt: {result.data}")
+    except Exception as e:
+        print(f"Error during backfill: {str(e)}")
+
+if __name__ == "__main__":
+    backfill_dashboard_stats()
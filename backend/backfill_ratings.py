@@ -0,0 +1,18 @@
+# backfill_ratings.py
+import os
+from dotenv import load_dotenv
+from supabase import create_client
+
+load_dotenv()
+
+def backfill_rating_aggregates():
+    print("Rebuilding ROOM_RATINGS and PROPERTY_RATINGS from REVIEWS...")
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    try:
+        result = supabase.rpc('backfill_rating_aggregates', {}).execute()
+        print(f"Rating aggregates rebuilt: {result.data}")
+    except Exception as e:
+        print(f"Error during backfill: {str(e)}")
+
+if __name__ == "__main__":
+    backfill_rating_aggregates()
@@ -0,0 +1,410 @@
+# benchmark.py
+"""
+End-to-end latency baseline for the main routes.
+
+Seeds a synthetic SQLite database (DATA_BACKEND=sqlite, see repository.py), then drives
+the Flask app through its test client and reports p50/p95/p99 wall time and the mean CPU
+time per route. The full request path runs: auth, caches, in-process indexes and the
+repository queries.
+
+    python benchmark.py --scale 10000 --output baseline.json
+    python benchmark.py --scale 10000 --baseline baseline.json     # after a change
+
+PostgREST against direct Postgres on the same (already seeded) database:
+
+    python benchmark.py --backend supabase --property 12 --room 40 --guest 7 --output rest.json
+    python benchmark.py --backend postgres --property 12 --room 40 --guest 7 --baseline rest.json
+
+Response size and conditional GET, as a browser repeating the same page loads would see them:
+
+    python benchmark.py --encoding identity --output plain.json
+    python benchmark.py --encoding br --revalidate --baseline plain.json
+
+--encoding sets Accept-Encoding; --revalidate replays each route's last ETag in
+If-None-Match. "bytes" is the mean response body size on the wire and "304s" the share of
+requests answered Not Modified.
+
+JSON encoding of large bodies: a property with 10k rooms and an owner with 10k properties,
+with the stdlib encoder and with orjson (JSON_ENCODER, see responses.py):
+
+    python benchmark.py --scale 10000 --rooms-per-property 10000 --db rooms.db --output rooms.json
+    JSON_ENCODER=stdlib python benchmark.py --db rooms.db --reuse --baseline rooms.json
+    python benchmark.py --scale 100000 --properties-per-owner 10000 --routes dashboard
+
+Admin room status as the platform's booking count grows from 1k to 1M (2 per room).
+ROOM_STATUS_SNAPSHOT_SECONDS=0 turns the occupancy snapshot off, so every request queries:
+
+    for scale in 500 5000 50000 500000; do
+        ROOM_STATUS_SNAPSHOT_SECONDS=0 python benchmark.py --scale $scale --routes room_status --iterations 500
+    done
+
+Owner dashboard summary for an owner with 500 properties (target: under 100 ms):
+
+    python benchmark.py --scale 5000 --properties-per-owner 500 --routes dashboard_summary
+
+Deleting a large property (Admin.deleteProperty): seeds one extra property of the admin with
+1k rooms and 100 bookings per room (each with a payment) and a review per room, then times
+the archive (instant soft delete) and the purge (the full graph in one transaction):
+
+    python benchmark.py --scale 1000 --delete-graph 1000x100
+    python benchmark.py --backend postgres --property 12 --room 40 --guest 7 --delete-graph 1000x100
+
+--scale is the number of rooms (--rooms-per-property per property, default 10; 2 bookings
+and 1 review per room).
+SUPABASE_URL/SUPABASE_KEY must still be set because the app creates its Auth and Storage
+clients at import time; no request in the benchmark reaches them.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOMS_PER_PROPERTY = 10
+PROPERTIES_PER_OWNER = 5
+ROOM_TYPES = ("Single", "Double", "Suite", "Family")
+CITIES = [("Mumbai", "Maharashtra"), ("Pune", "Maharashtra"), ("Bengaluru", "Karnataka"),
+          ("Chennai", "Tamil Nadu"), ("Jaipur", "Rajasthan"), ("Goa", "Goa"), ("Delhi", "Delhi")]
+
+
+def seed(path, scale, rng, rooms_per_property=ROOMS_PER_PROPERTY, properties_per_owner=PROPERTIES_PER_OWNER):
+    """Writes `scale` rooms and their properties, owners, guests, bookings and reviews."""
+    from sql_repository import SQLiteRepository
+    SQLiteRepository(path)  # creates the schema
+
+    properties = max(scale // rooms_per_property, 1)
+    owners = max(properties // properties_per_owner, 1)
+    guests = max(scale // 20, 10)
+    today = date.today()
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("BEGIN")
+    conn.executemany(
+        'INSERT INTO "USERS" (user_id, name, email, role) VALUES (?, ?, ?, ?)',
+        ((i, f"Owner {i}", f"owner{i}@example.com", "admin") for i in range(1, owners + 1))
+    )
+    conn.executemany(
+        'INSERT INTO "USERS" (user_id, name, email, role) VALUES (?, ?, ?, ?)',
+        ((owners + i, f"Guest {i}", f"guest{i}@example.com", "user") for i in range(1, guests + 1))
+    )
+
+    def property_rows():
+        for pid in range(1, properties + 1):
+            city, state = CITIES[pid % len(CITIES)]
+            yield (pid, (pid - 1) % owners + 1, f"{pid} Main Road", city, state, "India",
+                   f"Property {pid} in {city}", "")
+    conn.executemany(
+        'INSERT INTO "PROPERTIES" (property_id, owner_id, address, city, state, country, description, image_url) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', property_rows()
+    )
+    conn.executemany(
+        'INSERT INTO "AMENITIES" (property_id, name, description) VALUES (?, ?, ?)',
+        ((pid, name, name) for pid in range(1, properties + 1) for name in ("WiFi", "Parking"))
+    )
+    conn.executemany(
+        'INSERT INTO "ROOMS" (room_id, property_id, room_type, capacity, price_per_night, availability_status) '
+        'VALUES (?, ?, ?, ?, ?, 1)',
+        ((rid, min((rid - 1) // rooms_per_property + 1, properties), rng.choice(ROOM_TYPES), rng.randint(1, 6),
+          rng.randrange(1500, 15000, 100)) for rid in range(1, scale + 1))
+    )
+
+    # One stay that has ended and one in the next two months per room, so they never overlap
+    def booking_rows():
+        for rid in range(1, scale + 1):
+            price = 2000 * rng.randint(1, 5)
+            for start in (today - timedelta(days=rng.randint(10, 40)), today + timedelta(days=rng.randint(0, 60))):
+                nights = rng.randint(1, 5)
+                yield (owners + rng.randint(1, guests), rid, start.isoformat(),
+                       (start + timedelta(days=nights)).isoformat(), price * nights)
+    conn.executemany(
+        'INSERT INTO "BOOKINGS" (user_id, room_id, check_in_date, check_out_date, total_price) VALUES (?, ?, ?, ?, ?)',
+        booking_rows()
+    )
+
+    def review_rows():
+        for rid in range(1, scale + 1):
+            created = datetime.now() - timedelta(minutes=rng.randint(1, 525600))
+            yield (rid, owners + rng.randint(1, guests), rng.randint(1, 5), "Synthetic review", created.isoformat())
+    conn.executemany(
+        'INSERT INTO "REVIEWS" (room_id, user_id, rating, comment, created_at) VALUES (?, ?, ?, ?, ?)',
+        review_rows()
+    )
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    conn.close()
+    return {"properties": properties, "owners": owners, "guests": guests, "rooms": scale,
+            "bookings": 2 * scale, "reviews": scale}
+
+
+class Browser:
+    """Test client that sends Accept-Encoding and, like a browser cache, revalidates with the last ETag."""
+
+    def __init__(self, client, encoding=None, revalidate=False):
+        self.client = client
+        self.encoding = encoding
+        self.revalidate = revalidate
+        self.etags = {}
+
+    def get(self, url, headers=None):
+        headers = dict(headers or {})
+        if self.encoding:
+            headers["Accept-Encoding"] = self.encoding
+        if self.revalidate and url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        response = self.client.get(url, headers=headers)
+        if response.status_code == 200 and response.headers.get("ETag"):
+            self.etags[url] = response.headers["ETag"]
+        return response
+
+    def post(self, url, **kwargs):
+        return self.client.post(url, **kwargs)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def measure(call, iterations, warmup):
+    for _ in range(warmup):
+        call()
+    samples, cpu, sent, not_modified = [], 0.0, 0, 0
+    for _ in range(iterations):
+        started, started_cpu = time.perf_counter(), time.thread_time()
+        response = call()
+        samples.append((time.perf_counter() - started) * 1000)
+        cpu += time.thread_time() - started_cpu
+        sent += len(response.get_data())
+        not_modified += response.status_code == 304
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return {
+        "n": iterations,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        "cpu_ms": round(cpu / iterations * 1000, 3),
+        "bytes": round(sent / iterations),
+        "not_modified": round(not_modified / iterations, 3),
+    }
+
+
+def scenarios(client, admin, guest, owner_property, room_id, city):
+    """name -> zero-argument callable issuing one request."""
+    admin_headers = {"Authorization": f"Bearer {admin}"}
+    guest_headers = {"Authorization": f"Bearer {guest}"}
+    today = date.today()
+    check_in = (today + timedelta(days=90)).isoformat()
+    check_out = (today + timedelta(days=93)).isoformat()
+
+    def book_and_cancel():
+        response = client.post(
+            f"/api/book_room/{room_id}/{owner_property}", headers=guest_headers,
+            json={"check_in_date": check_in, "check_out_date": check_out, "payment_method": "card"}
+        )
+        booking_id = (response.get_json() or {}).get("booking_id")
+        if booking_id:
+            client.post(f"/api/cancel_booking/{booking_id}", headers=guest_headers)
+        return response
+
+    return {
+        "search": lambda: client.get(f"/api/user_dashboard?city={city}&limit=20", headers=guest_headers),
+        "search_dates": lambda: client.get(
+            f"/api/user_dashboard?city={city}&check_in={check_in}&check_out={check_out}&guests=2",
+            headers=guest_headers),
+        "property_details": lambda: client.get(f"/api/view_more/{owner_property}", headers=guest_headers),
+        "room_reviews": lambda: client.get(f"/api/room_reviews/{room_id}", headers=guest_headers),
+        "my_bookings": lambda: client.get("/api/my_bookings?scope=upcoming", headers=guest_headers),
+        "free_rooms": lambda: client.get(
+            f"/api/free_rooms/{owner_property}?check_in={check_in}&check_out={check_out}", headers=guest_headers),
+        "availability": lambda: client.get(f"/api/availability/{owner_property}?months=3", headers=guest_headers),
+        "book_and_cancel": book_and_cancel,
+        "dashboard": lambda: client.get("/api/dashboard", headers=admin_headers),
+        "dashboard_summary": lambda: client.get("/api/dashboard_summary", headers=admin_headers),
+        "room_status": lambda: client.get(f"/api/room_status/{owner_property}", headers=admin_headers),
+        "view_rooms": lambda: client.get(f"/api/view_rooms/{owner_property}", headers=admin_headers),
+        "view_amenities": lambda: client.get(f"/api/view_amenities/{owner_property}", headers=admin_headers),
+    }
+
+
+def delete_graph(repo, owner_id, guest_id, rooms, bookings_per_room):
+    """Seeds one property of `owner_id` with its rooms, bookings, payments and reviews, then
+    archives and purges it through the repository; returns the timings."""
+    from bulk import chunks
+    started = time.perf_counter()
+    with repo._transaction() as cur:
+        property_id = repo._insert("PROPERTIES", [{
+            "owner_id": owner_id, "address": "1 Purge Road", "city": "Pune", "state": "Maharashtra",
+            "country": "India", "description": "delete benchmark"}], cur)[0]["property_id"]
+        room_ids = [row["room_id"] for row in repo._insert("ROOMS", [
+            {"property_id": property_id, "room_type": "Double", "capacity": 2, "price_per_night": 2000,
+             "availability_status": True} for _ in range(rooms)], cur)]
+        first = date(2030, 1, 1)
+        bookings = [{"user_id": guest_id, "room_id": room_id,
+                     "check_in_date": (first + timedelta(days=2 * n)).isoformat(),
+                     "check_out_date": (first + timedelta(days=2 * n + 1)).isoformat(), "total_price": 2000}
+                    for room_id in room_ids for n in range(bookings_per_room)]
+        for chunk in chunks(bookings, 1000):
+            booking_ids = [row["booking_id"] for row in repo._insert("BOOKINGS", chunk, cur)]
+            repo._insert("PAYMENTS", [{"booking_id": booking_id, "payment_method": "card", "amount": 2000,
+                                       "payment_status": "completed", "payment_date": "2030-01-01"}
+                                      for booking_id in booking_ids], cur)
+        repo._insert("REVIEWS", [{"room_id": room_id, "user_id": guest_id, "rating": 4, "comment": "ok"}
+                                 for room_id in room_ids], cur)
+    seeded = time.perf_counter() - started
+
+    started = time.perf_counter()
+    repo.delete_property(property_id, owner_id)
+    archive_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    purged = repo.delete_property(property_id, owner_id, purge=True)
+    purge_ms = (time.perf_counter() - started) * 1000
+    return {"property_id": property_id, "seed_s": round(seeded, 1), "archive_ms": round(archive_ms, 1),
+            "purge_ms": round(purge_ms, 1),
+            "purged": {key: purged.get(key) for key in ("bookings", "payments", "reviews", "amenities")}}
+
+
+def compare(results, baseline):
+    keys = ("p50_ms", "p95_ms", "cpu_ms", "bytes")
+    print("\n" + f"{'route':<20}" + "".join(f"{key.replace('_', ' '):>10}{'base':>10}{'delta':>9}" for key in keys))
+    for name, stats in results["routes"].items():
+        base = baseline.get("routes", {}).get(name)
+        if not base:
+            print(f"{name:<20}" + "".join(f"{stats[key]:>10}{'-':>10}{'':>9}" for key in keys))
+            continue
+        cells = []
+        for key in keys:
+            if key not in base:
+                cells.append(f"{stats[key]:>10}{'-':>10}{'':>9}")
+                continue
+            delta = (stats[key] - base[key]) / base[key] * 100 if base[key] else 0
+            cells.append(f"{stats[key]:>10}{base[key]:>10}{delta:>+8.1f}%")
+        print(f"{name:<20}{''.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StayNGo route latency benchmark")
+    parser.add_argument("--backend", choices=("sqlite", "postgres", "supabase"), default="sqlite",
+                        help="data layer to benchmark; only sqlite is seeded by this script")
+    parser.add_argument("--scale", type=int, default=1000, help="number of rooms to seed (10^3 - 10^6)")
+    parser.add_argument("--iterations", type=int, default=200, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per route first")
+    parser.add_argument("--routes", help="comma separated subset of routes to run")
+    parser.add_argument("--db", help="SQLite file to seed (default: a temporary directory)")
+    parser.add_argument("--reuse", action="store_true", help="benchmark an already seeded --db")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the synthetic data")
+    parser.add_argument("--rooms-per-property", type=int, default=ROOMS_PER_PROPERTY,
+                        help="rooms per seeded property (view_rooms body size)")
+    parser.add_argument("--properties-per-owner", type=int, default=PROPERTIES_PER_OWNER,
+                        help="properties per seeded owner (dashboard body size)")
+    parser.add_argument("--property", type=int, help="property to use (postgres/supabase); its owner is the admin")
+    parser.add_argument("--room", type=int, help="room of --property to book and read reviews of")
+    parser.add_argument("--guest", type=int, help="guest user_id for the guest routes")
+    parser.add_argument("--encoding", help="Accept-Encoding to send, e.g. br, gzip or identity")
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match with each route's last ETag")
+    parser.add_argument("--delete-graph", metavar="ROOMSxBOOKINGS",
+                        help="time archiving and purging a property of ROOMS rooms with BOOKINGS bookings each")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="stayngo-bench-")
+    counts = None
+    if args.backend == "sqlite":
+        path = args.db or os.path.join(workdir, "stayngo.sqlite3")
+        if not args.reuse:
+            if os.path.exists(path):
+                sys.exit(f"{path} exists; pass --reuse to benchmark it as is")
+            started = time.perf_counter()
+            counts = seed(path, args.scale, rng, args.rooms_per_property, args.properties_per_owner)
+            print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+        os.environ["SQLITE_PATH"] = path
+    elif None in (args.property, args.room, args.guest):
+        sys.exit("--property, --room and --guest are required with --backend postgres/supabase")
+
+    # The app reads its configuration at import time
+    os.environ["DATA_BACKEND"] = args.backend
+    os.environ["AUTH_MODE"] = "token"
+    os.environ.setdefault("JOB_QUEUE_PATH", os.path.join(workdir, "jobs.sqlite3"))
+    import app as stayngo
+
+    if args.backend == "sqlite":
+        conn = sqlite3.connect(path)
+        owner_property = args.property or conn.execute(
+            'SELECT MIN(property_id) FROM "PROPERTIES" WHERE deleted_at IS NULL').fetchone()[0]
+        room_id = args.room or conn.execute(
+            'SELECT MIN(room_id) FROM "ROOMS" WHERE property_id = ?', (owner_property,)).fetchone()[0]
+        guest_id = args.guest or conn.execute(
+            'SELECT u.user_id FROM "USERS" u JOIN "BOOKINGS" b ON b.user_id = u.user_id '
+            'WHERE u.role = ? GROUP BY u.user_id ORDER BY COUNT(*) DESC LIMIT 1', ("user",)).fetchone()[0]
+        conn.close()
+    else:
+        owner_property, room_id, guest_id = args.property, args.room, args.guest
+
+    repo = stayngo.repo
+    owner_id = repo.property_owner(owner_property)
+    if owner_id is None or repo.room_property(room_id) != owner_property:
+        sys.exit(f"Room {room_id} of property {owner_property} not found")
+    owner, guest_user = repo.user_contact(owner_id), repo.user_contact(guest_id)
+    search_city = repo.owner_property(owner_property, owner_id)["city"]
+
+    if args.delete_graph:
+        if args.backend == "supabase":
+            sys.exit("--delete-graph seeds through SQL; use --backend sqlite or postgres")
+        rooms, bookings_per_room = (int(n) for n in args.delete_graph.lower().split("x"))
+        stats = delete_graph(repo, owner_id, guest_id, rooms, bookings_per_room)
+        print(f"{rooms} rooms x {bookings_per_room} bookings: seeded in {stats['seed_s']}s, "
+              f"archive {stats['archive_ms']} ms, purge {stats['purge_ms']} ms ({stats['purged']})")
+        return
+
+    issue = stayngo.auth_manager.verifier.issue
+    admin = issue(owner_id, owner["name"], "admin")
+    guest = issue(guest_id, guest_user["name"], "user")
+    client = Browser(stayngo.app.test_client(), args.encoding, args.revalidate)
+
+    routes = scenarios(client, admin, guest, owner_property, room_id, search_city)
+    if args.routes:
+        wanted = [name.strip() for name in args.routes.split(",")]
+        unknown = [name for name in wanted if name not in routes]
+        if unknown:
+            sys.exit(f"Unknown route(s): {', '.join(unknown)}. Available: {', '.join(routes)}")
+        routes = {name: routes[name] for name in wanted}
+
+    results = {
+        "backend": args.backend,
+        "scale": args.scale if counts else None,
+        "counts": counts,
+        "iterations": args.iterations,
+        "encoding": args.encoding,
+        "json_encoder": stayngo.app.json.encoder,
+        "revalidate": args.revalidate,
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "routes": {},
+    }
+    for name, call in routes.items():
+        results["routes"][name] = stats = measure(call, args.iterations, args.warmup)
+        print(f"{name:<20} p50 {stats['p50_ms']:>8} ms  p95 {stats['p95_ms']:>8} ms  p99 {stats['p99_ms']:>8} ms"
+              f"  cpu {stats['cpu_ms']:>8} ms  {stats['bytes']:>8} bytes  304s {stats['not_modified']:.0%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
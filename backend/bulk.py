@@ -0,0 +1,151 @@
+# bulk.py
+import csv
+import io
+import json
+import math
+
+BULK_MAX_ROWS = 5000
+BULK_WRITE_CHUNK = 500
+
+OPS = ("create", "update", "delete")
+
+_TRUE = {"1", "true", "yes", "y", "t"}
+_FALSE = {"0", "false", "no", "n", "f", ""}
+
+
+class BulkError(ValueError):
+    """The payload as a whole could not be read (bad format, too many rows)."""
+
+
+def parse_rows(req):
+    """
+    Reads bulk rows from a request as a list of dicts. Accepted:
+    - JSON: an array of rows, or {"create": [...], "update": [...], "delete": [...]}
+    - CSV (text/csv) or JSON Lines (application/x-ndjson), as the raw body or
+      as a multipart "file" upload (format taken from the file extension)
+    """
+    upload = req.files.get("file")
+    if upload is not None:
+        name = (upload.filename or "").lower()
+        text = upload.stream.read().decode("utf-8-sig")
+        kind = "csv" if name.endswith(".csv") else "jsonl" if name.endswith((".jsonl", ".ndjson")) else "json"
+    else:
+        mimetype = req.mimetype or ""
+        text = req.get_data(as_text=True)
+        kind = "csv" if mimetype == "text/csv" else "jsonl" if mimetype in ("application/x-ndjson", "application/jsonl") else "json"
+
+    try:
+        if kind == "csv":
+            rows = [dict(row) for row in csv.DictReader(io.StringIO(text))]
+        elif kind == "jsonl":
+            rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            rows = _from_json(json.loads(text or "null"))
+    except (ValueError, csv.Error) as err:
+        raise BulkError(f"Could not parse {kind.upper()} payload: {err}")
+
+    if not rows:
+        raise BulkError("No rows provided.")
+    if len(rows) > BULK_MAX_ROWS:
+        raise BulkError(f"At most {BULK_MAX_ROWS} rows per request.")
+    if not all(isinstance(row, dict) for row in rows):
+        raise BulkError("Every row must be an object.")
+    return rows
+
+
+def _from_json(data):
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        rows = []
+        for op in OPS:
+            for row in data.get(op) or []:
+                # Deletes may be given as bare ids
+                rows.append({**row, "op": op} if isinstance(row, dict) else {"op": op, "id": row})
+        return rows
+    raise BulkError("Expected an array of rows or an object with create/update/delete lists.")
+
+
+def _op(row, id_field):
+    op = row.get("op")
+    if op is not None and not isinstance(op, str):
+        raise ValueError(f"op must be one of: {', '.join(OPS)}")
+    op = (op or "").strip().lower()
+    if not op:
+        op = "update" if row.get(id_field) not in (None, "") else "create"
+    if op not in OPS:
+        raise ValueError(f"op must be one of: {', '.join(OPS)}")
+    return op
+
+
+def _id(row, id_field):
+    value = row.get(id_field, row.get("id"))
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{id_field} is required for update/delete")
+
+
+def _bool(value, default=True):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"invalid boolean: {value!r}")
+
+
+def _text(row, *names, required=True):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ""):
+            return str(value).strip()
+    if required:
+        raise ValueError(f"{names[0]} is required")
+    return None
+
+
+def validate_room(row):
+    """Returns (op, room_id or None, column values) or raises ValueError with the reason."""
+    op = _op(row, "room_id")
+    room_id = None if op == "create" else _id(row, "room_id")
+    if op == "delete":
+        return op, room_id, None
+    try:
+        capacity = int(row.get("capacity"))
+        price = float(row.get("price_per_night"))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("capacity and price_per_night must be numbers")
+    if not math.isfinite(price):
+        raise ValueError("price_per_night must be a finite number")
+    if capacity <= 0 or price < 0:
+        raise ValueError("capacity must be positive and price_per_night non-negative")
+    values = {
+        "room_type": _text(row, "room_type"),
+        "capacity": capacity,
+        "price_per_night": price,
+        "availability_status": _bool(row.get("availability_status")),
+    }
+    return op, room_id, values
+
+
+def validate_amenity(row):
+    """Same as validate_room for AMENITIES (accepts name/description or the amenity_* form names)."""
+    op = _op(row, "amenity_id")
+    amenity_id = None if op == "create" else _id(row, "amenity_id")
+    if op == "delete":
+        return op, amenity_id, None
+    values = {
+        "name": _text(row, "amenity_name", "name"),
+        "description": _text(row, "amenity_description", "description", required=False) or "",
+    }
+    return op, amenity_id, values
+
+
+def chunks(items, size=BULK_WRITE_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
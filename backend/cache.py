@@ -0,0 +1,184 @@
+# cache.py
+"""
+Read-through cache for hot, rarely-changing Supabase reads (properties, rooms, amenities).
+
+Backends
+--------
+- LocalCache: in-process LRU with TTL. Each gunicorn worker (3 per pod x 2 replicas) holds
+  its own copy, so an invalidation only reaches the worker that handled the write; every
+  other worker can serve the old value until its entry expires. Staleness is therefore
+  bounded by CACHE_TTL_SECONDS.
+- RedisCache: selected when REDIS_URL is set. All workers and replicas share one store, so
+  an invalidation is visible to every worker as soon as the DEL returns. Any server that
+  speaks the Redis protocol (Redis, KeyDB, Dragonfly, a local redis-server) works.
+
+Values handed out by LocalCache are shared between requests and must be treated as read-only.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+MISS = object()
+
+
+class CacheStats:
+    """Hit/miss counters per key namespace (the part before the first ':')."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_namespace = {}
+
+    def record(self, key, hit, seconds):
+        namespace = key.split(":", 1)[0]
+        with self._lock:
+            s = self._by_namespace.setdefault(namespace, {"hits": 0, "misses": 0, "hit_seconds": 0.0, "miss_seconds": 0.0})
+            if hit:
+                s["hits"] += 1
+                s["hit_seconds"] += seconds
+            else:
+                s["misses"] += 1
+                s["miss_seconds"] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            namespaces = {k: dict(v) for k, v in self._by_namespace.items()}
+        report, hits, misses = {}, 0, 0
+        for namespace, s in namespaces.items():
+            total = s["hits"] + s["misses"]
+            avg_hit_ms = s["hit_seconds"] * 1000 / s["hits"] if s["hits"] else 0.0
+            avg_miss_ms = s["miss_seconds"] * 1000 / s["misses"] if s["misses"] else 0.0
+            report[namespace] = {
+                "hits": s["hits"],
+                "misses": s["misses"],
+                "hit_ratio": round(s["hits"] / total, 4) if total else 0.0,
+                "avg_hit_ms": round(avg_hit_ms, 3),
+                "avg_miss_ms": round(avg_miss_ms, 3),
+                # Upstream time not spent thanks to hits, estimated from the average miss
+                "saved_ms": round(s["hits"] * max(avg_miss_ms - avg_hit_ms, 0.0), 1),
+            }
+            hits += s["hits"]
+            misses += s["misses"]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "namespaces": report,
+        }
+
+
+class BaseCache:
+    backend = None
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Returns the cached value or calls loader() and stores the result. Loader errors are not cached."""
+        started = time.perf_counter()
+        value = self.get(key)
+        if value is not MISS:
+            self.stats.record(key, True, time.perf_counter() - started)
+            return value
+        value = loader()
+        self.set(key, value, ttl)
+        self.stats.record(key, False, time.perf_counter() - started)
+        return value
+
+    def report(self):
+        return {"backend": self.backend, "ttl_seconds": self.ttl_seconds, **self.stats.snapshot()}
+
+
+class LocalCache(BaseCache):
+    backend = "local"
+
+    def __init__(self, ttl_seconds=60, max_entries=10000):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def report(self):
+        return {**super().report(), "size": len(self._entries), "max_entries": self.max_entries}
+
+
+class RedisCache(BaseCache):
+    backend = "redis"
+
+    def __init__(self, url, ttl_seconds=60, prefix="stayngo:"):
+        super().__init__(ttl_seconds)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("REDIS_URL is set but the 'redis' package is not installed.")
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    # A Redis outage degrades to uncached reads instead of failing requests
+    def get(self, key):
+        try:
+            raw = self._client.get(self.prefix + key)
+        except Exception as err:
+            log.warning("Redis get failed: %s", err)
+            return MISS
+        return MISS if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        try:
+            self._client.set(self.prefix + key, json.dumps(value, default=str), ex=ttl or self.ttl_seconds)
+        except Exception as err:
+            log.warning("Redis set failed: %s", err)
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self._client.delete(*[self.prefix + key for key in keys])
+        except Exception as err:
+            log.warning("Redis delete failed: %s", err)
+
+
+def create_cache():
+    ttl = int(os.getenv("CACHE_TTL_SECONDS", 60))
+    if os.getenv("REDIS_URL"):
+        return RedisCache(os.getenv("REDIS_URL"), ttl_seconds=ttl)
+    return LocalCache(ttl_seconds=ttl, max_entries=int(os.getenv("CACHE_MAX_ENTRIES", 10000)))
@@ -0,0 +1,61 @@
+# gunicorn.conf.py
+import importlib
+import os
+
+# Serving modes
+#   sync  (default): gthread workers, one OS thread parked per in-flight request
+#                    -> ceiling = workers x threads (3 x 4 = 12 per pod)
+#   async          : gevent workers; socket I/O is monkey-patched, so every blocking
+#                    Supabase/PostgREST call yields to other requests instead of pinning a thread
+#                    -> ceiling = workers x worker_connections
+SERVER_MODE = os.getenv("SERVER_MODE", "sync")
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+workers = int(os.getenv("GUNICORN_WORKERS", 3))
+
+if SERVER_MODE == "async":
+    worker_class = "gevent"
+    # httpcore imports trio when it is installed, and trio reads select.epoll at import time,
+    # which gevent's patching removes; importing it in the master, before the workers patch, keeps it
+    importlib.import_module("httpcore")
+    worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 500))
+else:
+    worker_class = "gthread"
+    threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+# Background job workers (jobs_worker.py). They share the SQLite queue file with the web
+# workers, so they are started next to them instead of as a separate dyno/container.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))
+# scheduler.py (availability release, archived-property purge, job pruning) runs next to them
+# for the same reason: the jobs it prunes are in this host's queue file. Every replica runs
+# one; a purge or release that another replica already did finds nothing left to do.
+RUN_SCHEDULER = os.getenv("RUN_SCHEDULER", "1") == "1"
+_job_workers = []
+
+
+def when_ready(server):
+    import subprocess
+    import sys
+    here = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(JOB_WORKERS):
+        _job_workers.append(subprocess.Popen([sys.executable, "jobs_worker.py"], cwd=here))
+    server.log.info(f"Started {len(_job_workers)} job worker(s)")
+    if RUN_SCHEDULER:
+        _job_workers.append(subprocess.Popen([sys.executable, "scheduler.py"], cwd=here))
+        server.log.info("Started the scheduler")
+
+
+def post_worker_init(worker):
+    # The app is imported by now; start loading the availability index before traffic needs it
+    from app import warm_indexes
+    warm_indexes()
+
+
+def on_exit(server):
+    for proc in _job_workers:
+        proc.terminate()
+    for proc in _job_workers:
+        try:
+            proc.wait(timeout=30)
+        except Exception:
+            proc.kill()
@@ -0,0 +1,59 @@
+# images.py
+import os
+
+# Longest edge in pixels for each generated variant
+VARIANTS = {"thumbnail": 320, "card": 800, "full": 1600}
+
+CONTENT_TYPES = {
+    ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png",
+    ".webp": "image/webp", ".gif": "image/gif", ".avif": "image/avif",
+}
+ALLOWED_EXTENSIONS = set(CONTENT_TYPES)
+
+# Leading bytes of the formats we accept (checked before anything is stored)
+_SIGNATURES = (
+    (b"\xff\xd8\xff", None),            # JPEG
+    (b"\x89PNG\r\n\x1a\n", None),       # PNG
+    (b"GIF87a", None),
+    (b"GIF89a", None),
+    (b"RIFF", b"WEBP"),                 # WebP: RIFF....WEBP
+)
+
+
+def looks_like_image(head):
+    for magic, tag in _SIGNATURES:
+        if head.startswith(magic) and (tag is None or head[8:12] == tag):
+            return True
+    # AVIF: ISO BMFF 'ftyp' box with an avif/avis brand
+    return head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis")
+
+
+def variant_names(stem):
+    """Storage paths of the variants generated for an upload named `stem`."""
+    return {name: f"variants/{stem}_{name}.webp" for name in VARIANTS}
+
+
+def make_variants(source_path, out_dir, stem):
+    """
+    Runs in a worker process: writes resized WebP (and AVIF when Pillow supports it)
+    copies of `source_path` and returns [(storage_path, local_path, content_type)].
+    """
+    from PIL import Image, ImageOps, features
+
+    avif = features.check("avif")
+    results = []
+    with Image.open(source_path) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA" if "A" in original.getbands() else "RGB")
+        for name, edge in VARIANTS.items():
+            image = original.copy()
+            image.thumbnail((edge, edge), Image.LANCZOS)
+            webp_path = os.path.join(out_dir, f"{stem}_{name}.webp")
+            image.save(webp_path, "WEBP", quality=80, method=4)
+            results.append((f"variants/{stem}_{name}.webp", webp_path, "image/webp"))
+            if avif:
+                avif_path = os.path.join(out_dir, f"{stem}_{name}.avif")
+                image.save(avif_path, "AVIF", quality=60)
+                results.append((f"variants/{stem}_{name}.avif", avif_path, "image/avif"))
+    return results
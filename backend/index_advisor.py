@@ -0,0 +1,262 @@
+# index_advisor.py
+"""
+EXPLAIN ANALYZE for every query the app issues, flagging scans that need an index
+(`python migrate.py advise`).
+
+Calls each Repository method that Admin, Guest, Scheduler and the job handlers use,
+through PostgresRepository. Sample ids are picked from the database, so run it on a
+database with production-like data. Every statement runs twice inside one transaction
+that is rolled back at the end, so nothing is written:
+
+1. EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) in a savepoint that is rolled back.
+2. The statement itself, so the next step sees its result.
+
+A plain EXPLAIN cannot see the statements inside SQL functions (book_room,
+property_details, owner_dashboard, ...). When the auto_explain module can be loaded
+(superuser, or listed in session_preload_libraries), their nested plans are captured too.
+
+A scan is flagged when it is a Seq Scan of a table with at least `min_rows` rows
+(pg_class.reltuples), or when its filter discarded at least `min_rows` rows, i.e. the
+index it used does not cover the WHERE clause. BULK_LOADS and seq scans of smaller
+tables are listed but do not fail the run.
+"""
+import json
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import psycopg
+
+from pg_repository import PostgresRepository
+
+AUTO_EXPLAIN = (
+    "LOAD 'auto_explain'",
+    "SET auto_explain.log_min_duration = 0",
+    "SET auto_explain.log_analyze = on",
+    "SET auto_explain.log_nested_statements = on",
+    "SET auto_explain.log_format = json",
+    "SET auto_explain.log_level = notice",
+)
+
+# Bulk reads by design: the in-memory search and availability indexes load from them
+BULK_LOADS = {"search_catalog", "active_bookings"}
+
+
+class ExplainingRepository(PostgresRepository):
+    """PostgresRepository on one connection that records the plan of every statement."""
+
+    def __init__(self, conn):
+        # No pool: every call shares `conn` and its outer transaction
+        self.conn = conn
+        self.prepare = False
+        self.binary = False
+        self._db_error = psycopg.Error
+        self.label = None
+        self.plans = []
+        self._nested = None
+        conn.add_notice_handler(self._on_notice)
+
+    @contextmanager
+    def _cursor(self):
+        with self.conn.cursor() as cur:
+            yield cur
+
+    @contextmanager
+    def _transaction(self):
+        with self.conn.transaction():
+            with self.conn.cursor() as cur:
+                yield cur
+
+    def _execute(self, cur, query, params, prepare):
+        with self.conn.transaction(force_rollback=True):
+            cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", params)
+            explained = cur.fetchone()[0][0]
+        self._nested = []
+        try:
+            super()._execute(cur, query, params, prepare)
+        finally:
+            nested, self._nested = self._nested, None
+        self.plans.append({
+            "label": self.label,
+            "statement": query,
+            "execution_ms": explained.get("Execution Time"),
+            "plan": explained["Plan"],
+            "nested": [plan for plan in nested if plan.get("Query Text", "").strip() != query.strip()],
+        })
+
+    def _on_notice(self, diag):
+        # auto_explain: "duration: 0.123 ms  plan:\n{...}"
+        message = diag.message_primary or ""
+        if self._nested is None or "plan:" not in message:
+            return
+        try:
+            self._nested.append(json.loads(message.split("plan:", 1)[1]))
+        except ValueError:
+            pass
+
+
+def scans(plan):
+    """Scan nodes of a plan tree: [(node type, relation, filter, rows the filter discarded)]."""
+    found = []
+    if plan.get("Relation Name"):
+        removed = (plan.get("Rows Removed by Filter", 0) + plan.get("Rows Removed by Index Recheck", 0)) \
+            * plan.get("Actual Loops", 1)
+        found.append((plan["Node Type"], plan["Relation Name"], plan.get("Filter"), removed))
+    for child in plan.get("Plans", ()):
+        found.extend(scans(child))
+    return found
+
+
+def _sample(cur, query):
+    cur.execute(query)
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def sample_ids(conn):
+    """Ids the scenarios run with; the busiest rows, so plans see realistic fan-out."""
+    with conn.cursor() as cur:
+        ids = {
+            "property_id": _sample(cur, 'SELECT r.property_id FROM "ROOMS" r JOIN "PROPERTIES" p '
+                                        'ON p.property_id = r.property_id WHERE p.deleted_at IS NULL '
+                                        'GROUP BY r.property_id ORDER BY COUNT(*) DESC LIMIT 1'),
+            "review_room_id": _sample(cur, 'SELECT room_id FROM "REVIEWS" GROUP BY room_id ORDER BY COUNT(*) DESC LIMIT 1'),
+            "guest_id": _sample(cur, 'SELECT user_id FROM "BOOKINGS" GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1'),
+            "auth_id": _sample(cur, 'SELECT auth_id::text FROM "USERS" WHERE auth_id IS NOT NULL LIMIT 1'),
+        }
+        if ids["property_id"] is None or ids["guest_id"] is None:
+            raise RuntimeError("The advisor needs properties, rooms and bookings to explain; seed the database first.")
+        cur.execute('SELECT owner_id FROM "PROPERTIES" WHERE property_id = %s', (ids["property_id"],))
+        ids["owner_id"] = cur.fetchone()[0]
+        cur.execute('SELECT MIN(room_id) FROM "ROOMS" WHERE property_id = %s', (ids["property_id"],))
+        ids["room_id"] = cur.fetchone()[0]
+        cur.execute('SELECT MIN(amenity_id) FROM "AMENITIES" WHERE property_id = %s', (ids["property_id"],))
+        ids["amenity_id"] = cur.fetchone()[0]
+        cur.execute('SELECT MAX(booking_id) FROM "BOOKINGS" WHERE user_id = %s', (ids["guest_id"],))
+        ids["booking_id"] = cur.fetchone()[0]
+        ids["review_room_id"] = ids["review_room_id"] or ids["room_id"]
+    return ids
+
+
+def scenarios(repo, ids):
+    """label -> call, in the order a day of traffic touches them (writes last)."""
+    today = date.today()
+    check_in, check_out = (today + timedelta(days=400)).isoformat(), (today + timedelta(days=402)).isoformat()
+    pid, owner, room, guest = ids["property_id"], ids["owner_id"], ids["room_id"], ids["guest_id"]
+
+    def review_second_page():
+        first = repo.room_reviews(ids["review_room_id"], None, 10)
+        after = {"t": first[-1]["created_at"], "id": first[-1]["review_id"]} if first else None
+        return repo.room_reviews(ids["review_room_id"], after, 10)
+
+    def book_and_cancel():
+        booking = repo.book_room(guest, room, check_in, check_out, "card", record_payment=False)
+        repo.record_payment({"booking_id": booking["booking_id"], "payment_method": "card", "amount": 1,
+                             "payment_status": "completed", "payment_date": today.isoformat()})
+        repo.delete_booking(booking["booking_id"])
+
+    calls = {
+        "property_owner": lambda: repo.property_owner(pid),
+        "room_property": lambda: repo.room_property(room),
+        "amenity_property": lambda: repo.amenity_property(ids["amenity_id"] or 0),
+        "user_profiles": lambda: repo.user_profiles(ids["auth_id"] or "00000000-0000-0000-0000-000000000000", "user"),
+        "user_contact": lambda: repo.user_contact(guest),
+        "search_catalog": repo.search_catalog,
+        "active_bookings": lambda: repo.active_bookings(today.isoformat()),
+        "owner_properties": lambda: repo.owner_properties(owner),
+        "owner_property": lambda: repo.owner_property(pid, owner),
+        "owner_dashboard": lambda: repo.owner_dashboard(owner, 7),
+        "property_with_rooms": lambda: repo.property_with_rooms(pid, owner),
+        "booked_room_ids": lambda: repo.booked_room_ids(pid, today.isoformat()),
+        "property_details": lambda: repo.property_details(pid, 5),
+        "child_row": lambda: repo.child_row("ROOMS", room),
+        "property_children": lambda: repo.property_children("ROOMS", pid),
+        "existing_ids": lambda: repo.existing_ids("ROOMS", [room], pid),
+        "user_booking": lambda: repo.user_booking(ids["booking_id"], guest),
+        "user_bookings_upcoming": lambda: repo.user_bookings(guest, "upcoming", today.isoformat(), None, 21),
+        "user_bookings_past": lambda: repo.user_bookings(guest, "past", today.isoformat(), None, 21),
+        "room_reviews": lambda: repo.room_reviews(ids["review_room_id"], None, 11),
+        "room_reviews_page_2": review_second_page,
+        "scheduler_watermark": lambda: repo.scheduler_watermark("update_room_availability"),
+        "checked_out_bookings": lambda: repo.checked_out_bookings((today - timedelta(days=1)).isoformat(),
+                                                                  today.isoformat()),
+        "save_scheduler_state": lambda: repo.save_scheduler_state({"job_name": "index_advisor",
+                                                                   "watermark": today.isoformat()}),
+        "book_and_cancel": book_and_cancel,
+        "update_row": lambda: repo.update_row("ROOMS", room, {"availability_status": True}),
+        "release_rooms": lambda: repo.release_rooms([room]),
+        "insert_review": lambda: repo.insert_review({"room_id": room, "user_id": guest, "rating": 5, "comment": "advisor"}),
+        "delete_property": lambda: repo.delete_property(pid, owner),
+        "purge_archived": lambda: repo.purge_archived(10, 0),
+    }
+    return calls
+
+
+def table_sizes(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT relname, reltuples::bigint FROM pg_class WHERE relkind IN ('r', 'p', 'm')")
+        return dict(cur.fetchall())
+
+
+def advise(conninfo, min_rows=1000, output=None):
+    """Prints a report; returns False when a scan was flagged."""
+    conn = psycopg.connect(conninfo, autocommit=True)
+    try:
+        nested = True
+        for statement in AUTO_EXPLAIN:
+            try:
+                conn.execute(statement)
+            except psycopg.Error:
+                nested = False
+                break
+        if not nested:
+            print("auto_explain is not available: statements inside SQL functions are not analysed.")
+        sizes = table_sizes(conn)
+        ids = sample_ids(conn)
+        repo = ExplainingRepository(conn)
+        failures = {}
+        with conn.transaction(force_rollback=True):
+            for label, call in scenarios(repo, ids).items():
+                repo.label = label
+                try:
+                    with conn.transaction():
+                        call()
+                except Exception as err:
+                    failures[label] = str(err)
+    finally:
+        conn.close()
+
+    flagged = 0
+    print(f"{'query':<26}{'statements':>11}{'exec ms':>10}  scans")
+    by_label = {}
+    for entry in repo.plans:
+        by_label.setdefault(entry["label"], []).append(entry)
+    for label in list(by_label) + [label for label in failures if label not in by_label]:
+        entries = by_label.get(label, [])
+        found = []
+        for entry in entries:
+            for plan in [entry["plan"]] + [p["Plan"] for p in entry["nested"] if "Plan" in p]:
+                found.extend(scans(plan))
+        notes = []
+        for node, relation, condition, removed in found:
+            rows = sizes.get(relation, 0)
+            if node == "Seq Scan":
+                big = rows >= min_rows and label not in BULK_LOADS
+                note = f"{relation} seq scan (~{rows} rows{', ' + condition if condition else ''})"
+            elif removed >= min_rows:
+                big = label not in BULK_LOADS
+                note = f"{relation} {node.lower()} discarded {removed} rows ({condition})"
+            else:
+                continue
+            flagged += big
+            notes.append(f"{'FLAG ' if big else ''}{note}")
+        if label in failures:
+            notes.append(f"error: {failures[label]}")
+        exec_ms = sum(e["execution_ms"] or 0 for e in entries)
+        print(f"{label:<26}{len(entries):>11}{exec_ms:>10.2f}  {'; '.join(notes) or '-'}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({"min_rows": min_rows, "ids": ids, "failures": failures, "plans": repo.plans}, f, indent=2, default=str)
+        print(f"Plans written to {output}")
+    print(f"{flagged} flagged scan(s) (>= {min_rows} rows)." if flagged else "No flagged scans.")
+    return flagged == 0
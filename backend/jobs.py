@@ -0,0 +1,226 @@
+# jobs.py
+"""
+Durable local job queue for slow side effects (payments, emails, image variants).
+
+Jobs live in a SQLite file (JOB_QUEUE_PATH) shared by the gunicorn workers that
+enqueue and the jobs_worker.py processes that run them, so no broker is needed and
+queued work survives restarts. Every producer and worker must be on the same machine.
+
+- Idempotency: enqueue(..., key=...) is a no-op if a job with that key already exists.
+- Retries: failed jobs are retried with exponential backoff and jitter.
+- Dead letters: after max_attempts a job is parked as 'dead' for inspection or retry_dead().
+- Leases: a claimed job is locked for lease_seconds. If its worker dies, another
+  worker picks the job up again once the lease expires, unless that was its last
+  attempt: then it is dead-lettered, so a job that kills its worker cannot loop.
+  complete() and fail() only apply while the caller still holds the lease.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, DEAD = "queued", "running", "done", "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at REAL NOT NULL,
+    locked_by TEXT,
+    locked_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready_idx ON jobs (status, run_at);
+"""
+
+
+class JobQueue:
+    def __init__(self, path, retry_base_seconds=5.0, retry_max_seconds=3600.0):
+        self.path = path
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------
+    # Producer side
+    # ------------------------------
+    def enqueue(self, kind, payload, key=None, delay=0, max_attempts=5):
+        """Queues a job; returns its id, or None when `key` was already used."""
+        now = time.time()
+        cur = self._connect().execute(
+            "INSERT OR IGNORE INTO jobs (kind, payload, idempotency_key, max_attempts, run_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload, default=str), key, max_attempts, now + delay, now, now),
+        )
+        return cur.lastrowid if cur.rowcount else None
+
+    # ------------------------------
+    # Worker side
+    # ------------------------------
+    def claim(self, worker_id, lease_seconds=300):
+        """Takes the next due job (or one whose lease expired) and returns it as a dict, or None."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A job whose worker died or hung on its last attempt is not run again
+            expired = conn.execute(
+                "UPDATE jobs SET status = ?, locked_by = NULL, locked_until = NULL, updated_at = ?, "
+                "last_error = 'Lease expired on the last attempt; the worker died or hung' "
+                "WHERE status = ? AND locked_until < ? AND attempts >= max_attempts",
+                (DEAD, now, RUNNING, now),
+            ).rowcount
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND run_at <= ?) OR (status = ? AND locked_until < ?) "
+                "ORDER BY run_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, locked_by = ?, locked_until = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE id = ?",
+                    (RUNNING, worker_id, now + lease_seconds, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if expired:
+            log.error("Dead-lettered %d job(s) whose lease expired on their last attempt", expired)
+        if row is None:
+            return None
+        job = dict(row)
+        job["attempts"] += 1
+        job["locked_by"] = worker_id
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def complete(self, job):
+        """Marks a claimed job done; False when its lease was lost (another worker owns it now)."""
+        cur = self._connect().execute(
+            "UPDATE jobs SET status = ?, locked_by = NULL, locked_until = NULL, last_error = NULL, updated_at = ? "
+            "WHERE id = ? AND locked_by = ?",
+            (DONE, time.time(), job["id"], job["locked_by"]),
+        )
+        return cur.rowcount > 0
+
+    def fail(self, job, error):
+        """
+        Schedules a retry with exponential backoff, or dead-letters the job when out of attempts.
+        Returns the new status, or None when the lease was lost.
+        """
+        now = time.time()
+        if job["attempts"] >= job["max_attempts"]:
+            status, run_at = DEAD, now
+        else:
+            backoff = min(self.retry_base_seconds * 2 ** (job["attempts"] - 1), self.retry_max_seconds)
+            status, run_at = QUEUED, now + backoff * random.uniform(0.8, 1.2)
+        cur = self._connect().execute(
+            "UPDATE jobs SET status = ?, run_at = ?, locked_by = NULL, locked_until = NULL, last_error = ?, updated_at = ? "
+            "WHERE id = ? AND locked_by = ?",
+            (status, run_at, str(error)[:2000], now, job["id"], job["locked_by"]),
+        )
+        return status if cur.rowcount else None
+
+    # ------------------------------
+    # Maintenance / inspection
+    # ------------------------------
+    def stats(self):
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, DEAD: 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        oldest = self._connect().execute(
+            "SELECT MIN(run_at) AS t FROM jobs WHERE status = ?", (QUEUED,)
+        ).fetchone()["t"]
+        counts["oldest_queued_seconds"] = round(max(time.time() - oldest, 0), 1) if oldest else 0.0
+        return counts
+
+    def dead_letters(self, limit=50):
+        rows = self._connect().execute(
+            "SELECT id, kind, payload, idempotency_key, attempts, last_error, updated_at FROM jobs "
+            "WHERE status = ? ORDER BY updated_at DESC LIMIT ?",
+            (DEAD, limit),
+        ).fetchall()
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    def dead_keys(self, keys):
+        """The subset of idempotency keys whose job was dead-lettered."""
+        if not keys:
+            return set()
+        rows = self._connect().execute(
+            f"SELECT idempotency_key FROM jobs WHERE status = ? AND idempotency_key IN ({', '.join('?' * len(keys))})",
+            (DEAD, *keys),
+        ).fetchall()
+        return {row["idempotency_key"] for row in rows}
+
+    def retry_dead(self, job_id):
+        cur = self._connect().execute(
+            "UPDATE jobs SET status = ?, attempts = 0, run_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (QUEUED, time.time(), time.time(), job_id, DEAD),
+        )
+        return cur.rowcount > 0
+
+    def prune(self, older_than_seconds):
+        """Deletes finished jobs (and with them their idempotency keys) older than the cutoff."""
+        cur = self._connect().execute(
+            "DELETE FROM jobs WHERE status = ? AND updated_at < ?", (DONE, time.time() - older_than_seconds)
+        )
+        return cur.rowcount
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help; the job is dead-lettered at once."""
+
+
+def run_worker(queue, handlers, stop_event=None, poll_seconds=1.0, lease_seconds=300):
+    """Claims and runs jobs until stop_event is set. `handlers` maps job kind -> fn(payload)."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim(worker_id, lease_seconds)
+        if job is None:
+            time.sleep(poll_seconds)
+            continue
+        handler = handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler for job kind '{job['kind']}'")
+            handler(job["payload"])
+            if not queue.complete(job):
+                log.warning("Job %s (%s) finished after its lease expired; another worker owns it", job['id'], job['kind'])
+        except PermanentJobError as err:
+            job["attempts"] = job["max_attempts"]
+            if queue.fail(job, err):
+                log.error("Job %s (%s) dead-lettered: %s", job['id'], job['kind'], err)
+        except Exception as err:
+            status = queue.fail(job, err)
+            if status:
+                log.warning("Job %s (%s) failed (attempt %s, now %s): %s", job['id'], job['kind'], job['attempts'], status, err)
+            else:
+                log.warning("Job %s (%s) failed after its lease expired: %s", job['id'], job['kind'], err)
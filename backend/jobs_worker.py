@@ -0,0 +1,56 @@
+# jobs_worker.py
+import argparse
+import os
+import signal
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from jobs import run_worker
+from app import job_queue, JOB_HANDLERS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StayNGo background job worker")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("JOB_WORKER_THREADS", 4)),
+                        help="jobs run concurrently in this process (they mostly wait on HTTP/SMTP)")
+    parser.add_argument("--stats", action="store_true", help="print queue depth and exit")
+    parser.add_argument("--dead", action="store_true", help="list dead-lettered jobs and exit")
+    parser.add_argument("--retry", type=int, metavar="JOB_ID", help="requeue a dead-lettered job and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(job_queue.stats())
+        return
+    if args.dead:
+        for job in job_queue.dead_letters():
+            print(job)
+        return
+    if args.retry is not None:
+        print("Requeued." if job_queue.retry_dead(args.retry) else "No dead job with that id.")
+        return
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    poll_seconds = float(os.getenv("JOB_POLL_SECONDS", 1))
+    lease_seconds = int(os.getenv("JOB_LEASE_SECONDS", 300))
+    threads = [
+        threading.Thread(
+            target=run_worker, args=(job_queue, JOB_HANDLERS, stop, poll_seconds, lease_seconds),
+            name=f"job-worker-{i}", daemon=True
+        )
+        for i in range(max(args.threads, 1))
+    ]
+    for thread in threads:
+        thread.start()
+    print(f"Job worker {os.getpid()} started with {len(threads)} thread(s). Press Ctrl+C to exit.")
+    stop.wait()
+    for thread in threads:
+        thread.join(timeout=lease_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# loadtest.py
+"""
+Sustained-load comparison of the serving modes (gunicorn.conf.py SERVER_MODE) against a
+local PostgREST stand-in.
+
+The stand-in answers every /rest/v1 request after a fixed delay with one canned property
+and its rooms, so upstream latency is the same in both runs and the difference comes only
+from how many requests a pod can keep in flight:
+
+    python loadtest.py standin --port 54321 --delay-ms 50
+
+    SUPABASE_URL=http://127.0.0.1:54321 AUTH_MODE=token SERVER_MODE=sync \\
+        gunicorn -c gunicorn.conf.py app:app
+    python loadtest.py run --url http://127.0.0.1:5001 --output sync.json
+
+    SUPABASE_URL=http://127.0.0.1:54321 AUTH_MODE=token SERVER_MODE=async \\
+        gunicorn -c gunicorn.conf.py app:app
+    python loadtest.py run --url http://127.0.0.1:5001 --baseline sync.json
+
+`run` drives GET /api/room_status/1 (ownership check, then the property and its bookings
+concurrently: three upstream calls) from --concurrency client threads per step, and
+reports requests per second, p50/p99 and errors. The highest RPS of a step without
+errors is the mode's max sustained RPS. Use ROOM_STATUS_SNAPSHOT_SECONDS=0 on the server
+so every request goes upstream. SECRET_KEY must match the server's (token signing).
+Client, stand-in and server share the machine's CPUs; raise --delay-ms until the run is
+bound by upstream latency rather than CPU, or the modes look alike.
+
+Login throughput (User.login): the stand-in also answers Supabase Auth's password grant.
+With --claims the signed-in user carries the stayngo_profiles claim; without it every
+worker reads USERS once and then serves the profile from the cache:
+
+    python loadtest.py standin --claims
+    python loadtest.py run --route login
+
+"upstream/req" is the number of stand-in requests per app request in that step.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmark import percentile
+
+ROUTES = {
+    "room_status": ("GET", "/api/room_status/1", None),
+    "login": ("POST", "/api/login", {"email": "guest@example.com", "password": "secret", "role": "user"}),
+}
+
+
+def canned_rows(rooms):
+    """Property 1 of owner 1 with its rooms and USERS row 1: enough for every query the routes make."""
+    return [{
+        "user_id": 1, "name": "Load Test Guest", "role": "user",
+        "property_id": 1, "owner_id": 1, "room_id": 1, "address": "1 Main Road", "city": "Pune",
+        "state": "Maharashtra", "country": "India", "description": "Load test property", "image_url": None,
+        "ROOMS": [{"room_id": i, "property_id": 1, "room_type": "Double", "capacity": 2,
+                   "price_per_night": 2000, "availability_status": True} for i in range(1, rooms + 1)],
+    }]
+
+
+def auth_session(claims):
+    """Password-grant response of Supabase Auth for guest@example.com."""
+    app_metadata = {"provider": "email"}
+    if claims:
+        app_metadata["stayngo_profiles"] = {"user": {"user_id": 1, "name": "Load Test Guest"}}
+    return {
+        "access_token": "standin", "refresh_token": "standin", "token_type": "bearer", "expires_in": 3600,
+        "user": {"id": "00000000-0000-0000-0000-000000000001", "aud": "authenticated", "role": "authenticated",
+                 "email": "guest@example.com", "app_metadata": app_metadata, "user_metadata": {},
+                 "created_at": "2026-01-01T00:00:00Z"},
+    }
+
+
+def standin(port, delay_ms, rooms, claims):
+    bodies = {"rest": json.dumps(canned_rows(rooms)).encode(), "auth": json.dumps(auth_session(claims)).encode()}
+    served, served_lock = [0], threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # Headers and body go out as two writes; without this Nagle holds the body for a delayed ACK
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def _reply(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path == "/_stats":
+                body = json.dumps({"requests": served[0]}).encode()
+            else:
+                with served_lock:
+                    served[0] += 1
+                time.sleep(delay_ms / 1000)
+                body = bodies["auth" if self.path.startswith("/auth/") else "rest"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    print(f"PostgREST/Auth stand-in on http://127.0.0.1:{port} ({delay_ms} ms per request, "
+          f"claims {'on' if claims else 'off'})")
+    server.serve_forever()
+
+
+def upstream_requests(standin_url):
+    parts = urlsplit(standin_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+    try:
+        conn.request("GET", "/_stats")
+        return json.loads(conn.getresponse().read())["requests"]
+    finally:
+        conn.close()
+
+
+def step(url, route, token, concurrency, duration):
+    """One load level: `concurrency` keep-alive clients for `duration` seconds."""
+    parts = urlsplit(url)
+    method, path, payload = ROUTES[route]
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    body = json.dumps(payload) if payload else None
+    deadline = time.perf_counter() + duration
+    samples, errors, lock = [], [0], threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        mine, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+                    continue
+                mine.append((time.perf_counter() - started) * 1000)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        conn.close()
+        with lock:
+            samples.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples) + errors[0],
+        "rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 50), 1) if samples else None,
+        "p99_ms": round(percentile(samples, 99), 1) if samples else None,
+        "errors": errors[0],
+    }
+
+
+def run(args):
+    from auth import TokenVerifier
+    if not os.getenv("SECRET_KEY"):
+        sys.exit("SECRET_KEY must be set to the server's value")
+    token = TokenVerifier(os.getenv("SECRET_KEY"), 3600, None).issue(1, "Load Test Owner", "admin")
+    step(args.url, args.route, token, 4, 1)  # warm-up: connection pools, caches
+
+    results = {"url": args.url, "route": args.route, "duration": args.duration, "steps": []}
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        before = upstream_requests(args.standin)
+        stats = step(args.url, args.route, token, concurrency, args.duration)
+        stats["upstream_per_request"] = round((upstream_requests(args.standin) - before) / max(stats["requests"], 1), 2)
+        results["steps"].append(stats)
+        print(f"clients {concurrency:>5}  rps {stats['rps']:>8}  p50 {stats['p50_ms'] or '-':>8} ms  "
+              f"p99 {stats['p99_ms'] or '-':>8} ms  upstream/req {stats['upstream_per_request']:>5}  "
+              f"errors {stats['errors']}")
+    sustained = [s for s in results["steps"] if s["errors"] == 0]
+    results["max_sustained_rps"] = max((s["rps"] for s in sustained), default=0)
+    print(f"max sustained rps {results['max_sustained_rps']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        base = {s["concurrency"]: s for s in baseline["steps"]}
+        print(f"\n{'clients':>7}{'rps':>10}{'base':>10}{'p99 ms':>10}{'base':>10}")
+        for s in results["steps"]:
+            b = base.get(s["concurrency"], {})
+            print(f"{s['concurrency']:>7}{s['rps']:>10}{b.get('rps', '-'):>10}{s['p99_ms'] or '-':>10}"
+                  f"{b.get('p99_ms') or '-':>10}")
+        print(f"max sustained rps {results['max_sustained_rps']} (baseline {baseline['max_sustained_rps']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StayNGo serving mode load test")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stand = commands.add_parser("standin", help="serve canned PostgREST responses after a fixed delay")
+    stand.add_argument("--port", type=int, default=54321)
+    stand.add_argument("--delay-ms", type=float, default=50, help="upstream latency per request")
+    stand.add_argument("--rooms", type=int, default=10, help="rooms in the canned property")
+    stand.add_argument("--claims", action="store_true", help="signed-in users carry the stayngo_profiles claim")
+    load = commands.add_parser("run", help="drive the app at increasing concurrency")
+    load.add_argument("--url", default="http://127.0.0.1:5001")
+    load.add_argument("--standin", default="http://127.0.0.1:54321", help="stand-in to read upstream counts from")
+    load.add_argument("--route", choices=sorted(ROUTES), default="room_status")
+    load.add_argument("--concurrency", default="8,32,128,256", help="comma separated client counts")
+    load.add_argument("--duration", type=float, default=10, help="seconds per step")
+    load.add_argument("--output", help="write results as JSON")
+    load.add_argument("--baseline", help="compare against a previous --output file")
+    args = parser.parse_args()
+
+    if args.command == "standin":
+        standin(args.port, args.delay_ms, args.rooms, args.claims)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+-- The base tables hold production data; dropping them is never a rollback.
+DO $$
+BEGIN
+    RAISE EXCEPTION 'The base schema (0001) cannot be rolled back';
+END;
+$$;
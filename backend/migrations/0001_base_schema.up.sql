@@ -0,0 +1,84 @@
+-- ============================================================
+-- Base tables (the schema in Readme.md plus AMENITIES / REVIEWS), and the
+-- Supabase Auth link formerly added by alter_db.py.
+-- Every statement is IF NOT EXISTS, so on an existing Supabase project this only
+-- records the baseline; on an empty local Postgres it creates the schema.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS "USERS" (
+    user_id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password VARCHAR(255),
+    role VARCHAR(20) NOT NULL,
+    phone_number VARCHAR(15),
+    auth_id UUID UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Projects created before Supabase Auth (alter_db.py)
+ALTER TABLE "USERS" ADD COLUMN IF NOT EXISTS auth_id UUID UNIQUE;
+ALTER TABLE "USERS" ADD COLUMN IF NOT EXISTS password VARCHAR(255);
+ALTER TABLE "USERS" ALTER COLUMN password DROP NOT NULL;
+
+CREATE TABLE IF NOT EXISTS "PROPERTIES" (
+    property_id SERIAL PRIMARY KEY,
+    owner_id INT REFERENCES "USERS"(user_id) ON DELETE CASCADE,
+    address TEXT NOT NULL,
+    city VARCHAR(100) NOT NULL,
+    state VARCHAR(100) NOT NULL,
+    country VARCHAR(100) NOT NULL,
+    description TEXT,
+    image_url TEXT,
+    image_description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS "ROOMS" (
+    room_id SERIAL PRIMARY KEY,
+    property_id INT REFERENCES "PROPERTIES"(property_id) ON DELETE CASCADE,
+    room_type VARCHAR(50) NOT NULL,
+    capacity INT NOT NULL,
+    price_per_night DECIMAL(10, 2) NOT NULL,
+    availability_status BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS "AMENITIES" (
+    amenity_id SERIAL PRIMARY KEY,
+    property_id INT REFERENCES "PROPERTIES"(property_id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS "BOOKINGS" (
+    booking_id SERIAL PRIMARY KEY,
+    user_id INT REFERENCES "USERS"(user_id) ON DELETE CASCADE,
+    room_id INT REFERENCES "ROOMS"(room_id) ON DELETE CASCADE,
+    check_in_date DATE NOT NULL,
+    check_out_date DATE NOT NULL,
+    total_price DECIMAL(10, 2) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS "PAYMENTS" (
+    payment_id SERIAL PRIMARY KEY,
+    booking_id INT REFERENCES "BOOKINGS"(booking_id) ON DELETE CASCADE,
+    payment_method VARCHAR(50) NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL,
+    payment_status VARCHAR(20) DEFAULT 'completed',
+    payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS "REVIEWS" (
+    review_id SERIAL PRIMARY KEY,
+    room_id INT REFERENCES "ROOMS"(room_id) ON DELETE CASCADE,
+    user_id INT REFERENCES "USERS"(user_id) ON DELETE CASCADE,
+    rating INT NOT NULL CHECK (rating BETWEEN 1 AND 5),
+    comment TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
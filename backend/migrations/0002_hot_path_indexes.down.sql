@@ -0,0 +1,9 @@
+-- migrate: no-transaction
+DROP INDEX CONCURRENTLY IF EXISTS payments_booking_id_key;
+DROP INDEX CONCURRENTLY IF EXISTS amenities_property_idx;
+DROP INDEX CONCURRENTLY IF EXISTS rooms_property_idx;
+DROP INDEX CONCURRENTLY IF EXISTS properties_owner_idx;
+DROP INDEX CONCURRENTLY IF EXISTS reviews_room_created_idx;
+DROP INDEX CONCURRENTLY IF EXISTS bookings_check_out_date_idx;
+DROP INDEX CONCURRENTLY IF EXISTS bookings_user_check_in_idx;
+DROP INDEX CONCURRENTLY IF EXISTS bookings_room_dates_idx;
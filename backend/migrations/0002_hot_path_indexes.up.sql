@@ -0,0 +1,37 @@
+-- migrate: no-transaction
+-- ============================================================
+-- Indexes for the queries in SQL_COMMANDS.md that run on every request.
+-- Built CONCURRENTLY so live tables stay writable; the runner executes each
+-- statement on its own and fails if one leaves an INVALID index behind.
+-- ============================================================
+
+-- Overlap check (book_room) and room status EXISTS: room first, then the date range
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bookings_room_dates_idx
+    ON "BOOKINGS" (room_id, check_in_date, check_out_date);
+
+-- My Bookings keyset pages per user on (check_in_date, booking_id), in either direction
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bookings_user_check_in_idx
+    ON "BOOKINGS" (user_id, check_in_date, booking_id);
+
+-- Scheduler: incremental scan of newly checked-out bookings
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bookings_check_out_date_idx
+    ON "BOOKINGS" (check_out_date);
+
+-- Newest-first review pages per room, keyset on (created_at, review_id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS reviews_room_created_idx
+    ON "REVIEWS" (room_id, created_at DESC, review_id DESC);
+
+-- Owner dashboard, property list and ownership checks
+CREATE INDEX CONCURRENTLY IF NOT EXISTS properties_owner_idx
+    ON "PROPERTIES" (owner_id);
+
+-- Foreign keys Postgres does not index on its own (property pages, cascades)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rooms_property_idx
+    ON "ROOMS" (property_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS amenities_property_idx
+    ON "AMENITIES" (property_id);
+
+-- One payment per booking, so a retried 'record_payment' job can never double-charge
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS payments_booking_id_key
+    ON "PAYMENTS" (booking_id);
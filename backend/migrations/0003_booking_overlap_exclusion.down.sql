@@ -0,0 +1 @@
+ALTER TABLE "BOOKINGS" DROP CONSTRAINT IF EXISTS bookings_no_overlap;
@@ -0,0 +1,18 @@
+-- ============================================================
+-- Two bookings of the same room can never overlap, even if two transactions race
+-- past the overlap check in book_room. The GiST index behind the constraint also
+-- serves date-range overlap lookups per room.
+-- Clean up any legacy overlapping rows before applying this.
+-- ============================================================
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- Projects that ran the old sql/book_room.sql already have the constraint
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'bookings_no_overlap') THEN
+        ALTER TABLE "BOOKINGS"
+            ADD CONSTRAINT bookings_no_overlap
+            EXCLUDE USING gist (room_id WITH =, daterange(check_in_date, check_out_date, '[)') WITH &&);
+    END IF;
+END;
+$$;
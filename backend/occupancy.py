@@ -0,0 +1,108 @@
+# occupancy.py
+import base64
+import threading
+from datetime import date
+
+import numpy as np
+
+from availability import _day, _iso
+
+
+class OccupancyBitmap:
+    """
+    One bit per (room, night) from `origin` (the day of the last load) for `horizon_days`.
+
+    Rows are numpy-packed, so a 500-room property costs 500 * horizon/8 bytes
+    (~46 KB for two years). A range query unpacks just the rows it needs and answers
+    "free for every night in [a, b)" for all of them in one vectorized step.
+
+    Owned by RoomAvailabilityIndex, which loads it and forwards booking adds/removes.
+    """
+
+    def __init__(self, horizon_days=730):
+        self._lock = threading.RLock()
+        self.horizon_days = horizon_days
+        self._width = (horizon_days + 7) // 8
+        self._reset(date.today().toordinal())
+
+    def _reset(self, origin):
+        self.origin = origin
+        self._rows = {}       # room_id -> packed uint8 row
+        self._bookings = {}   # booking_id -> (room_id, first night offset, end offset)
+
+    def load(self, bookings):
+        with self._lock:
+            self._reset(date.today().toordinal())
+            for row in bookings:
+                self._set(row["booking_id"], row["room_id"], row["check_in_date"], row["check_out_date"])
+
+    # ------------------------------
+    # Maintenance (booking create / cancel)
+    # ------------------------------
+    def add(self, booking_id, room_id, check_in, check_out):
+        with self._lock:
+            self._set(booking_id, room_id, check_in, check_out)
+
+    def remove(self, booking_id):
+        with self._lock:
+            entry = self._bookings.pop(booking_id, None)
+            if entry:
+                self._write(*entry, value=0)
+
+    def _offsets(self, check_in, check_out):
+        start = max(_day(check_in) - self.origin, 0)
+        end = min(_day(check_out) - self.origin, self.horizon_days)
+        return start, end
+
+    def _set(self, booking_id, room_id, check_in, check_out):
+        start, end = self._offsets(check_in, check_out)
+        if start >= end:
+            return
+        self._bookings[booking_id] = (room_id, start, end)
+        self._write(room_id, start, end, value=1)
+
+    def _write(self, room_id, start, end, value):
+        row = self._rows.get(room_id)
+        if row is None:
+            row = self._rows[room_id] = np.zeros(self._width, dtype=np.uint8)
+        bits = np.unpackbits(row, count=self.horizon_days)
+        bits[start:end] = value
+        row[:] = np.packbits(bits)
+
+    # ------------------------------
+    # Queries
+    # ------------------------------
+    def window(self, start, days):
+        """Offsets of [start, start + days) after checking the window is inside the horizon."""
+        offset = _day(start) - self.origin
+        if offset < 0 or days <= 0 or offset + days > self.horizon_days:
+            raise ValueError(
+                f"Window must lie between {_iso(self.origin)} and {_iso(self.origin + self.horizon_days)}."
+            )
+        return offset, offset + days
+
+    def matrix(self, room_ids, start, days):
+        """bool array (len(room_ids), days): True where the room is booked that night."""
+        lo, hi = self.window(start, days)
+        with self._lock:
+            empty = np.zeros(self._width, dtype=np.uint8)
+            packed = np.stack([self._rows.get(room_id, empty) for room_id in room_ids]) if room_ids else \
+                np.zeros((0, self._width), dtype=np.uint8)
+        return np.unpackbits(packed, axis=1, count=self.horizon_days)[:, lo:hi].astype(bool)
+
+    def free_for_range(self, room_ids, check_in, check_out):
+        """Rooms free for every night in [check_in, check_out) (one vectorized reduction)."""
+        nights = _day(check_out) - _day(check_in)
+        booked = self.matrix(room_ids, check_in, nights).any(axis=1)
+        return [room_id for room_id, taken in zip(room_ids, booked) if not taken]
+
+    @staticmethod
+    def ranges(row):
+        """[[first_night, check_out), ...] offsets of the booked runs in one bool row."""
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], row.view(np.int8), [0]))))
+        return edges.reshape(-1, 2).tolist()
+
+    @staticmethod
+    def encode(row):
+        """Packed bits of one bool row, base64 (bit i = night i of the window, MSB first)."""
+        return base64.b64encode(np.packbits(row).tobytes()).decode()
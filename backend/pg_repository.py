@@ -0,0 +1,203 @@
+# pg_repository.py
+"""
+Direct Postgres backend (DATA_BACKEND=postgres).
+
+Runs SQLRepository's queries on the Supabase database over a bounded psycopg 3
+connection pool instead of PostgREST. A query is one round trip on an open connection,
+with no HTTPS request and no JSON encoding on either side.
+
+- The RPCs (book_room, archive_property / delete_property_cascade, purge, owner_dashboard,
+  property_details) call the same SQL functions PostgREST does. Row locks, the exclusion
+  constraint and the stats triggers therefore behave exactly as before.
+- Hot queries are prepared server-side on every pooled connection: the room status EXISTS
+  query, review pages and the book_room call. The overlap check inside book_room is
+  plpgsql, which already keeps its plan per connection. Other statements are prepared
+  automatically after PG_PREPARE_THRESHOLD executions.
+- Results are fetched in binary format (PG_BINARY=1) and converted to the values PostgREST
+  returns: ISO strings for dates and timestamps, floats for numerics, strings for UUIDs.
+
+SQLRepository writes its queries with qmark placeholders; to_pyformat() turns them into
+psycopg's %s outside string literals, quoted identifiers and comments, and escapes literal
+%. Write a jsonb ?, ?| or ?& operator as ??, ??| or ??&.
+
+Set PG_PREPARE=0 behind pgbouncer in transaction mode before 1.21; prepared statements do
+not survive across its transactions there. Point DATABASE_URL at the session-mode port
+(5432) or at pgbouncer; the pool size is per gunicorn worker.
+"""
+import os
+import re
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from uuid import UUID
+
+from repository import RepositoryError
+from sql_repository import SQLRepository
+
+
+def conninfo_from_env():
+    """DATABASE_URL, or the DB_* variables alter_db.py uses."""
+    if os.getenv("DATABASE_URL"):
+        return os.getenv("DATABASE_URL")
+    from psycopg.conninfo import make_conninfo
+    return make_conninfo(
+        host=os.getenv("DB_HOST"),
+        port=int(os.getenv("DB_PORT", 5432)),
+        dbname=os.getenv("DB_NAME", "postgres"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD"),
+        connect_timeout=10,
+        sslmode="require"
+    )
+
+
+_TOKENS = re.compile(r"""
+      '(?:[^']|'')*'            # string literal
+    | "(?:[^"]|"")*"            # quoted identifier
+    | --[^\n]*                  # line comment
+    | /\*.*?\*/                 # block comment
+    | \$(\w*)\$.*?\$\1\$        # dollar-quoted body
+    | \?\?                      # escaped ?, i.e. a jsonb operator
+    | [?%]
+""", re.S | re.X)
+
+
+@lru_cache(maxsize=1024)
+def to_pyformat(query):
+    """qmark placeholders to psycopg's %s; every literal % becomes %%."""
+    def token(match):
+        text = match.group(0)
+        if text == "?":
+            return "%s"
+        if text == "??":
+            return "?"
+        return text.replace("%", "%%")
+    return _TOKENS.sub(token, query)
+
+
+class PostgresRepository(SQLRepository):
+    backend = "postgres"
+
+    def __init__(self, conninfo, min_size=1, max_size=10, timeout=10, prepare=True, prepare_threshold=5,
+                 binary=True):
+        try:
+            import psycopg
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            raise RuntimeError("DATA_BACKEND=postgres but the 'psycopg[binary,pool]' package is not installed.")
+        self._db_error = psycopg.Error
+        self.prepare = prepare
+        self.binary = binary
+        self.pool = ConnectionPool(
+            conninfo,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            kwargs={"autocommit": True, "prepare_threshold": prepare_threshold if prepare else None},
+            name="stayngo-db",
+            open=True
+        )
+
+    def close(self):
+        self.pool.close()
+
+    def pool_stats(self):
+        return {"backend": self.backend, **self.pool.get_stats()}
+
+    # ------------------------------
+    # Connections and statements
+    # ------------------------------
+    @contextmanager
+    def _cursor(self):
+        with self.pool.connection() as conn:
+            with conn.cursor(binary=self.binary) as cur:
+                yield cur
+
+    @contextmanager
+    def _transaction(self):
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                with conn.cursor(binary=self.binary) as cur:
+                    yield cur
+
+    def _sql(self, query):
+        return to_pyformat(query)
+
+    def _execute(self, cur, query, params, prepare):
+        # prepare=None leaves the decision to prepare_threshold; False never prepares
+        if not self.prepare:
+            prepare = False
+        try:
+            cur.execute(query, params, prepare=True if prepare else None)
+        except self._db_error as err:
+            raise RepositoryError(err.diag.message_primary or str(err), err.sqlstate) from err
+
+    def _rows(self, cur):
+        rows = super()._rows(cur)
+        for row in rows:
+            for column, value in row.items():
+                if isinstance(value, date):
+                    row[column] = value.isoformat()
+                elif isinstance(value, Decimal):
+                    row[column] = float(value)
+                elif isinstance(value, UUID):
+                    row[column] = str(value)
+        return rows
+
+    def _call(self, function, params, prepare=False):
+        """SELECT function(name => value, ...); JSON results arrive already decoded."""
+        arguments = ", ".join(f"{name} => ?" for name in params)
+        return self._one(f"SELECT {function}({arguments}) AS result", list(params.values()), prepare=prepare)["result"]
+
+    def _json_array(self, query, params, table):
+        # json_agg renders the rows the way PostgREST does (PostgREST uses it too)
+        return self._one(f"SELECT COALESCE(json_agg(t), '[]'::json)::text AS body FROM ({query}) t", params)["body"]
+
+    # ------------------------------
+    # Queries that use production-only tables and functions
+    # ------------------------------
+    def search_catalog(self):
+        properties, rooms, _ = super().search_catalog()
+        ratings = self._query('SELECT property_id, review_count, rating_sum FROM "PROPERTY_RATINGS" ORDER BY property_id')
+        return properties, rooms, ratings
+
+    def delete_property(self, property_id, owner_id, purge=False):
+        function = 'delete_property_cascade' if purge else 'archive_property'
+        return self._call(function, {"p_property_id": property_id, "p_owner_id": owner_id})
+
+    def owner_dashboard(self, owner_id, upcoming_days):
+        return self._call('owner_dashboard', {"p_owner_id": owner_id, "p_upcoming_days": upcoming_days}) or []
+
+    def property_details(self, property_id, reviews_per_room):
+        return self._call('property_details', {"p_property_id": property_id, "p_reviews_per_room": reviews_per_room},
+                          prepare=True)
+
+    def book_room(self, user_id, room_id, check_in, check_out, payment_method, record_payment=True):
+        # Room validation, overlap check (row lock + exclusion constraint), price and the
+        # inserts run as one transaction (see sql/book_room.sql)
+        return self._call('book_room', {
+            "p_user_id": user_id,
+            "p_room_id": room_id,
+            "p_check_in": check_in,
+            "p_check_out": check_out,
+            "p_payment_method": payment_method,
+            "p_record_payment": record_payment
+        }, prepare=True)
+
+    def record_payment(self, row):
+        try:
+            # payments_booking_id_key makes a replayed job a no-op
+            self._query(
+                'INSERT INTO "PAYMENTS" (booking_id, payment_method, amount, payment_status, payment_date) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT (booking_id) DO NOTHING',
+                (row["booking_id"], row["payment_method"], row["amount"], row["payment_status"], row["payment_date"])
+            )
+            return True
+        except RepositoryError as err:
+            if err.code == '23503':
+                return False
+            raise
+
+    def purge_archived(self, limit, grace_minutes):
+        return self._call('purge_archived_properties', {"p_limit": limit, "p_grace_minutes": grace_minutes}) or []
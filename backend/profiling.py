@@ -0,0 +1,373 @@
+# profiling.py
+"""
+Request metrics, upstream-call tracing and sampled profiling.
+
+- Every Flask request gets a Trace (a ContextVar, copied into io_pool calls by
+  run_concurrently). MeteredTransport reports each finished Supabase HTTP call to
+  RequestProfiler.on_upstream(), which adds it to the current trace by service
+  (postgrest / auth / storage / other). With DATA_BACKEND=postgres or sqlite, every SQL
+  statement is reported through RequestProfiler.on_query() as a "postgres" / "sqlite" call.
+- When the request ends, wall time, CPU time of the request thread, upstream call counts,
+  upstream seconds and bytes are
+  added to a MetricsRegistry and rendered in the Prometheus text format by /metrics.
+  The response carries a Server-Timing header with the same numbers.
+- A sampled fraction of requests (PROFILE_SAMPLE_RATE) run under cProfile, or pyinstrument
+  when PROFILER=pyinstrument and it is installed. The profile is written to PROFILE_DIR only
+  when the request was slower than PROFILE_SLOW_MS.
+
+Each gunicorn worker has its own registry. With METRICS_DIR set, every worker writes its
+snapshot there every few seconds and /metrics sums the snapshots of the live workers, so a
+scrape that lands on any worker sees the whole pod. Without it, /metrics shows one worker.
+"""
+import contextvars
+import cProfile
+import glob
+import importlib.util
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+HELP = {
+    "stayngo_requests_total": ("counter", "Finished requests."),
+    "stayngo_request_duration_seconds": ("histogram", "Wall time per request."),
+    "stayngo_request_cpu_seconds": ("histogram", "CPU time of the thread that served the request."),
+    "stayngo_request_upstream_calls": ("histogram", "Supabase HTTP calls or SQL statements made by one request (N+1 detector)."),
+    "stayngo_upstream_calls_total": ("counter", "Supabase HTTP calls / SQL statements by calling endpoint and service."),
+    "stayngo_upstream_errors_total": ("counter", "Supabase HTTP calls that failed or returned >= 500."),
+    "stayngo_upstream_seconds_total": ("counter", "Time spent waiting on Supabase HTTP calls / SQL statements."),
+    "stayngo_upstream_sent_bytes_total": ("counter", "Request body bytes sent to Supabase."),
+    "stayngo_upstream_received_bytes_total": ("counter", "Response body bytes received from Supabase."),
+    "stayngo_profiles_written_total": ("counter", "Slow-request profiles written to PROFILE_DIR."),
+    "stayngo_response_bytes_total": ("counter", "Response body bytes sent, by content encoding (responses.py)."),
+    "stayngo_response_uncompressed_bytes_total": ("counter", "Response body bytes before compression."),
+    "stayngo_not_modified_total": ("counter", "Conditional GETs answered 304 without running the view."),
+}
+
+_current = contextvars.ContextVar("stayngo_trace", default=None)
+
+
+def current_trace():
+    return _current.get()
+
+
+def service_of(path):
+    """Which Supabase service a request path belongs to."""
+    for prefix, service in (("/rest/", "postgrest"), ("/auth/", "auth"), ("/storage/", "storage")):
+        if path.startswith(prefix):
+            return service
+    return "other"
+
+
+class Trace:
+    """Upstream calls made on behalf of one request or job (shared by its io_pool calls)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_cpu = time.thread_time()
+        self._lock = threading.Lock()
+        self.services = {}  # service -> [calls, errors, seconds, bytes_sent, bytes_received]
+
+    def record(self, service, status_code, seconds, bytes_sent, bytes_received):
+        with self._lock:
+            s = self.services.setdefault(service, [0, 0, 0.0, 0, 0])
+            s[0] += 1
+            s[1] += 1 if status_code == 0 or status_code >= 500 else 0
+            s[2] += seconds
+            s[3] += bytes_sent
+            s[4] += bytes_received
+
+    @property
+    def calls(self):
+        with self._lock:
+            return sum(s[0] for s in self.services.values())
+
+    @property
+    def upstream_seconds(self):
+        with self._lock:
+            return sum(s[2] for s in self.services.values())
+
+    def summary(self):
+        with self._lock:
+            services = {name: {"calls": s[0], "errors": s[1], "ms": round(s[2] * 1000, 1),
+                               "bytes_sent": s[3], "bytes_received": s[4]} for name, s in self.services.items()}
+        return {"name": self.name, "ms": round((time.perf_counter() - self.started) * 1000, 1), "upstream": services}
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (metric name, sorted label pairs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(sorted(labels.items())), buckets)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    h[i] += 1
+            h[-2] += 1
+            h[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "histograms": [[name, list(labels), list(buckets), list(h)]
+                               for (name, labels, buckets), h in self._histograms.items()],
+            }
+
+
+def merge_snapshots(snapshots):
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, h in snap["histograms"]:
+            key = (name, tuple(map(tuple, labels)), tuple(buckets))
+            merged = histograms.setdefault(key, [0] * len(h))
+            for i, value in enumerate(h):
+                merged[i] += value
+    return counters, histograms
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus(snapshots, gauges=()):
+    """Prometheus text exposition of the merged snapshots plus (name, help, value) gauges."""
+    counters, histograms = merge_snapshots(snapshots)
+    by_name = {}  # name -> [(labels, lines)]
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append((labels, [f"{name}{_labels(labels)} {value:g}"]))
+    for (name, labels, buckets), h in histograms.items():
+        lines = [f"{name}_bucket{_labels(labels, [('le', f'{bound:g}')])} {count}" for bound, count in zip(buckets, h)]
+        lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {h[-2]}")
+        lines.append(f"{name}_sum{_labels(labels)} {h[-1]:.6f}")
+        lines.append(f"{name}_count{_labels(labels)} {h[-2]}")
+        by_name.setdefault(name, []).append((labels, lines))
+    out = []
+    for name in sorted(by_name):
+        kind, text = HELP.get(name, ("untyped", ""))
+        out += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+        for _, lines in sorted(by_name[name], key=lambda series: [(k, str(v)) for k, v in series[0]]):
+            out += lines
+    for name, text, value in gauges:
+        out += [f"# HELP {name} {text}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+    return "\n".join(out) + "\n"
+
+
+class RequestProfiler:
+    def __init__(self, registry=None, sample_rate=0.0, slow_ms=500, profile_dir="profiles",
+                 engine="cprofile", max_profiles=200, metrics_dir=None, flush_seconds=5):
+        self.registry = registry or MetricsRegistry()
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.profile_dir = profile_dir
+        self.engine = engine
+        self.max_profiles = max_profiles
+        self.metrics_dir = metrics_dir
+        self.flush_seconds = flush_seconds
+        self._flusher_pid = None
+        if engine == "pyinstrument":
+            if importlib.util.find_spec("pyinstrument") is None:
+                log.warning("pyinstrument is not installed, profiling with cProfile")
+                self.engine = "cprofile"
+
+    # ------------------------------
+    # Flask integration
+    # ------------------------------
+    def init_app(self, app, skip_paths=("/metrics",)):
+        from flask import g, request
+
+        @app.before_request
+        def _start_trace():
+            if request.path in skip_paths:
+                return
+            self._ensure_flusher()
+            g.profiling_trace = Trace(request.url_rule.rule if request.url_rule else "unmatched")
+            g.profiling_token = _current.set(g.profiling_trace)
+            g.profiling_profiler = self._start_profiler() if random.random() < self.sample_rate else None
+
+        @app.after_request
+        def _finish_trace(response):
+            trace = g.pop("profiling_trace", None)
+            if trace is None:
+                return response
+            _current.reset(g.pop("profiling_token"))
+            seconds = time.perf_counter() - trace.started
+            cpu_seconds = time.thread_time() - trace.started_cpu
+            self._record(trace, request.method, response.status_code, seconds, cpu_seconds)
+            profiler = g.pop("profiling_profiler", None)
+            if profiler is not None:
+                self._finish_profiler(profiler, trace, seconds)
+            response.headers["Server-Timing"] = (
+                f'app;dur={seconds * 1000:.1f}, cpu;dur={cpu_seconds * 1000:.1f}, '
+                f'upstream;dur={trace.upstream_seconds * 1000:.1f};desc="{trace.calls} calls"'
+            )
+            return response
+
+    def on_upstream(self, request, status_code, seconds, bytes_sent, bytes_received):
+        """MeteredTransport listener; attributes the call to the current request's trace."""
+        trace = _current.get()
+        if trace is not None:
+            trace.record(service_of(request.url.path), status_code, seconds, bytes_sent, bytes_received)
+
+    def on_query(self, backend, failed, seconds):
+        """SQLRepository listener; a direct database statement counts as one upstream call."""
+        trace = _current.get()
+        if trace is not None:
+            trace.record(backend, 500 if failed else 200, seconds, 0, 0)
+
+    @contextmanager
+    def trace(self, name):
+        """Traces code that runs outside a request (scheduler and queue jobs); prints a summary."""
+        trace = Trace(name)
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+            self._record(trace, "JOB", 0, time.perf_counter() - trace.started, time.thread_time() - trace.started_cpu)
+            log.info("trace %s", trace.summary())
+
+    def _record(self, trace, method, status_code, seconds, cpu_seconds):
+        endpoint = {"endpoint": trace.name}
+        r = self.registry
+        r.inc("stayngo_requests_total", {**endpoint, "method": method, "status": status_code})
+        r.observe("stayngo_request_duration_seconds", endpoint, seconds, DURATION_BUCKETS)
+        r.observe("stayngo_request_cpu_seconds", endpoint, cpu_seconds, DURATION_BUCKETS)
+        r.observe("stayngo_request_upstream_calls", endpoint, trace.calls, CALL_COUNT_BUCKETS)
+        with trace._lock:
+            services = {name: list(s) for name, s in trace.services.items()}
+        for service, (calls, errors, upstream_seconds, sent, received) in services.items():
+            labels = {**endpoint, "service": service}
+            r.inc("stayngo_upstream_calls_total", labels, calls)
+            if errors:
+                r.inc("stayngo_upstream_errors_total", labels, errors)
+            r.inc("stayngo_upstream_seconds_total", labels, upstream_seconds)
+            r.inc("stayngo_upstream_sent_bytes_total", labels, sent)
+            r.inc("stayngo_upstream_received_bytes_total", labels, received)
+
+    # ------------------------------
+    # Sampled profiling
+    # ------------------------------
+    def _start_profiler(self):
+        if self.engine == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode="disabled")
+            profiler.start()
+            return profiler
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return None
+        return profiler
+
+    def _finish_profiler(self, profiler, trace, seconds):
+        if self.engine == "pyinstrument":
+            profiler.stop()
+        else:
+            profiler.disable()
+        if seconds * 1000 < self.slow_ms:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", trace.name).strip("_") or "root"
+        stem = os.path.join(self.profile_dir, f"{int(time.time() * 1000)}-{slug}-{int(seconds * 1000)}ms-{trace.calls}calls")
+        try:
+            if self.engine == "pyinstrument":
+                with open(stem + ".html", "w") as f:
+                    f.write(profiler.output_html())
+            else:
+                profiler.dump_stats(stem + ".prof")
+            self.registry.inc("stayngo_profiles_written_total", {"endpoint": trace.name})
+            self._prune_profiles()
+        except OSError as err:
+            log.warning("Could not write profile %s: %s", stem, err)
+
+    def _prune_profiles(self):
+        files = sorted(glob.glob(os.path.join(self.profile_dir, "*.prof")) + glob.glob(os.path.join(self.profile_dir, "*.html")))
+        for path in files[:max(len(files) - self.max_profiles, 0)]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    # ------------------------------
+    # Exposition (merged across workers when metrics_dir is set)
+    # ------------------------------
+    def _ensure_flusher(self):
+        if not self.metrics_dir or self._flusher_pid == os.getpid():
+            return
+        # Started lazily so it runs in the forked gunicorn worker, not the master
+        self._flusher_pid = os.getpid()
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self._write_snapshot()
+            except OSError as err:
+                log.warning("Could not write metrics snapshot: %s", err)
+
+    def _write_snapshot(self):
+        path = os.path.join(self.metrics_dir, f"{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(path + ".tmp", path)
+
+    def snapshots(self):
+        if not self.metrics_dir:
+            return [self.registry.snapshot()]
+        snapshots = [self.registry.snapshot()]
+        for path in glob.glob(os.path.join(self.metrics_dir, "*.json")):
+            pid = int(os.path.basename(path).split(".")[0])
+            if pid == os.getpid():
+                continue
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                # Worker is gone; Prometheus treats the drop as a counter reset
+                os.unlink(path)
+                continue
+            except PermissionError:
+                pass
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self, gauges=()):
+        return render_prometheus(self.snapshots(), gauges)
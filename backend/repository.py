@@ -0,0 +1,502 @@
+# repository.py
+"""
+Data-access layer. Admin, Guest, Scheduler and the job handlers in app.py talk to a
+Repository instead of the Supabase client, so the same code runs against:
+
+- SupabaseRepository: PostgREST over HTTPS (production, the default).
+- SQLiteRepository (sql_repository.py): a local file, for offline benchmarks and
+  development without a Supabase project (DATA_BACKEND=sqlite).
+- PostgresRepository (pg_repository.py): the Supabase database over a pooled direct
+  connection, skipping the PostgREST hop (DATA_BACKEND=postgres).
+
+Rows are plain dicts shaped like PostgREST's `.data`. Constraint violations that callers
+react to are raised as RepositoryError with the Postgres SQLSTATE in `code`
+('23P01' overlapping booking, '23503' missing parent row).
+
+Supabase Auth and Storage are not part of this layer.
+"""
+import json
+from datetime import date, datetime
+
+from postgrest.exceptions import APIError
+
+from search_index import PROPERTY_FIELDS
+
+# Tables the generic row helpers (rooms/amenities CRUD and bulk writes) may touch
+CHILD_TABLES = {"ROOMS": "room_id", "AMENITIES": "amenity_id"}
+
+BOOKING_FIELDS = ("booking_id", "room_id", "property_id", "check_in_date", "check_out_date",
+                  "total_price", "room_type", "address", "payment_status")
+CATALOG_ROOM_FIELDS = ("room_id", "property_id", "price_per_night", "capacity", "availability_status")
+
+
+class RepositoryError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+class Repository:
+    """Every query the app issues. Implementations must keep the return shapes documented here."""
+
+    backend = None
+
+    def ping(self):
+        """Number of USERS rows (connection check)."""
+        raise NotImplementedError
+
+    def pool_stats(self):
+        """Connection pool figures for /api/pool_stats, or None when there is no pool."""
+        return None
+
+    # ------------------------------
+    # Ownership lookups (auth.OwnerMap loaders)
+    # ------------------------------
+    def property_owner(self, property_id):
+        raise NotImplementedError
+
+    def room_property(self, room_id):
+        raise NotImplementedError
+
+    def amenity_property(self, amenity_id):
+        raise NotImplementedError
+
+    # ------------------------------
+    # Users
+    # ------------------------------
+    def user_profiles(self, auth_id, role=None):
+        """[{user_id, name, role}] for an auth user, optionally one role only."""
+        raise NotImplementedError
+
+    def user_contact(self, user_id):
+        """{name, email} or None."""
+        raise NotImplementedError
+
+    def create_user(self, row):
+        """Inserts a USERS row; returns the inserted rows."""
+        raise NotImplementedError
+
+    # ------------------------------
+    # Warm-up reads for the in-process indexes
+    # ------------------------------
+    def search_catalog(self):
+        """(live properties, rooms, property ratings) for PropertySearchIndex.load."""
+        raise NotImplementedError
+
+    def active_bookings(self, today):
+        """Bookings that have not checked out by `today` (RoomAvailabilityIndex.load)."""
+        raise NotImplementedError
+
+    # ------------------------------
+    # Properties
+    # ------------------------------
+    def insert_property(self, row):
+        raise NotImplementedError
+
+    def update_property(self, property_id, owner_id, values):
+        """Updated rows ([] when the caller does not own the property)."""
+        raise NotImplementedError
+
+    def delete_property(self, property_id, owner_id, purge=False):
+        """Archives (or with purge=True deletes the whole graph). Result dict with room_ids, or None."""
+        raise NotImplementedError
+
+    def owner_properties(self, owner_id):
+        raise NotImplementedError
+
+    def owner_properties_json(self, owner_id):
+        """owner_properties() as JSON array text, for responses that forward it without decoding."""
+        return json.dumps(self.owner_properties(owner_id), default=str)
+
+    def owner_property(self, property_id, owner_id):
+        """One of the owner's properties, or None."""
+        raise NotImplementedError
+
+    def owner_dashboard(self, owner_id, upcoming_days):
+        """Per-property summary rows, see sql/owner_dashboard.sql."""
+        raise NotImplementedError
+
+    def property_with_rooms(self, property_id, owner_id):
+        """(property, rooms) of an owner's property, or (None, None)."""
+        raise NotImplementedError
+
+    def booked_room_ids(self, property_id, day):
+        """Set of the property's rooms occupied on the night of `day`."""
+        raise NotImplementedError
+
+    def property_details(self, property_id, reviews_per_room):
+        """The property_details RPC document (see sql/property_details.sql), or None."""
+        raise NotImplementedError
+
+    # ------------------------------
+    # Rooms / amenities (table is one of CHILD_TABLES)
+    # ------------------------------
+    def child_row(self, table, row_id):
+        """One room/amenity row, or None."""
+        raise NotImplementedError
+
+    def property_children(self, table, property_id):
+        raise NotImplementedError
+
+    def property_children_json(self, table, property_id):
+        """property_children() as JSON array text (see owner_properties_json)."""
+        return json.dumps(self.property_children(table, property_id), default=str)
+
+    def insert_rows(self, table, rows):
+        raise NotImplementedError
+
+    def update_row(self, table, row_id, values):
+        raise NotImplementedError
+
+    def delete_row(self, table, row_id):
+        raise NotImplementedError
+
+    def existing_ids(self, table, ids, property_id):
+        """The subset of `ids` that belongs to the property."""
+        raise NotImplementedError
+
+    def update_rows(self, table, rows, property_id):
+        """
+        Updates rows by id (each row holds its id and the new column values), one statement
+        per call. Rows that no longer exist or belong to another property are skipped, never
+        created; returns the updated rows.
+        """
+        raise NotImplementedError
+
+    def delete_ids(self, table, ids, property_id):
+        raise NotImplementedError
+
+    # ------------------------------
+    # Bookings, payments, reviews
+    # ------------------------------
+    def book_room(self, user_id, room_id, check_in, check_out, payment_method, record_payment=True):
+        """{booking_id, total_price, property_id}; RepositoryError('23P01') on overlap."""
+        raise NotImplementedError
+
+    def user_booking(self, booking_id, user_id):
+        """The guest's booking with its property_id, or None."""
+        raise NotImplementedError
+
+    def delete_booking(self, booking_id):
+        """Deletes the booking; its payment goes with it in the same statement (ON DELETE CASCADE)."""
+        raise NotImplementedError
+
+    def user_bookings(self, user_id, scope, today, after, limit):
+        """
+        Up to `limit` rows of BOOKING_FIELDS. scope 'upcoming' ascends on (check_in_date, booking_id),
+        'past'/'all' descend; `after` is the decoded keyset cursor {"d", "id"} or None.
+        """
+        raise NotImplementedError
+
+    def record_payment(self, row):
+        """Inserts the booking's payment once; False when the booking no longer exists."""
+        raise NotImplementedError
+
+    def room_reviews(self, room_id, after, limit):
+        """Newest-first [{review_id, rating, comment, user_name, created_at}] after cursor {"t", "id"}."""
+        raise NotImplementedError
+
+    def insert_review(self, row):
+        raise NotImplementedError
+
+    # ------------------------------
+    # Scheduler
+    # ------------------------------
+    def scheduler_watermark(self, job_name):
+        raise NotImplementedError
+
+    def save_scheduler_state(self, row):
+        raise NotImplementedError
+
+    def checked_out_bookings(self, after, until):
+        """[{booking_id, room_id}] with after < check_out_date <= until (after may be None)."""
+        raise NotImplementedError
+
+    def release_rooms(self, room_ids):
+        """Sets availability_status on the rooms; returns the updated rows."""
+        raise NotImplementedError
+
+    def purge_archived(self, limit, grace_minutes):
+        """Results of purge_archived_properties: [{property_id, room_ids, bookings, ...}]."""
+        raise NotImplementedError
+
+
+def _child(table):
+    if table not in CHILD_TABLES:
+        raise ValueError(f"Unsupported table {table}")
+    return CHILD_TABLES[table]
+
+
+class SupabaseRepository(Repository):
+    backend = "supabase"
+    # PostgREST caps a single response (1000 rows by default), so bulk loads page through with .range()
+    FETCH_PAGE_SIZE = 1000
+
+    def __init__(self, client, http=None, url=None, key=None):
+        """
+        http/url/key (the pooled httpx client, SUPABASE_URL and key) enable the *_json
+        reads, which fetch PostgREST's body as is instead of decoding it into rows.
+        """
+        self.client = client
+        self.http = http
+        self.rest_url = f"{url.rstrip('/')}/rest/v1" if url else None
+        self.key = key
+
+    def _raw(self, table, params):
+        """GET /rest/v1/<table> and return the JSON body text undecoded."""
+        res = self.http.get(
+            f"{self.rest_url}/{table}", params=params,
+            headers={"apikey": self.key, "Authorization": f"Bearer {self.key}", "Accept": "application/json"}
+        )
+        if res.is_error:
+            try:
+                error = res.json()
+            except ValueError:
+                error = {}
+            raise RepositoryError(error.get("message") or f"PostgREST returned {res.status_code}", error.get("code"))
+        return res.content.decode()
+
+    def _fetch_all(self, table, columns, order_by, where=None):
+        """Reads a whole table page by page."""
+        rows, start = [], 0
+        while True:
+            query = self.client.table(table).select(columns).order(order_by)
+            if where:
+                query = where(query)
+            res = query.range(start, start + self.FETCH_PAGE_SIZE - 1).execute()
+            rows.extend(res.data)
+            if len(res.data) < self.FETCH_PAGE_SIZE:
+                return rows
+            start += self.FETCH_PAGE_SIZE
+
+    def _scalar(self, table, column, key, value):
+        res = self.client.table(table).select(column).eq(key, value).execute()
+        return res.data[0][column] if res.data else None
+
+    def ping(self):
+        return self.client.table('USERS').select("count", count='exact').limit(0).execute().count
+
+    def property_owner(self, property_id):
+        return self._scalar('PROPERTIES', "owner_id", "property_id", property_id)
+
+    def room_property(self, room_id):
+        return self._scalar('ROOMS', "property_id", "room_id", room_id)
+
+    def amenity_property(self, amenity_id):
+        return self._scalar('AMENITIES', "property_id", "amenity_id", amenity_id)
+
+    def user_profiles(self, auth_id, role=None):
+        query = self.client.table('USERS').select("user_id, name, role").eq("auth_id", auth_id)
+        if role:
+            query = query.eq("role", role)
+        return query.execute().data
+
+    def user_contact(self, user_id):
+        res = self.client.table('USERS').select("name, email").eq("user_id", user_id).execute()
+        return res.data[0] if res.data else None
+
+    def create_user(self, row):
+        return self.client.table('USERS').insert(row).execute().data
+
+    def search_catalog(self):
+        properties = self._fetch_all('PROPERTIES', ",".join(PROPERTY_FIELDS), "property_id",
+                                     where=lambda q: q.is_("deleted_at", "null"))
+        rooms = self._fetch_all('ROOMS', ",".join(CATALOG_ROOM_FIELDS), "room_id")
+        ratings = self._fetch_all('PROPERTY_RATINGS', "property_id,review_count,rating_sum", "property_id")
+        return properties, rooms, ratings
+
+    def active_bookings(self, today):
+        return self._fetch_all('BOOKINGS', "booking_id,room_id,check_in_date,check_out_date", "booking_id",
+                               where=lambda q: q.gt("check_out_date", today))
+
+    def insert_property(self, row):
+        return self.client.table('PROPERTIES').insert(row).execute().data
+
+    def update_property(self, property_id, owner_id, values):
+        return self.client.table('PROPERTIES')\
+            .update(values)\
+            .eq("property_id", property_id)\
+            .eq("owner_id", owner_id)\
+            .execute().data
+
+    def delete_property(self, property_id, owner_id, purge=False):
+        rpc = 'delete_property_cascade' if purge else 'archive_property'
+        return self.client.rpc(rpc, {"p_property_id": property_id, "p_owner_id": owner_id}).execute().data
+
+    def owner_properties(self, owner_id):
+        return self.client.table('PROPERTIES').select("*").eq("owner_id", owner_id).is_("deleted_at", "null").execute().data
+
+    def owner_properties_json(self, owner_id):
+        if self.http is None:
+            return super().owner_properties_json(owner_id)
+        return self._raw('PROPERTIES', {"select": "*", "owner_id": f"eq.{owner_id}", "deleted_at": "is.null"})
+
+    def owner_property(self, property_id, owner_id):
+        res = self.client.table('PROPERTIES').select("*").eq("property_id", property_id).eq("owner_id", owner_id).execute()
+        return res.data[0] if res.data else None
+
+    def owner_dashboard(self, owner_id, upcoming_days):
+        return self.client.rpc('owner_dashboard', {"p_owner_id": owner_id, "p_upcoming_days": upcoming_days}).execute().data or []
+
+    def property_with_rooms(self, property_id, owner_id):
+        res = self.client.table('PROPERTIES')\
+            .select("*, ROOMS(*)")\
+            .eq("property_id", property_id)\
+            .eq("owner_id", owner_id)\
+            .execute()
+        if not res.data:
+            return None, None
+        property_details = res.data[0]
+        return property_details, property_details.pop('ROOMS', None) or []
+
+    def booked_room_ids(self, property_id, day):
+        # Scoped to this property's rooms through the ROOMS join
+        res = self.client.table('BOOKINGS')\
+            .select("room_id, ROOMS!inner(property_id)")\
+            .eq("ROOMS.property_id", property_id)\
+            .lte("check_in_date", day)\
+            .gt("check_out_date", day)\
+            .execute()
+        return {b['room_id'] for b in res.data}
+
+    def property_details(self, property_id, reviews_per_room):
+        return self.client.rpc('property_details', {
+            "p_property_id": property_id,
+            "p_reviews_per_room": reviews_per_room
+        }).execute().data
+
+    def child_row(self, table, row_id):
+        res = self.client.table(table).select("*").eq(_child(table), row_id).execute()
+        return res.data[0] if res.data else None
+
+    def property_children(self, table, property_id):
+        _child(table)
+        return self.client.table(table).select("*").eq("property_id", property_id).execute().data
+
+    def property_children_json(self, table, property_id):
+        _child(table)
+        if self.http is None:
+            return super().property_children_json(table, property_id)
+        return self._raw(table, {"select": "*", "property_id": f"eq.{property_id}"})
+
+    def insert_rows(self, table, rows):
+        _child(table)
+        return self.client.table(table).insert(rows).execute().data
+
+    def update_row(self, table, row_id, values):
+        return self.client.table(table).update(values).eq(_child(table), row_id).execute().data
+
+    def delete_row(self, table, row_id):
+        return self.client.table(table).delete().eq(_child(table), row_id).execute().data
+
+    def existing_ids(self, table, ids, property_id):
+        id_field = _child(table)
+        res = self.client.table(table).select(id_field).in_(id_field, ids).eq("property_id", property_id).execute()
+        return {r[id_field] for r in res.data}
+
+    def update_rows(self, table, rows, property_id):
+        # PostgREST can only PATCH many rows with the same values; see sql/bulk_update.sql
+        _child(table)
+        return self.client.rpc(f'bulk_update_{table.lower()}', {"p_property_id": property_id, "p_rows": rows}).execute().data
+
+    def delete_ids(self, table, ids, property_id):
+        self.client.table(table).delete().in_(_child(table), ids).eq("property_id", property_id).execute()
+
+    def book_room(self, user_id, room_id, check_in, check_out, payment_method, record_payment=True):
+        try:
+            # Room validation, overlap check (row lock + exclusion constraint), price and the
+            # inserts run as one transaction (see sql/book_room.sql)
+            return self.client.rpc('book_room', {
+                "p_user_id": user_id,
+                "p_room_id": room_id,
+                "p_check_in": check_in,
+                "p_check_out": check_out,
+                "p_payment_method": payment_method,
+                "p_record_payment": record_payment
+            }).execute().data
+        except APIError as err:
+            raise RepositoryError(err.message, err.code)
+
+    def user_booking(self, booking_id, user_id):
+        res = self.client.table('BOOKINGS').select("*, ROOMS(property_id)")\
+            .eq("booking_id", booking_id).eq("user_id", user_id).execute()
+        if not res.data:
+            return None
+        booking = res.data[0]
+        booking['property_id'] = (booking.pop('ROOMS', None) or {}).get('property_id')
+        return booking
+
+    def delete_booking(self, booking_id):
+        # One statement, so a record_payment job racing the cancel either lands before it (and is
+        # cascaded away) or fails on the foreign key and skips
+        self.client.table('BOOKINGS').delete().eq("booking_id", booking_id).execute()
+
+    def user_bookings(self, user_id, scope, today, after, limit):
+        ascending = scope == "upcoming"
+        query = self.client.table('USER_BOOKINGS')\
+            .select(", ".join(BOOKING_FIELDS))\
+            .eq("user_id", user_id)
+        if scope == "upcoming":
+            query = query.gt("check_out_date", today)
+        elif scope == "past":
+            query = query.lte("check_out_date", today)
+        if after:
+            # Re-rendered from parsed values so no cursor text reaches the filter string
+            op, d = "gt" if ascending else "lt", date.fromisoformat(after["d"]).isoformat()
+            query = query.or_(
+                f'check_in_date.{op}.{d},and(check_in_date.eq.{d},booking_id.{op}.{int(after["id"])})'
+            )
+        return query.order("check_in_date", desc=not ascending)\
+            .order("booking_id", desc=not ascending)\
+            .limit(limit)\
+            .execute().data
+
+    def record_payment(self, row):
+        try:
+            # payments_booking_id_key makes a replayed job a no-op
+            self.client.table('PAYMENTS').upsert(row, on_conflict="booking_id", ignore_duplicates=True).execute()
+            return True
+        except APIError as err:
+            if err.code == '23503':
+                return False
+            raise RepositoryError(err.message, err.code)
+
+    def room_reviews(self, room_id, after, limit):
+        query = self.client.table('REVIEWS')\
+            .select("review_id, rating, comment, created_at, USERS(name)")\
+            .eq("room_id", room_id)
+        if after:
+            t = datetime.fromisoformat(after["t"]).isoformat()
+            query = query.or_(
+                f'created_at.lt."{t}",and(created_at.eq."{t}",review_id.lt.{int(after["id"])})'
+            )
+        res = query.order("created_at", desc=True).order("review_id", desc=True).limit(limit).execute()
+        return [{
+            "review_id": rev['review_id'],
+            "rating": rev['rating'],
+            "comment": rev['comment'],
+            "user_name": (rev.get('USERS') or {}).get('name', 'Unknown User'),
+            "created_at": rev['created_at']
+        } for rev in res.data]
+
+    def insert_review(self, row):
+        return self.client.table('REVIEWS').insert(row).execute().data
+
+    def scheduler_watermark(self, job_name):
+        return self._scalar('SCHEDULER_STATE', "watermark", "job_name", job_name)
+
+    def save_scheduler_state(self, row):
+        self.client.table('SCHEDULER_STATE').upsert(row).execute()
+
+    def checked_out_bookings(self, after, until):
+        def since_watermark(query):
+            query = query.lte("check_out_date", until)
+            return query.gt("check_out_date", after) if after else query
+        return self._fetch_all('BOOKINGS', "booking_id,room_id", "booking_id", where=since_watermark)
+
+    def release_rooms(self, room_ids):
+        return self.client.table('ROOMS').update({"availability_status": True}).in_("room_id", room_ids).execute().data
+
+    def purge_archived(self, limit, grace_minutes):
+        return self.client.rpc('purge_archived_properties', {"p_limit": limit, "p_grace_minutes": grace_minutes}).execute().data or []
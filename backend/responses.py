@@ -0,0 +1,270 @@
+# responses.py
+"""
+JSON encoding, response compression and conditional GET for the JSON API.
+
+- FastJSONProvider replaces Flask's json provider (app.json), so jsonify() and
+  request.get_json() use orjson or msgspec when one is installed (JSON_ENCODER).
+- json_passthrough() builds a jsonify()-style body around RawJSON values: JSON text the
+  repository or the cache already holds, forwarded without being decoded and re-encoded.
+
+- Compression.init_app() compresses responses of at least COMPRESS_MIN_BYTES with
+  brotli (when the 'brotli' package is installed and the client accepts it) or gzip.
+  Files served with direct passthrough (/api/media), streamed responses and 304s are left
+  alone.
+- VersionStamps keeps an opaque version token per entity scope ("property:12",
+  "owner:3") in the read-through cache. Write paths bump the scopes they change by
+  deleting the token, and the next read mints a new one.
+- ConditionalGet.conditional(version) wraps a GET view. It builds a strong ETag from
+  the version tokens, the path and query and the caller; the body is never hashed. When
+  If-None-Match matches, it answers 304 before the view runs, so no query is made. The
+  version is read before the view, so a write that lands in between only costs the
+  client one extra 200, never a stale 304. A view that falls back to a degraded body
+  after an upstream error calls skip_etag(), so the fallback is never stamped.
+
+A compressed representation gets its own ETag ("<tag>-br" / "<tag>-gzip"). If-None-Match
+compares the part before the suffix, so a client revalidating either encoding gets its
+304.
+
+Staleness follows cache.py. With REDIS_URL, every worker sees a bump at once. With the
+per-worker LocalCache, a worker that did not handle the write keeps its token until the
+entry expires (CACHE_TTL_SECONDS), exactly as long as it keeps serving its cached data.
+Responses that are not read through the cache should therefore only be stamped when
+`stamps.shared` is true.
+"""
+import gzip
+import hashlib
+import logging
+import uuid
+from functools import wraps
+
+from flask import Response, current_app, g, request
+from flask.json.provider import DefaultJSONProvider
+
+from cache import MISS
+
+log = logging.getLogger(__name__)
+
+COMPRESSIBLE = ("application/json", "text/plain", "text/html", "text/css", "text/csv", "application/javascript",
+                "image/svg+xml")
+ENCODING_SUFFIXES = ("-br", "-gzip")
+ENCODERS = ("orjson", "msgspec", "stdlib")
+
+
+def _load_encoder(name, default):
+    """(name, dumps -> bytes, loads) for JSON_ENCODER; "auto" takes the first one installed."""
+    for candidate in (ENCODERS if name == "auto" else (name,)):
+        if candidate == "orjson":
+            try:
+                import orjson
+            except ImportError:
+                continue
+            # Dates and dataclasses go through Flask's default() (HTTP dates, asdict) as before
+            option = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                      | orjson.OPT_PASSTHROUGH_DATACLASS)
+            return "orjson", lambda obj: orjson.dumps(obj, default=default, option=option), orjson.loads
+        if candidate == "msgspec":
+            try:
+                import msgspec
+            except ImportError:
+                continue
+            # msgspec encodes datetimes itself, as ISO 8601 rather than HTTP dates
+            encoder = msgspec.json.Encoder(enc_hook=default, order="sorted")
+            return "msgspec", encoder.encode, msgspec.json.decode
+        if candidate == "stdlib":
+            return "stdlib", None, None
+        raise RuntimeError(f"Unknown JSON_ENCODER {candidate!r}; use auto, {', '.join(ENCODERS)}.")
+    if name != "auto":
+        raise RuntimeError(f"JSON_ENCODER={name} but the '{name}' package is not installed.")
+    return "stdlib", None, None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    DefaultJSONProvider on orjson or msgspec. Keys stay sorted and Flask's default() still
+    handles the types the encoder does not know, so bodies keep their shape. Non-ASCII text
+    is sent as UTF-8 rather than \\u escapes. Calls with json.dumps() keyword arguments, and
+    pretty-printed responses in debug mode, use the stdlib encoder.
+    """
+
+    def __init__(self, app, encoder="auto"):
+        super().__init__(app)
+        self.encoder, self._dumps, self._loads = _load_encoder(encoder, self.default)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or self._dumps is None:
+            return super().dumps(obj, **kwargs)
+        return self._dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs or self._loads is None:
+            return super().loads(s, **kwargs)
+        return self._loads(s)
+
+    def response(self, *args, **kwargs):
+        if self._dumps is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        body = self._dumps(self._prepare_response_obj(args, kwargs)) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+class RawJSON(str):
+    """JSON text that json_passthrough() puts into the body as is."""
+    __slots__ = ()
+
+
+def json_passthrough(**fields):
+    """
+    jsonify(**fields) where RawJSON values are spliced in unchanged: a 10k-row list read
+    as JSON text is never turned into Python objects and back. Keys are sorted like
+    jsonify() sorts them.
+    """
+    provider = current_app.json
+    members = []
+    for key in sorted(fields):
+        value = fields[key]
+        members.append(f"{provider.dumps(key)}:{value if isinstance(value, RawJSON) else provider.dumps(value)}")
+    return current_app.response_class("{" + ",".join(members) + "}\n", mimetype=provider.mimetype)
+
+
+class VersionStamps:
+    """Opaque version token per entity scope, shared through `cache`."""
+
+    def __init__(self, cache, ttl=None):
+        self.cache = cache
+        self.ttl = ttl if self.shared else None  # LocalCache: never outlive the data it describes
+
+    @property
+    def shared(self):
+        return self.cache.backend != "local"
+
+    def key(self, scope):
+        """Cache key of a scope's token, for callers that delete it along with the data in one call."""
+        return f"version:{scope}"
+
+    def get(self, scope):
+        key = self.key(scope)
+        token = self.cache.get(key)
+        if token is MISS:
+            token = uuid.uuid4().hex[:16]
+            self.cache.set(key, token, self.ttl)
+        return token
+
+    def bump(self, *scopes):
+        self.cache.delete(*[self.key(scope) for scope in scopes])
+
+
+def _count(registry, name, labels, value=1):
+    if registry is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        registry.inc(name, {"endpoint": endpoint, **labels}, value)
+
+
+def skip_etag():
+    """Marks the current response as a degraded fallback that must not get an ETag."""
+    g.skip_etag = True
+
+
+class Compression:
+    def __init__(self, min_bytes=1024, gzip_level=6, brotli_quality=5, registry=None):
+        """registry is profiling.MetricsRegistry, for the bytes-sent counters."""
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.registry = registry
+        try:
+            import brotli
+            self._brotli = brotli
+        except ImportError:
+            self._brotli = None
+        self.encodings = ("br", "gzip") if self._brotli else ("gzip",)
+
+    def init_app(self, app):
+        # Registered after the profiler, so the profiler's after_request runs later and times this too
+        app.after_request(self._compress)
+
+    def _compress(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE
+                or "no-transform" in response.headers.get("Cache-Control", "")):
+            return response
+        data = response.get_data()
+        encoding = None
+        if len(data) >= self.min_bytes:
+            response.vary.add("Accept-Encoding")
+            encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding:
+            if encoding == "br":
+                body = self._brotli.compress(data, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(data, compresslevel=self.gzip_level)
+            response.set_data(body)
+            response.headers["Content-Encoding"] = encoding
+            tag, weak = response.get_etag()
+            if tag:
+                response.set_etag(f"{tag}-{encoding}", weak)
+        _count(self.registry, "stayngo_response_bytes_total", {"encoding": encoding or "identity"},
+               response.content_length or 0)
+        _count(self.registry, "stayngo_response_uncompressed_bytes_total", {}, len(data))
+        return response
+
+
+class ConditionalGet:
+    def __init__(self, identity=None, registry=None):
+        """
+        identity() names the caller. It is part of every ETag because responses carry the
+        caller's name and role. registry counts the 304s served.
+        """
+        self.identity = identity or (lambda: None)
+        self.registry = registry
+
+    def conditional(self, version):
+        """
+        version(**view_args) returns the version token(s) the response is built from, or None
+        to skip the ETag (e.g. an index that is not loaded yet). It runs after the auth
+        decorators, so flask.g.principal is set.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                tokens = None
+                try:
+                    if request.method == "GET":
+                        tokens = version(**kwargs)
+                except Exception as err:
+                    log.warning("Version stamp unavailable for %s: %s", request.path, err)
+                if tokens is None:
+                    return view(*args, **kwargs)
+                tag = self._etag(tokens)
+                matched = self._match(tag)
+                if matched:
+                    _count(self.registry, "stayngo_not_modified_total", {})
+                    response = Response(status=304)
+                    response.set_etag(matched)
+                else:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or g.pop("skip_etag", False):
+                        return response
+                    response.set_etag(tag)
+                response.headers["Cache-Control"] = "private, no-cache"
+                return response
+            return wrapper
+        return decorator
+
+    def _etag(self, tokens):
+        if isinstance(tokens, str):
+            tokens = [tokens]
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        parts = [request.path, query, str(self.identity()), *map(str, tokens)]
+        return hashlib.sha1("\x1f".join(parts).encode()).hexdigest()[:24]
+
+    def _match(self, tag):
+        """The client's tag that names this version in any encoding, or None."""
+        for candidate in request.if_none_match.as_set():
+            base = candidate
+            for suffix in ENCODING_SUFFIXES:
+                if candidate.endswith(suffix):
+                    base = candidate[:-len(suffix)]
+            if base == tag:
+                return candidate
+        return None
+
@@ -1,15 +1,59 @@
 # scheduler.py
+import argparse
 import os
 from dotenv import load_dotenv
 
 # Ensure environment variables (for DB credentials, CA path) are loaded
 load_dotenv()
 
-# We no longer need to run a background cron job for updating room availability.
-# The availability check has been rewritten to dynamically evaluate overlaps 
-# via SQL (EXISTS) at the exact moment a room is viewed or booked in `app.py`.
-# This is a much better, less resource-consuming logic than spinning up a 
-# Python process on a cron schedule!
+from apscheduler.schedulers.blocking import BlockingScheduler
+from app import Scheduler, profiler
+
+
+def traced(job):
+    """Runs a job under a trace so its upstream call count shows up in the log (and N+1s stand out)."""
+    def run():
+        with profiler.trace(job.__name__):
+            return job()
+    run.__name__ = job.__name__
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StayNGo background jobs")
+    parser.add_argument("--once", action="store_true", help="run every job once and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        traced(Scheduler.updateRoomAvailability)()
+        traced(Scheduler.purgeArchivedProperties)()
+        traced(Scheduler.pruneFinishedJobs)()
+        return
+
+    scheduler = BlockingScheduler()
+    # Incremental: each run only looks at bookings that checked out since the previous run
+    scheduler.add_job(
+        traced(Scheduler.updateRoomAvailability), "cron",
+        hour=int(os.getenv("SCHEDULER_HOUR", 0)), minute=int(os.getenv("SCHEDULER_MINUTE", 5)),
+        id=Scheduler.AVAILABILITY_JOB, max_instances=1, coalesce=True
+    )
+    # Archived (soft-deleted) properties are hard-deleted in small transactions
+    scheduler.add_job(
+        traced(Scheduler.purgeArchivedProperties), "interval",
+        minutes=int(os.getenv("PURGE_INTERVAL_MINUTES", 10)),
+        id=Scheduler.PURGE_JOB, max_instances=1, coalesce=True
+    )
+    # Finished background jobs are only kept long enough to dedupe retried enqueues
+    scheduler.add_job(
+        traced(Scheduler.pruneFinishedJobs), "interval",
+        hours=1, id=Scheduler.JOB_PRUNE_JOB, max_instances=1, coalesce=True
+    )
+    print("Scheduler started. Press Ctrl+C to exit.")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
 
 if __name__ == "__main__":
-    print("Scheduler logic is deprecated. Availability is computed dynamically on read.")
+    main()
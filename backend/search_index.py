@@ -0,0 +1,336 @@
+# search_index.py
+import base64
+import json
+import re
+import time
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+
+from warm_index import WarmIndex
+
+# Columns a search result may be projected onto (the "fields" query parameter).
+PROPERTY_FIELDS = (
+    "property_id", "owner_id", "address", "city", "state", "country",
+    "description", "image_url", "image_description", "created_at", "updated_at",
+)
+# What the guest dashboard cards actually render.
+DEFAULT_FIELDS = ("property_id", "address", "city", "state", "country", "description", "image_url")
+
+DEFAULT_LIMIT = 24
+MAX_LIMIT = 100
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(value):
+    return " ".join(_TOKEN_RE.findall(str(value or "").lower()))
+
+
+def _tokens(*values):
+    found = set()
+    for value in values:
+        found.update(_TOKEN_RE.findall(str(value or "").lower()))
+    return found
+
+
+SORT_ORDERS = ("id", "rating")
+
+
+def encode_cursor(sort, key):
+    raw = json.dumps({"sort": sort, "key": key}).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor, sort):
+    """Returns the sort key of the last row of the previous page, or None for the first page."""
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if data["sort"] != sort:
+            raise ValueError
+        key = data["key"]
+        return (float(key[0]), int(key[1])) if sort == "rating" else int(key)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+def _contains(sorted_ids, property_id):
+    index = bisect_left(sorted_ids, property_id)
+    return index < len(sorted_ids) and sorted_ids[index] == property_id
+
+
+class PropertySearchIndex(WarmIndex):
+    """
+    In-process inverted index over PROPERTIES and ROOMS.
+
+    Exact-match filters (city/state/country) and free-text tokens map to posting
+    lists of property ids kept in ascending order. sort="id" walks the shortest
+    matching list from the cursor and checks the others by bisection, so a page costs
+    O(limit / selectivity * log n), with no sort and independent of catalog size.
+    sort="rating" with filters sorts the k matching properties by rating first,
+    O(k log k); unfiltered it walks the pre-sorted rating order.
+    """
+
+    # Everything load() rebuilds; swapped in as a whole
+    _STATE = ("_properties", "_sorted_ids", "_by_field", "_by_token", "_rooms", "_rooms_by_property",
+              "_ratings", "_by_rating")
+
+    def __init__(self, refresh_seconds=300):
+        super().__init__(refresh_seconds)
+        self._journal = None
+        self._reset()
+
+    def _reset(self):
+        self._properties = {}          # property_id -> row
+        self._sorted_ids = []          # property ids in ascending order
+        self._by_field = {"city": {}, "state": {}, "country": {}}  # value -> [property_id], ascending
+        self._by_token = {}            # token -> [property_id], ascending
+        self._rooms = {}               # room_id -> (property_id, price, capacity, enabled)
+        self._rooms_by_property = {}   # property_id -> {room_id}
+        self._ratings = {}             # property_id -> (review_count, rating_sum)
+        self._by_rating = []           # (-average, property_id), best rated first
+
+    # ------------------------------
+    # Loading / freshness
+    # ------------------------------
+    def load(self, properties, rooms, ratings=()):
+        # The new maps are built outside the lock, so searches keep running on the old ones
+        # during a background refresh. Writes made meanwhile are journaled and replayed onto
+        # the new maps before they are swapped in.
+        with self._lock:
+            self._journal = []
+        try:
+            staged = PropertySearchIndex.__new__(PropertySearchIndex)
+            staged._reset()
+            for row in sorted(properties, key=itemgetter("property_id")):
+                staged._add_property(row)  # ascending, so the posting lists are appended in order
+            staged._sorted_ids = list(staged._properties)
+            for row in rooms:
+                staged._add_room(row)
+            for row in ratings:
+                if row["property_id"] in staged._properties:
+                    staged._ratings[row["property_id"]] = (row["review_count"], row["rating_sum"])
+            staged._by_rating = sorted(staged._rating_key(pid) for pid in staged._properties)
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            journal, self._journal = self._journal, None
+            for name in self._STATE:
+                setattr(self, name, getattr(staged, name))
+            self._loaded_at = time.monotonic()
+            for method, args in journal:
+                method(*args)
+            self._changed()
+
+    def _record(self, method, *args):
+        """Journals a write made while load() is building new maps (call with the lock held)."""
+        if self._journal is not None:
+            self._journal.append((method, args))
+
+    # ------------------------------
+    # Incremental maintenance (called from Admin write paths)
+    # ------------------------------
+    def upsert_property(self, row):
+        if not row or not self.loaded:
+            return
+        with self._lock:
+            self._record(self.upsert_property, row)
+            property_id = row["property_id"]
+            is_new = property_id not in self._properties
+            if not is_new:
+                self._remove_terms(property_id)
+            self._add_property(row)
+            if is_new:
+                self._sorted_ids.insert(bisect_right(self._sorted_ids, property_id), property_id)
+                insort(self._by_rating, self._rating_key(property_id))
+            self._changed()
+
+    def remove_property(self, property_id):
+        if not self.loaded:
+            return
+        with self._lock:
+            self._record(self.remove_property, property_id)
+            if property_id not in self._properties:
+                return
+            self._remove_terms(property_id)
+            self._remove_sorted(self._by_rating, self._rating_key(property_id))
+            self._ratings.pop(property_id, None)
+            del self._properties[property_id]
+            index = bisect_right(self._sorted_ids, property_id) - 1
+            if index >= 0 and self._sorted_ids[index] == property_id:
+                del self._sorted_ids[index]
+            for room_id in self._rooms_by_property.pop(property_id, set()):
+                self._rooms.pop(room_id, None)
+            self._changed()
+
+    def upsert_room(self, row):
+        if not row or not self.loaded:
+            return
+        with self._lock:
+            self._record(self.upsert_room, row)
+            self._drop_room(row["room_id"])
+            self._add_room(row)
+            self._changed()
+
+    def remove_room(self, room_id):
+        if not self.loaded:
+            return
+        with self._lock:
+            self._record(self.remove_room, room_id)
+            if self._drop_room(room_id):
+                self._changed()
+
+    def _drop_room(self, room_id):
+        room = self._rooms.pop(room_id, None)
+        if room:
+            self._rooms_by_property.get(room[0], set()).discard(room_id)
+        return room
+
+    def record_review(self, property_id, rating):
+        """Mirrors the REVIEWS trigger that maintains PROPERTY_RATINGS."""
+        if not self.loaded:
+            return
+        with self._lock:
+            self._record(self.record_review, property_id, rating)
+            if property_id not in self._properties:
+                return
+            self._remove_sorted(self._by_rating, self._rating_key(property_id))
+            count, total = self._ratings.get(property_id, (0, 0))
+            self._ratings[property_id] = (count + 1, total + int(rating))
+            insort(self._by_rating, self._rating_key(property_id))
+            self._changed()
+
+    def property_of_room(self, room_id):
+        room = self._rooms.get(room_id)
+        return room[0] if room else None
+
+    def _average(self, property_id):
+        count, total = self._ratings.get(property_id, (0, 0))
+        return round(total / count, 2) if count else 0.0
+
+    def _rating_key(self, property_id):
+        return (-self._average(property_id), property_id)
+
+    @staticmethod
+    def _remove_sorted(keys, key):
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
+
+    def _add_property(self, row):
+        property_id = row["property_id"]
+        self._properties[property_id] = {k: row.get(k) for k in PROPERTY_FIELDS}
+        for field, postings in self._by_field.items():
+            self._post(postings.setdefault(_normalize(row.get(field)), []), property_id)
+        for token in _tokens(row.get("address"), row.get("city"), row.get("state"), row.get("country")):
+            self._post(self._by_token.setdefault(token, []), property_id)
+
+    @staticmethod
+    def _post(postings, property_id):
+        if not postings or postings[-1] < property_id:
+            postings.append(property_id)  # load() adds in ascending order
+        elif not _contains(postings, property_id):
+            insort(postings, property_id)
+
+    def _remove_terms(self, property_id):
+        row = self._properties[property_id]
+        for field, postings in self._by_field.items():
+            self._remove_sorted(postings.get(_normalize(row.get(field)), []), property_id)
+        for token in _tokens(row.get("address"), row.get("city"), row.get("state"), row.get("country")):
+            self._remove_sorted(self._by_token.get(token, []), property_id)
+
+    def _add_room(self, row):
+        property_id = row.get("property_id")
+        if property_id is None:
+            return
+        self._rooms[row["room_id"]] = (
+            property_id,
+            float(row.get("price_per_night") or 0),
+            int(row.get("capacity") or 0),
+            bool(row.get("availability_status", True)),
+        )
+        self._rooms_by_property.setdefault(property_id, set()).add(row["room_id"])
+
+    # ------------------------------
+    # Querying
+    # ------------------------------
+    def search(self, city=None, state=None, country=None, q=None,
+               min_price=None, max_price=None, guests=None, room_filter=None, min_rating=None,
+               sort="id", cursor=None, limit=DEFAULT_LIMIT, fields=DEFAULT_FIELDS):
+        """
+        Returns (rows, next_cursor). `room_filter(room_id) -> bool` is applied last,
+        only to rooms that already match price/capacity (used for date availability).
+        sort="rating" orders by average rating (best first), ties by property_id.
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"sort must be one of: {', '.join(SORT_ORDERS)}")
+        limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+        after_key = decode_cursor(cursor, sort)
+        needs_rooms = any(v is not None for v in (min_price, max_price, guests, room_filter))
+
+        with self._lock:
+            postings = [self._by_field[field].get(_normalize(value), ())
+                        for field, value in (("city", city), ("state", state), ("country", country)) if value]
+            postings += [self._by_token.get(token, ()) for token in _tokens(q)]
+            postings.sort(key=len)
+            others = postings[1:]
+
+            if sort == "rating":
+                if postings:
+                    matches = (pid for pid in postings[0] if all(_contains(p, pid) for p in others))
+                    ordered, others = sorted(self._rating_key(pid) for pid in matches), ()
+                else:
+                    ordered = self._by_rating
+            else:
+                ordered = postings[0] if postings else self._sorted_ids
+            start = bisect_right(ordered, after_key) if after_key is not None else 0
+
+            rows, keys = [], []
+            for index in range(start, len(ordered)):
+                key = ordered[index]
+                property_id = key[1] if sort == "rating" else key
+                if others and not all(_contains(p, property_id) for p in others):
+                    continue
+                average = self._average(property_id)
+                if min_rating is not None and average < min_rating:
+                    if sort == "rating":
+                        break  # everything after is rated lower
+                    continue
+                matched, min_rate = self._match_rooms(property_id, min_price, max_price, guests, room_filter)
+                if needs_rooms and not matched:
+                    continue
+                row = self._properties[property_id]
+                result = {k: row.get(k) for k in fields}
+                result["min_price"] = min_rate
+                result["average_rating"] = average
+                result["review_count"] = self._ratings.get(property_id, (0, 0))[0]
+                rows.append(result)
+                keys.append(list(key) if sort == "rating" else key)
+                if len(rows) > limit:
+                    break
+
+        if len(rows) > limit:
+            return rows[:limit], encode_cursor(sort, keys[limit - 1])
+        return rows, None
+
+    def _match_rooms(self, property_id, min_price, max_price, guests, room_filter):
+        """Returns (any room matched, lowest matching nightly price)."""
+        best = None
+        for room_id in self._rooms_by_property.get(property_id, ()):
+            _, price, capacity, enabled = self._rooms[room_id]
+            if not enabled:
+                continue
+            if min_price is not None and price < min_price:
+                continue
+            if max_price is not None and price > max_price:
+                continue
+            if guests is not None and capacity < guests:
+                continue
+            if room_filter is not None and not room_filter(room_id):
+                continue
+            if best is None or price < best:
+                best = price
+        return best is not None, best
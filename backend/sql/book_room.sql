@@ -0,0 +1,84 @@
+-- ============================================================
+-- Atomic booking + payment (called from Guest.bookRoom)
+--   supabase.rpc('book_room', {...}); service role only (grants at the end)
+-- Guest.bookRoom passes p_record_payment => FALSE and lets the 'record_payment'
+-- job insert the PAYMENTS row (see jobs.py); the unique index keeps that idempotent.
+-- ============================================================
+
+-- Relies on the bookings_no_overlap exclusion constraint (migrations/0003) and the
+-- payments_booking_id_key unique index (migrations/0002); `python migrate.py up` installs both.
+
+-- The signature gained p_record_payment; drop the old overload so PostgREST resolves one function
+DROP FUNCTION IF EXISTS book_room(INT, INT, DATE, DATE, TEXT);
+
+CREATE OR REPLACE FUNCTION book_room(
+    p_user_id INT,
+    p_room_id INT,
+    p_check_in DATE,
+    p_check_out DATE,
+    p_payment_method TEXT,
+    p_record_payment BOOLEAN DEFAULT TRUE
+) RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_room "ROOMS"%ROWTYPE;
+    v_nights INT := p_check_out - p_check_in;
+    v_total NUMERIC(10, 2);
+    v_booking_id INT;
+BEGIN
+    IF v_nights <= 0 THEN
+        RAISE EXCEPTION 'Invalid date range.';
+    END IF;
+
+    -- Row lock serializes concurrent bookings of the same room
+    SELECT * INTO v_room FROM "ROOMS" WHERE room_id = p_room_id FOR UPDATE;
+    IF NOT FOUND OR NOT COALESCE(v_room.availability_status, FALSE) THEN
+        RAISE EXCEPTION 'This room is currently turned off by the admin.';
+    END IF;
+    -- Archived (soft-deleted) property, see sql/delete_property.sql
+    IF EXISTS (SELECT 1 FROM "PROPERTIES" WHERE property_id = v_room.property_id AND deleted_at IS NOT NULL) THEN
+        RAISE EXCEPTION 'This property is no longer available.';
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM "BOOKINGS"
+        WHERE room_id = p_room_id
+          AND check_in_date < p_check_out
+          AND check_out_date > p_check_in
+    ) THEN
+        RAISE EXCEPTION 'Room is already booked for these dates.' USING ERRCODE = '23P01';
+    END IF;
+
+    v_total := v_nights * v_room.price_per_night;
+
+    INSERT INTO "BOOKINGS" (user_id, room_id, check_in_date, check_out_date, total_price, created_at, updated_at)
+    VALUES (p_user_id, p_room_id, p_check_in, p_check_out, v_total, NOW(), NOW())
+    RETURNING booking_id INTO v_booking_id;
+
+    IF p_record_payment THEN
+        INSERT INTO "PAYMENTS" (booking_id, payment_method, amount, payment_status, payment_date)
+        VALUES (v_booking_id, p_payment_method, v_total, 'completed', NOW());
+    END IF;
+
+    RETURN json_build_object(
+        'booking_id', v_booking_id,
+        'total_price', v_total,
+        'property_id', v_room.property_id
+    );
+END;
+$$;
+
+-- p_user_id is trusted, so only the backend (service role) may call it: Supabase grants
+-- EXECUTE on public functions to anon and authenticated, and any holder of the publishable
+-- key could otherwise book as another user through /rest/v1/rpc/book_room.
+REVOKE EXECUTE ON FUNCTION book_room(INT, INT, DATE, DATE, TEXT, BOOLEAN) FROM PUBLIC;
+DO $$
+BEGIN
+    -- The Supabase roles do not exist on a plain local Postgres
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION book_room(INT, INT, DATE, DATE, TEXT, BOOLEAN) FROM anon, authenticated;
+        GRANT EXECUTE ON FUNCTION book_room(INT, INT, DATE, DATE, TEXT, BOOLEAN) TO service_role;
+    END IF;
+END
+$$;
@@ -0,0 +1,51 @@
+-- ============================================================
+-- Bulk room / amenity updates by id (called from Admin._bulkWrite)
+--   supabase.rpc('bulk_update_rooms', {"p_property_id": 1, "p_rows": [{...}, ...]})
+-- One UPDATE per chunk; only rows that exist and belong to the property are touched, so a
+-- row deleted since it was validated is reported as not found instead of re-created.
+-- Returns the updated rows. Service role only (grants at the end).
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION bulk_update_rooms(p_property_id INT, p_rows JSON)
+RETURNS SETOF "ROOMS"
+LANGUAGE sql
+AS $$
+    UPDATE "ROOMS" AS t SET
+        room_type = v.room_type,
+        capacity = v.capacity,
+        price_per_night = v.price_per_night,
+        availability_status = v.availability_status
+    FROM json_to_recordset(p_rows) AS v(room_id INT, room_type TEXT, capacity INT, price_per_night NUMERIC,
+                                        availability_status BOOLEAN)
+    WHERE t.room_id = v.room_id
+      AND t.property_id = p_property_id
+    RETURNING t.*;
+$$;
+
+CREATE OR REPLACE FUNCTION bulk_update_amenities(p_property_id INT, p_rows JSON)
+RETURNS SETOF "AMENITIES"
+LANGUAGE sql
+AS $$
+    UPDATE "AMENITIES" AS t SET
+        name = v.name,
+        description = v.description
+    FROM json_to_recordset(p_rows) AS v(amenity_id INT, name TEXT, description TEXT)
+    WHERE t.amenity_id = v.amenity_id
+      AND t.property_id = p_property_id
+    RETURNING t.*;
+$$;
+
+-- p_property_id is trusted (the backend checked ownership), see sql/book_room.sql
+REVOKE EXECUTE ON FUNCTION bulk_update_rooms(INT, JSON) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION bulk_update_amenities(INT, JSON) FROM PUBLIC;
+DO $$
+BEGIN
+    -- The Supabase roles do not exist on a plain local Postgres
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION bulk_update_rooms(INT, JSON) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION bulk_update_amenities(INT, JSON) FROM anon, authenticated;
+        GRANT EXECUTE ON FUNCTION bulk_update_rooms(INT, JSON) TO service_role;
+        GRANT EXECUTE ON FUNCTION bulk_update_amenities(INT, JSON) TO service_role;
+    END IF;
+END
+$$;
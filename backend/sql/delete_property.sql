@@ -0,0 +1,149 @@
+-- ============================================================
+-- Property delete: archive (soft delete) + transactional cascade
+--   supabase.rpc('archive_property', {...})          -- Admin.deleteProperty (default)
+--   supabase.rpc('delete_property_cascade', {...})   -- Admin.deleteProperty(mode='purge')
+--   supabase.rpc('purge_archived_properties', {...}) -- scheduler.py purge job
+-- Run after sql/ratings.sql (its trigger honours the stayngo.skip_rating_trigger switch).
+-- PROPERTY_STATS / PROPERTY_DAILY_STATS (sql/owner_dashboard.sql) cascade with the property.
+-- ============================================================
+
+-- Tombstone: archived properties are hidden at once and purged later in the background
+ALTER TABLE "PROPERTIES" ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP;
+CREATE INDEX IF NOT EXISTS properties_deleted_at_idx ON "PROPERTIES" (deleted_at) WHERE deleted_at IS NOT NULL;
+
+-- Deletes a property and everything hanging off it, children first, in the caller's transaction
+CREATE OR REPLACE FUNCTION delete_property_graph(p_property_id INT)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_room_ids INT[];
+    v_payments INT;
+    v_bookings INT;
+    v_reviews INT;
+    v_amenities INT;
+BEGIN
+    -- The aggregates are deleted below, so skip the per-review rating trigger and the
+    -- dashboard stats triggers (sql/owner_dashboard.sql) for this transaction only
+    PERFORM set_config('stayngo.skip_rating_trigger', 'on', true);
+    PERFORM set_config('stayngo.skip_stats_trigger', 'on', true);
+
+    SELECT COALESCE(array_agg(room_id), '{}') INTO v_room_ids
+    FROM "ROOMS" WHERE property_id = p_property_id;
+
+    DELETE FROM "PAYMENTS" WHERE booking_id IN (
+        SELECT booking_id FROM "BOOKINGS" WHERE room_id = ANY (v_room_ids)
+    );
+    GET DIAGNOSTICS v_payments = ROW_COUNT;
+    DELETE FROM "BOOKINGS" WHERE room_id = ANY (v_room_ids);
+    GET DIAGNOSTICS v_bookings = ROW_COUNT;
+    DELETE FROM "REVIEWS" WHERE room_id = ANY (v_room_ids);
+    GET DIAGNOSTICS v_reviews = ROW_COUNT;
+    DELETE FROM "ROOM_RATINGS" WHERE property_id = p_property_id;
+    DELETE FROM "PROPERTY_RATINGS" WHERE property_id = p_property_id;
+    DELETE FROM "AMENITIES" WHERE property_id = p_property_id;
+    GET DIAGNOSTICS v_amenities = ROW_COUNT;
+    DELETE FROM "ROOMS" WHERE property_id = p_property_id;
+    DELETE FROM "PROPERTIES" WHERE property_id = p_property_id;
+
+    PERFORM set_config('stayngo.skip_rating_trigger', 'off', true);
+    PERFORM set_config('stayngo.skip_stats_trigger', 'off', true);
+
+    RETURN json_build_object(
+        'property_id', p_property_id,
+        'room_ids', to_json(v_room_ids),
+        'bookings', v_bookings,
+        'payments', v_payments,
+        'reviews', v_reviews,
+        'amenities', v_amenities
+    );
+END;
+$$;
+
+-- Immediate, atomic delete of the whole graph (one round trip). NULL when not the owner.
+CREATE OR REPLACE FUNCTION delete_property_cascade(p_property_id INT, p_owner_id INT)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Row lock keeps concurrent writes/bookings out while the graph is removed
+    PERFORM 1 FROM "PROPERTIES"
+    WHERE property_id = p_property_id AND owner_id = p_owner_id
+    FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    RETURN delete_property_graph(p_property_id);
+END;
+$$;
+
+-- Instant soft delete; the rows stay until purge_archived_properties removes them.
+-- book_room refuses rooms of archived properties.
+CREATE OR REPLACE FUNCTION archive_property(p_property_id INT, p_owner_id INT)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_archived_at TIMESTAMP;
+BEGIN
+    UPDATE "PROPERTIES" SET deleted_at = COALESCE(deleted_at, NOW())
+    WHERE property_id = p_property_id AND owner_id = p_owner_id
+    RETURNING deleted_at INTO v_archived_at;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    RETURN json_build_object(
+        'property_id', p_property_id,
+        'archived_at', v_archived_at,
+        'room_ids', (SELECT COALESCE(json_agg(room_id), '[]') FROM "ROOMS" WHERE property_id = p_property_id)
+    );
+END;
+$$;
+
+-- Background purge: up to p_limit properties archived at least p_grace_minutes ago,
+-- oldest first. SKIP LOCKED lets several purge runs share the backlog.
+CREATE OR REPLACE FUNCTION purge_archived_properties(p_limit INT DEFAULT 10, p_grace_minutes INT DEFAULT 0)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_property_id INT;
+    v_result JSON;
+    v_purged JSON[] := '{}';
+BEGIN
+    FOR v_property_id IN
+        SELECT property_id FROM "PROPERTIES"
+        WHERE deleted_at IS NOT NULL
+          AND deleted_at <= NOW() - make_interval(mins => p_grace_minutes)
+        ORDER BY deleted_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    LOOP
+        v_result := delete_property_graph(v_property_id);
+        v_purged := v_purged || v_result;
+    END LOOP;
+    RETURN to_json(v_purged);
+END;
+$$;
+
+-- These trust p_owner_id (delete_property_graph checks nothing), so only the backend
+-- (service role) may call them; see the matching grants in sql/book_room.sql.
+REVOKE EXECUTE ON FUNCTION delete_property_graph(INT) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION delete_property_cascade(INT, INT) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION archive_property(INT, INT) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION purge_archived_properties(INT, INT) FROM PUBLIC;
+DO $$
+BEGIN
+    -- The Supabase roles do not exist on a plain local Postgres
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION delete_property_graph(INT) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION delete_property_cascade(INT, INT) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION archive_property(INT, INT) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION purge_archived_properties(INT, INT) FROM anon, authenticated;
+        GRANT EXECUTE ON FUNCTION delete_property_cascade(INT, INT) TO service_role;
+        GRANT EXECUTE ON FUNCTION archive_property(INT, INT) TO service_role;
+        GRANT EXECUTE ON FUNCTION purge_archived_properties(INT, INT) TO service_role;
+    END IF;
+END
+$$;
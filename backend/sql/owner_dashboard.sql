@@ -0,0 +1,211 @@
+-- ============================================================
+-- Owner dashboard summary (maintained by triggers on ROOMS and BOOKINGS)
+--   supabase.rpc('owner_dashboard', {...})   -- Admin.viewDashboardSummary
+-- Run after sql/ratings.sql (average rating comes from PROPERTY_RATINGS).
+-- ============================================================
+
+-- Room counts per property
+CREATE TABLE IF NOT EXISTS "PROPERTY_STATS" (
+    property_id INT PRIMARY KEY REFERENCES "PROPERTIES"(property_id) ON DELETE CASCADE,
+    room_count INT NOT NULL DEFAULT 0,
+    bookable_rooms INT NOT NULL DEFAULT 0
+);
+
+-- Per property and calendar day: rooms occupied that night, check-ins that day and
+-- revenue of the bookings created that day. Date-dependent figures (occupancy today,
+-- month-to-date revenue, upcoming check-ins) become a short primary-key range read.
+CREATE TABLE IF NOT EXISTS "PROPERTY_DAILY_STATS" (
+    property_id INT NOT NULL REFERENCES "PROPERTIES"(property_id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    occupied_rooms INT NOT NULL DEFAULT 0,
+    check_ins INT NOT NULL DEFAULT 0,
+    revenue NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (property_id, day)
+);
+
+-- Per-owner reads use properties_owner_idx (migrations/0002)
+
+-- Adds `delta` (+1 / -1) rooms to the property's counters
+CREATE OR REPLACE FUNCTION apply_room_stats_delta(p_property_id INT, p_bookable BOOLEAN, delta INT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO "PROPERTY_STATS" AS t (property_id, room_count, bookable_rooms)
+    VALUES (p_property_id, delta, CASE WHEN COALESCE(p_bookable, FALSE) THEN delta ELSE 0 END)
+    ON CONFLICT (property_id) DO UPDATE SET
+        room_count = t.room_count + EXCLUDED.room_count,
+        bookable_rooms = t.bookable_rooms + EXCLUDED.bookable_rooms;
+END;
+$$;
+
+-- Adds `delta` (+1 / -1) of one booking to the daily counters of its property
+CREATE OR REPLACE FUNCTION apply_booking_stats_delta(
+    p_room_id INT, p_check_in DATE, p_check_out DATE, p_total NUMERIC, p_created_at TIMESTAMP, delta INT
+) RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_property_id INT;
+BEGIN
+    SELECT property_id INTO v_property_id FROM "ROOMS" WHERE room_id = p_room_id;
+    IF v_property_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO "PROPERTY_DAILY_STATS" AS t (property_id, day, occupied_rooms)
+    SELECT v_property_id, night::date, delta
+    FROM generate_series(p_check_in, p_check_out - 1, interval '1 day') AS night
+    ON CONFLICT (property_id, day) DO UPDATE SET occupied_rooms = t.occupied_rooms + EXCLUDED.occupied_rooms;
+
+    INSERT INTO "PROPERTY_DAILY_STATS" AS t (property_id, day, check_ins)
+    VALUES (v_property_id, p_check_in, delta)
+    ON CONFLICT (property_id, day) DO UPDATE SET check_ins = t.check_ins + EXCLUDED.check_ins;
+
+    INSERT INTO "PROPERTY_DAILY_STATS" AS t (property_id, day, revenue)
+    VALUES (v_property_id, COALESCE(p_created_at, NOW())::date, delta * COALESCE(p_total, 0))
+    ON CONFLICT (property_id, day) DO UPDATE SET revenue = t.revenue + EXCLUDED.revenue;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION rooms_stats_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Set by delete_property_graph (sql/delete_property.sql); the stats rows go with the property
+    IF current_setting('stayngo.skip_stats_trigger', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_room_stats_delta(OLD.property_id, OLD.availability_status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_room_stats_delta(NEW.property_id, NEW.availability_status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS rooms_dashboard_stats ON "ROOMS";
+CREATE TRIGGER rooms_dashboard_stats
+    AFTER INSERT OR DELETE OR UPDATE OF property_id, availability_status ON "ROOMS"
+    FOR EACH ROW EXECUTE FUNCTION rooms_stats_trigger();
+
+CREATE OR REPLACE FUNCTION bookings_stats_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF current_setting('stayngo.skip_stats_trigger', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_booking_stats_delta(OLD.room_id, OLD.check_in_date, OLD.check_out_date, OLD.total_price, OLD.created_at, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_booking_stats_delta(NEW.room_id, NEW.check_in_date, NEW.check_out_date, NEW.total_price, NEW.created_at, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS bookings_dashboard_stats ON "BOOKINGS";
+CREATE TRIGGER bookings_dashboard_stats
+    AFTER INSERT OR DELETE OR UPDATE OF room_id, check_in_date, check_out_date, total_price ON "BOOKINGS"
+    FOR EACH ROW EXECUTE FUNCTION bookings_stats_trigger();
+
+-- One row per live property of the owner; reads only the stats tables (one round trip)
+CREATE OR REPLACE FUNCTION owner_dashboard(p_owner_id INT, p_upcoming_days INT DEFAULT 7)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(json_agg(row_to_json(summary) ORDER BY summary.property_id), '[]')
+    FROM (
+        SELECT p.property_id, p.address, p.city, p.state, p.country, p.description, p.image_url,
+               COALESCE(s.room_count, 0) AS room_count,
+               COALESCE(s.bookable_rooms, 0) AS bookable_rooms,
+               COALESCE(d.occupied_today, 0) AS occupied_today,
+               COALESCE(d.revenue_mtd, 0) AS revenue_mtd,
+               COALESCE(d.upcoming_check_ins, 0) AS upcoming_check_ins,
+               COALESCE(r.average, 0) AS average_rating,
+               COALESCE(r.review_count, 0) AS review_count
+        FROM "PROPERTIES" p
+        LEFT JOIN "PROPERTY_STATS" s ON s.property_id = p.property_id
+        LEFT JOIN "PROPERTY_RATINGS" r ON r.property_id = p.property_id
+        LEFT JOIN LATERAL (
+            SELECT SUM(occupied_rooms) FILTER (WHERE day = CURRENT_DATE) AS occupied_today,
+                   SUM(revenue) FILTER (WHERE day <= CURRENT_DATE) AS revenue_mtd,
+                   SUM(check_ins) FILTER (WHERE day >= CURRENT_DATE) AS upcoming_check_ins
+            FROM "PROPERTY_DAILY_STATS"
+            WHERE property_id = p.property_id
+              AND day >= date_trunc('month', CURRENT_DATE)::date
+              AND day < CURRENT_DATE + p_upcoming_days
+        ) d ON TRUE
+        WHERE p.owner_id = p_owner_id AND p.deleted_at IS NULL
+    ) summary;
+$$;
+
+-- One-off rebuild from ROOMS and BOOKINGS (python backfill_dashboard.py)
+CREATE OR REPLACE FUNCTION backfill_dashboard_stats()
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_properties INT;
+    v_days INT;
+BEGIN
+    LOCK TABLE "ROOMS", "BOOKINGS" IN SHARE MODE;
+    DELETE FROM "PROPERTY_STATS";
+    DELETE FROM "PROPERTY_DAILY_STATS";
+
+    INSERT INTO "PROPERTY_STATS" (property_id, room_count, bookable_rooms)
+    SELECT property_id, COUNT(*), COUNT(*) FILTER (WHERE availability_status)
+    FROM "ROOMS"
+    GROUP BY property_id;
+    GET DIAGNOSTICS v_properties = ROW_COUNT;
+
+    INSERT INTO "PROPERTY_DAILY_STATS" (property_id, day, occupied_rooms, check_ins, revenue)
+    SELECT property_id, day, SUM(occupied_rooms), SUM(check_ins), SUM(revenue)
+    FROM (
+        SELECT r.property_id, night::date AS day, 1 AS occupied_rooms, 0 AS check_ins, 0 AS revenue
+        FROM "BOOKINGS" b
+        JOIN "ROOMS" r ON r.room_id = b.room_id
+        CROSS JOIN generate_series(b.check_in_date, b.check_out_date - 1, interval '1 day') AS night
+        UNION ALL
+        SELECT r.property_id, b.check_in_date, 0, 1, 0
+        FROM "BOOKINGS" b JOIN "ROOMS" r ON r.room_id = b.room_id
+        UNION ALL
+        SELECT r.property_id, COALESCE(b.created_at, NOW())::date, 0, 0, COALESCE(b.total_price, 0)
+        FROM "BOOKINGS" b JOIN "ROOMS" r ON r.room_id = b.room_id
+    ) facts
+    GROUP BY property_id, day;
+    GET DIAGNOSTICS v_days = ROW_COUNT;
+
+    RETURN json_build_object('properties', v_properties, 'days', v_days);
+END;
+$$;
+
+-- owner_dashboard trusts p_owner_id (revenue of any owner) and the helpers write the counters,
+-- so only the backend (service role) may call them. The triggers run as the writing role,
+-- which is service_role (see sql/book_room.sql).
+REVOKE EXECUTE ON FUNCTION apply_room_stats_delta(INT, BOOLEAN, INT) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION apply_booking_stats_delta(INT, DATE, DATE, NUMERIC, TIMESTAMP, INT) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION owner_dashboard(INT, INT) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION backfill_dashboard_stats() FROM PUBLIC;
+DO $$
+BEGIN
+    -- The Supabase roles do not exist on a plain local Postgres
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION apply_room_stats_delta(INT, BOOLEAN, INT) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION apply_booking_stats_delta(INT, DATE, DATE, NUMERIC, TIMESTAMP, INT) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION owner_dashboard(INT, INT) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION backfill_dashboard_stats() FROM anon, authenticated;
+        GRANT EXECUTE ON FUNCTION apply_room_stats_delta(INT, BOOLEAN, INT) TO service_role;
+        GRANT EXECUTE ON FUNCTION apply_booking_stats_delta(INT, DATE, DATE, NUMERIC, TIMESTAMP, INT) TO service_role;
+        GRANT EXECUTE ON FUNCTION owner_dashboard(INT, INT) TO service_role;
+        GRANT EXECUTE ON FUNCTION backfill_dashboard_stats() TO service_role;
+    END IF;
+END
+$$;
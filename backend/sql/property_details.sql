@@ -0,0 +1,63 @@
+-- ============================================================
+-- Property detail page in one round trip (called from Guest.viewPropertyDetails)
+--   supabase.rpc('property_details', {"p_property_id": 1, "p_reviews_per_room": 5})
+-- Returns the property, its amenities and rooms, the newest N reviews of each room
+-- and per-room rating aggregates (count, average, 1-5 star histogram) from ROOM_RATINGS.
+-- NULL for a missing or archived property. Requires sql/ratings.sql.
+-- ============================================================
+
+-- Newest-first review pages per room use reviews_room_created_idx (migrations/0002)
+
+CREATE OR REPLACE FUNCTION property_details(p_property_id INT, p_reviews_per_room INT DEFAULT 5)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'property', to_json(p),
+        'amenities', COALESCE((
+            SELECT json_agg(a ORDER BY a.amenity_id)
+            FROM "AMENITIES" a
+            WHERE a.property_id = p.property_id
+        ), '[]'::json),
+        'rooms', COALESCE((
+            SELECT json_agg(r ORDER BY r.room_id)
+            FROM "ROOMS" r
+            WHERE r.property_id = p.property_id
+        ), '[]'::json),
+        'room_reviews', COALESCE((
+            SELECT json_object_agg(r.room_id, COALESCE(top.reviews, '[]'::json))
+            FROM "ROOMS" r
+            LEFT JOIN LATERAL (
+                SELECT json_agg(json_build_object(
+                    'review_id', v.review_id,
+                    'rating', v.rating,
+                    'comment', v.comment,
+                    'user_name', COALESCE(u.name, 'Unknown User'),
+                    'created_at', v.created_at
+                ) ORDER BY v.created_at DESC, v.review_id DESC) AS reviews
+                FROM (
+                    SELECT * FROM "REVIEWS"
+                    WHERE room_id = r.room_id
+                    ORDER BY created_at DESC, review_id DESC
+                    LIMIT p_reviews_per_room
+                ) v
+                LEFT JOIN "USERS" u ON u.user_id = v.user_id
+            ) top ON TRUE
+            WHERE r.property_id = p.property_id
+        ), '{}'::json),
+        'room_ratings', COALESCE((
+            SELECT json_object_agg(rr.room_id, json_build_object(
+                'count', rr.review_count,
+                'average', ROUND(rr.rating_sum::numeric / NULLIF(rr.review_count, 0), 2),
+                'histogram', json_build_object('1', rr.h1, '2', rr.h2, '3', rr.h3, '4', rr.h4, '5', rr.h5)
+            ))
+            FROM "ROOM_RATINGS" rr
+            WHERE rr.property_id = p.property_id
+              AND rr.review_count > 0
+        ), '{}'::json)
+    )
+    FROM "PROPERTIES" p
+    WHERE p.property_id = p_property_id
+      AND p.deleted_at IS NULL;  -- archived properties read as not found
+$$;
@@ -0,0 +1,142 @@
+-- ============================================================
+-- Materialized rating aggregates (maintained by trigger on REVIEWS)
+-- Run before sql/property_details.sql, which reads ROOM_RATINGS.
+-- ============================================================
+CREATE TABLE IF NOT EXISTS "ROOM_RATINGS" (
+    room_id INT PRIMARY KEY REFERENCES "ROOMS"(room_id) ON DELETE CASCADE,
+    property_id INT NOT NULL REFERENCES "PROPERTIES"(property_id) ON DELETE CASCADE,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    h1 INT NOT NULL DEFAULT 0,
+    h2 INT NOT NULL DEFAULT 0,
+    h3 INT NOT NULL DEFAULT 0,
+    h4 INT NOT NULL DEFAULT 0,
+    h5 INT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS room_ratings_property_idx ON "ROOM_RATINGS" (property_id);
+
+CREATE TABLE IF NOT EXISTS "PROPERTY_RATINGS" (
+    property_id INT PRIMARY KEY REFERENCES "PROPERTIES"(property_id) ON DELETE CASCADE,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    h1 INT NOT NULL DEFAULT 0,
+    h2 INT NOT NULL DEFAULT 0,
+    h3 INT NOT NULL DEFAULT 0,
+    h4 INT NOT NULL DEFAULT 0,
+    h5 INT NOT NULL DEFAULT 0,
+    average NUMERIC(3, 2) GENERATED ALWAYS AS (
+        CASE WHEN review_count > 0 THEN ROUND(rating_sum::numeric / review_count, 2) ELSE 0 END
+    ) STORED
+);
+-- "Sort by rating" over the whole catalog
+CREATE INDEX IF NOT EXISTS property_ratings_average_idx ON "PROPERTY_RATINGS" (average DESC, property_id);
+
+-- Adds `delta` (+1 / -1) reviews of `rating` to both aggregate rows
+CREATE OR REPLACE FUNCTION apply_rating_delta(p_room_id INT, p_rating INT, delta INT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_property_id INT;
+BEGIN
+    SELECT property_id INTO v_property_id FROM "ROOMS" WHERE room_id = p_room_id;
+    IF v_property_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO "ROOM_RATINGS" AS t (room_id, property_id, review_count, rating_sum, h1, h2, h3, h4, h5)
+    VALUES (p_room_id, v_property_id, delta, delta * p_rating,
+            CASE WHEN p_rating = 1 THEN delta ELSE 0 END, CASE WHEN p_rating = 2 THEN delta ELSE 0 END,
+            CASE WHEN p_rating = 3 THEN delta ELSE 0 END, CASE WHEN p_rating = 4 THEN delta ELSE 0 END,
+            CASE WHEN p_rating = 5 THEN delta ELSE 0 END)
+    ON CONFLICT (room_id) DO UPDATE SET
+        review_count = t.review_count + EXCLUDED.review_count,
+        rating_sum = t.rating_sum + EXCLUDED.rating_sum,
+        h1 = t.h1 + EXCLUDED.h1, h2 = t.h2 + EXCLUDED.h2, h3 = t.h3 + EXCLUDED.h3,
+        h4 = t.h4 + EXCLUDED.h4, h5 = t.h5 + EXCLUDED.h5;
+
+    INSERT INTO "PROPERTY_RATINGS" AS t (property_id, review_count, rating_sum, h1, h2, h3, h4, h5)
+    VALUES (v_property_id, delta, delta * p_rating,
+            CASE WHEN p_rating = 1 THEN delta ELSE 0 END, CASE WHEN p_rating = 2 THEN delta ELSE 0 END,
+            CASE WHEN p_rating = 3 THEN delta ELSE 0 END, CASE WHEN p_rating = 4 THEN delta ELSE 0 END,
+            CASE WHEN p_rating = 5 THEN delta ELSE 0 END)
+    ON CONFLICT (property_id) DO UPDATE SET
+        review_count = t.review_count + EXCLUDED.review_count,
+        rating_sum = t.rating_sum + EXCLUDED.rating_sum,
+        h1 = t.h1 + EXCLUDED.h1, h2 = t.h2 + EXCLUDED.h2, h3 = t.h3 + EXCLUDED.h3,
+        h4 = t.h4 + EXCLUDED.h4, h5 = t.h5 + EXCLUDED.h5;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION reviews_rating_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Set by delete_property_graph (sql/delete_property.sql), which drops the aggregates itself
+    IF current_setting('stayngo.skip_rating_trigger', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_rating_delta(OLD.room_id, OLD.rating, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_rating_delta(NEW.room_id, NEW.rating, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS reviews_rating_aggregates ON "REVIEWS";
+CREATE TRIGGER reviews_rating_aggregates
+    AFTER INSERT OR DELETE OR UPDATE OF rating, room_id ON "REVIEWS"
+    FOR EACH ROW EXECUTE FUNCTION reviews_rating_trigger();
+
+-- One-off rebuild from REVIEWS (python backfill_ratings.py)
+CREATE OR REPLACE FUNCTION backfill_rating_aggregates()
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rooms INT;
+    v_properties INT;
+BEGIN
+    LOCK TABLE "REVIEWS" IN SHARE MODE;
+    DELETE FROM "ROOM_RATINGS";
+    DELETE FROM "PROPERTY_RATINGS";
+
+    INSERT INTO "ROOM_RATINGS" (room_id, property_id, review_count, rating_sum, h1, h2, h3, h4, h5)
+    SELECT v.room_id, r.property_id, COUNT(*), SUM(v.rating),
+           COUNT(*) FILTER (WHERE v.rating = 1), COUNT(*) FILTER (WHERE v.rating = 2),
+           COUNT(*) FILTER (WHERE v.rating = 3), COUNT(*) FILTER (WHERE v.rating = 4),
+           COUNT(*) FILTER (WHERE v.rating = 5)
+    FROM "REVIEWS" v
+    JOIN "ROOMS" r ON r.room_id = v.room_id
+    GROUP BY v.room_id, r.property_id;
+    GET DIAGNOSTICS v_rooms = ROW_COUNT;
+
+    INSERT INTO "PROPERTY_RATINGS" (property_id, review_count, rating_sum, h1, h2, h3, h4, h5)
+    SELECT property_id, SUM(review_count), SUM(rating_sum), SUM(h1), SUM(h2), SUM(h3), SUM(h4), SUM(h5)
+    FROM "ROOM_RATINGS"
+    GROUP BY property_id;
+    GET DIAGNOSTICS v_properties = ROW_COUNT;
+
+    RETURN json_build_object('rooms', v_rooms, 'properties', v_properties);
+END;
+$$;
+
+-- The helpers write the aggregates, so only the backend (service role) may call them. The
+-- trigger runs as the writing role, which is service_role (see sql/book_room.sql).
+REVOKE EXECUTE ON FUNCTION apply_rating_delta(INT, INT, INT) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION backfill_rating_aggregates() FROM PUBLIC;
+DO $$
+BEGIN
+    -- The Supabase roles do not exist on a plain local Postgres
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION apply_rating_delta(INT, INT, INT) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION backfill_rating_aggregates() FROM anon, authenticated;
+        GRANT EXECUTE ON FUNCTION apply_rating_delta(INT, INT, INT) TO service_role;
+        GRANT EXECUTE ON FUNCTION backfill_rating_aggregates() TO service_role;
+    END IF;
+END
+$$;
@@ -0,0 +1,12 @@
+-- ============================================================
+-- Watermarks for incremental background jobs (scheduler.py)
+-- ============================================================
+CREATE TABLE IF NOT EXISTS "SCHEDULER_STATE" (
+    job_name VARCHAR(100) PRIMARY KEY,
+    watermark DATE,
+    last_run_at TIMESTAMP,
+    last_duration_ms INT,
+    last_rows_touched INT
+);
+
+-- The incremental scan of newly checked-out bookings uses bookings_check_out_date_idx (migrations/0002)
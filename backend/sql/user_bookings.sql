@@ -0,0 +1,25 @@
+-- ============================================================
+-- Flattened, projected bookings for "My Bookings" (Guest.viewBookings)
+--   supabase.table('USER_BOOKINGS').select(...).eq("user_id", ...)
+-- Run after sql/delete_property.sql.
+-- ============================================================
+CREATE OR REPLACE VIEW "USER_BOOKINGS"
+WITH (security_invoker = true) AS
+SELECT
+    b.booking_id,
+    b.user_id,
+    b.room_id,
+    r.property_id,
+    b.check_in_date,
+    b.check_out_date,
+    b.total_price,
+    r.room_type,
+    p.address,
+    -- No PAYMENTS row yet: the record_payment job is still queued (see jobs.py)
+    COALESCE(pay.payment_status, 'processing') AS payment_status
+FROM "BOOKINGS" b
+JOIN "ROOMS" r ON r.room_id = b.room_id
+JOIN "PROPERTIES" p ON p.property_id = r.property_id
+LEFT JOIN "PAYMENTS" pay ON pay.booking_id = b.booking_id;
+
+-- Keyset pages per user on (check_in_date, booking_id) use bookings_user_check_in_idx (migrations/0002)
@@ -0,0 +1,625 @@
+# sql_repository.py
+"""
+Repository implementations that speak SQL directly instead of going through PostgREST.
+
+SQLRepository holds the portable queries (written with `?` placeholders and quoted
+UPPERCASE identifiers, as in SQL_COMMANDS.md). Every statement is timed and reported to
+the listeners added with add_listener() (RequestProfiler.on_query). PostgresRepository
+(pg_repository.py) runs them on the production database. SQLiteRepository runs them on a
+local file, creating the schema on first use. It is meant for benchmarks (benchmark.py) and
+offline development:
+
+- Rating aggregates and dashboard figures are computed with GROUP BY instead of the
+  trigger-maintained tables that production uses (sql/ratings.sql, sql/owner_dashboard.sql).
+- book_room takes SQLite's write lock (BEGIN IMMEDIATE) instead of a row lock, so bookings
+  are serialized per database, not per room.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from repository import BOOKING_FIELDS, CATALOG_ROOM_FIELDS, Repository, RepositoryError, _child
+from search_index import PROPERTY_FIELDS
+
+BOOL_COLUMNS = ("availability_status",)
+PURGE_COUNTS = ("bookings", "payments", "reviews", "amenities")
+
+
+class SQLRepository(Repository):
+    """Portable SQL; subclasses provide connections (_cursor / _transaction) and _sql()."""
+    _listeners = ()
+    # UPDATE ... FROM: Postgres' RETURNING * would include the FROM columns too
+    UPDATE_RETURNING = "t.*"
+
+    def add_listener(self, listener):
+        """listener(backend, failed, seconds) is called after every statement."""
+        self._listeners = (*self._listeners, listener)
+
+    def _sql(self, query):
+        return query
+
+    def _execute(self, cur, query, params, prepare):
+        """Runs one statement. `prepare` marks the hot queries a server-side plan pays off for."""
+        cur.execute(query, params)
+
+    @contextmanager
+    def _cursor(self):
+        raise NotImplementedError
+
+    @contextmanager
+    def _transaction(self):
+        raise NotImplementedError
+
+    def _rows(self, cur):
+        columns = [c[0] for c in cur.description]
+        rows = [dict(zip(columns, values)) for values in cur.fetchall()]
+        for row in rows:
+            for column in BOOL_COLUMNS:
+                if column in row and row[column] is not None:
+                    row[column] = bool(row[column])
+        return rows
+
+    def _query(self, query, params=(), cur=None, prepare=False):
+        if cur is None:
+            with self._cursor() as own:
+                return self._query(query, params, own, prepare)
+        started, failed = time.perf_counter(), True
+        try:
+            self._execute(cur, self._sql(query), params, prepare)
+            rows = self._rows(cur) if cur.description else []
+            failed = False
+            return rows
+        finally:
+            seconds = time.perf_counter() - started
+            for listener in self._listeners:
+                listener(self.backend, failed, seconds)
+
+    def _one(self, query, params=(), cur=None, prepare=False):
+        rows = self._query(query, params, cur, prepare)
+        return rows[0] if rows else None
+
+    def _json_array(self, query, params, table):
+        """
+        The rows of `SELECT * FROM "<table>" ...` as JSON array text. Subclasses let the
+        database build it, so the rows are never turned into Python objects.
+        """
+        return json.dumps(self._query(query, params), default=str)
+
+    def _in(self, values):
+        return ", ".join("?" for _ in values)
+
+    def ping(self):
+        return self._one('SELECT COUNT(*) AS n FROM "USERS"')["n"]
+
+    # ------------------------------
+    # Ownership lookups
+    # ------------------------------
+    def property_owner(self, property_id):
+        row = self._one('SELECT owner_id FROM "PROPERTIES" WHERE property_id = ?', (property_id,))
+        return row["owner_id"] if row else None
+
+    def room_property(self, room_id):
+        row = self._one('SELECT property_id FROM "ROOMS" WHERE room_id = ?', (room_id,))
+        return row["property_id"] if row else None
+
+    def amenity_property(self, amenity_id):
+        row = self._one('SELECT property_id FROM "AMENITIES" WHERE amenity_id = ?', (amenity_id,))
+        return row["property_id"] if row else None
+
+    # ------------------------------
+    # Users
+    # ------------------------------
+    def user_profiles(self, auth_id, role=None):
+        query, params = 'SELECT user_id, name, role FROM "USERS" WHERE auth_id = ?', [auth_id]
+        if role:
+            query += " AND role = ?"
+            params.append(role)
+        return self._query(query, params)
+
+    def user_contact(self, user_id):
+        return self._one('SELECT name, email FROM "USERS" WHERE user_id = ?', (user_id,))
+
+    def _insert(self, table, rows, cur):
+        """One multi-row INSERT; returns the new rows in the order of `rows`."""
+        columns = list(rows[0])
+        values = ", ".join(f"({self._in(columns)})" for _ in rows)
+        inserted = self._query(f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES {values} RETURNING *',
+                               [row[c] for row in rows for c in columns], cur)
+        if len(inserted) > 1:
+            # The serial key (every table's first column) follows the VALUES order; RETURNING's does not have to
+            key = next(iter(inserted[0]))
+            inserted.sort(key=lambda row: row[key])
+        return inserted
+
+    def create_user(self, row):
+        with self._transaction() as cur:
+            return self._insert('USERS', [row], cur)
+
+    # ------------------------------
+    # Warm-up reads
+    # ------------------------------
+    def search_catalog(self):
+        properties = self._query(
+            f'SELECT {", ".join(PROPERTY_FIELDS)} FROM "PROPERTIES" WHERE deleted_at IS NULL ORDER BY property_id'
+        )
+        rooms = self._query(f'SELECT {", ".join(CATALOG_ROOM_FIELDS)} FROM "ROOMS" ORDER BY room_id')
+        ratings = self._query(
+            'SELECT r.property_id, COUNT(*) AS review_count, SUM(v.rating) AS rating_sum '
+            'FROM "REVIEWS" v JOIN "ROOMS" r ON r.room_id = v.room_id GROUP BY r.property_id'
+        )
+        return properties, rooms, ratings
+
+    def active_bookings(self, today):
+        return self._query(
+            'SELECT booking_id, room_id, check_in_date, check_out_date FROM "BOOKINGS" '
+            'WHERE check_out_date > ? ORDER BY booking_id', (today,)
+        )
+
+    # ------------------------------
+    # Properties
+    # ------------------------------
+    def insert_property(self, row):
+        with self._transaction() as cur:
+            return self._insert('PROPERTIES', [row], cur)
+
+    def update_property(self, property_id, owner_id, values):
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        return self._write(
+            f'UPDATE "PROPERTIES" SET {assignments} WHERE property_id = ? AND owner_id = ? RETURNING *',
+            [*values.values(), property_id, owner_id]
+        )
+
+    def _write(self, query, params=()):
+        with self._transaction() as cur:
+            return self._query(query, params, cur)
+
+    def _room_ids(self, property_id, cur):
+        return [r["room_id"] for r in self._query(
+            'SELECT room_id FROM "ROOMS" WHERE property_id = ? ORDER BY room_id', (property_id,), cur)]
+
+    def _delete_graph(self, property_id, cur):
+        room_ids = self._room_ids(property_id, cur)
+        counts = dict.fromkeys(PURGE_COUNTS, 0)
+        if room_ids:
+            marks = self._in(room_ids)
+            bookings = f'SELECT booking_id FROM "BOOKINGS" WHERE room_id IN ({marks})'
+            counts["payments"] = len(self._query(
+                f'DELETE FROM "PAYMENTS" WHERE booking_id IN ({bookings}) RETURNING payment_id', room_ids, cur))
+            counts["bookings"] = len(self._query(
+                f'DELETE FROM "BOOKINGS" WHERE room_id IN ({marks}) RETURNING booking_id', room_ids, cur))
+            counts["reviews"] = len(self._query(
+                f'DELETE FROM "REVIEWS" WHERE room_id IN ({marks}) RETURNING review_id', room_ids, cur))
+        counts["amenities"] = len(self._query(
+            'DELETE FROM "AMENITIES" WHERE property_id = ? RETURNING amenity_id', (property_id,), cur))
+        self._query('DELETE FROM "ROOMS" WHERE property_id = ?', (property_id,), cur)
+        self._query('DELETE FROM "PROPERTIES" WHERE property_id = ?', (property_id,), cur)
+        return {"property_id": property_id, "room_ids": room_ids, **counts}
+
+    def delete_property(self, property_id, owner_id, purge=False):
+        with self._transaction() as cur:
+            if purge:
+                if not self._one('SELECT 1 AS ok FROM "PROPERTIES" WHERE property_id = ? AND owner_id = ?',
+                                 (property_id, owner_id), cur):
+                    return None
+                return self._delete_graph(property_id, cur)
+            row = self._one(
+                'UPDATE "PROPERTIES" SET deleted_at = COALESCE(deleted_at, ?) '
+                'WHERE property_id = ? AND owner_id = ? RETURNING deleted_at',
+                (datetime.now().isoformat(sep=" ", timespec="seconds"), property_id, owner_id), cur
+            )
+            if row is None:
+                return None
+            return {"property_id": property_id, "archived_at": row["deleted_at"],
+                    "room_ids": self._room_ids(property_id, cur)}
+
+    def owner_properties(self, owner_id):
+        return self._query('SELECT * FROM "PROPERTIES" WHERE owner_id = ? AND deleted_at IS NULL', (owner_id,))
+
+    def owner_properties_json(self, owner_id):
+        return self._json_array('SELECT * FROM "PROPERTIES" WHERE owner_id = ? AND deleted_at IS NULL', (owner_id,),
+                                "PROPERTIES")
+
+    def owner_property(self, property_id, owner_id):
+        return self._one('SELECT * FROM "PROPERTIES" WHERE property_id = ? AND owner_id = ?', (property_id, owner_id))
+
+    def owner_dashboard(self, owner_id, upcoming_days):
+        today = date.today()
+        month_start, tomorrow = today.replace(day=1), today + timedelta(days=1)
+        until = today + timedelta(days=upcoming_days)
+        owned = 'SELECT property_id FROM "PROPERTIES" WHERE owner_id = ? AND deleted_at IS NULL'
+        with self._cursor() as cur:
+            properties = self._query(
+                'SELECT property_id, address, city, state, country, description, image_url FROM "PROPERTIES" '
+                'WHERE owner_id = ? AND deleted_at IS NULL ORDER BY property_id', (owner_id,), cur)
+            rooms = self._query(
+                f'SELECT property_id, COUNT(*) AS room_count, '
+                f'SUM(CASE WHEN availability_status THEN 1 ELSE 0 END) AS bookable_rooms '
+                f'FROM "ROOMS" WHERE property_id IN ({owned}) GROUP BY property_id', (owner_id,), cur)
+            bookings = self._query(
+                f'SELECT r.property_id, '
+                f'SUM(CASE WHEN b.check_in_date <= ? AND b.check_out_date > ? THEN 1 ELSE 0 END) AS occupied_today, '
+                f'SUM(CASE WHEN b.created_at >= ? AND b.created_at < ? THEN b.total_price ELSE 0 END) AS revenue_mtd, '
+                f'SUM(CASE WHEN b.check_in_date >= ? AND b.check_in_date < ? THEN 1 ELSE 0 END) AS upcoming_check_ins '
+                f'FROM "BOOKINGS" b JOIN "ROOMS" r ON r.room_id = b.room_id '
+                f'WHERE r.property_id IN ({owned}) AND (b.check_out_date > ? OR b.created_at >= ?) '
+                f'GROUP BY r.property_id',
+                (today.isoformat(), today.isoformat(), month_start.isoformat(), tomorrow.isoformat(),
+                 today.isoformat(), until.isoformat(), owner_id, today.isoformat(), month_start.isoformat()), cur)
+            ratings = self._query(
+                f'SELECT r.property_id, COUNT(*) AS review_count, ROUND(AVG(v.rating), 2) AS average_rating '
+                f'FROM "REVIEWS" v JOIN "ROOMS" r ON r.room_id = v.room_id '
+                f'WHERE r.property_id IN ({owned}) GROUP BY r.property_id', (owner_id,), cur)
+        by_property = {}
+        for rows in (rooms, bookings, ratings):
+            for row in rows:
+                by_property.setdefault(row.pop("property_id"), {}).update(row)
+        defaults = {"room_count": 0, "bookable_rooms": 0, "occupied_today": 0, "revenue_mtd": 0,
+                    "upcoming_check_ins": 0, "average_rating": 0, "review_count": 0}
+        return [{**p, **defaults, **{k: v or 0 for k, v in by_property.get(p["property_id"], {}).items()}}
+                for p in properties]
+
+    def property_with_rooms(self, property_id, owner_id):
+        with self._cursor() as cur:
+            property_details = self._one(
+                'SELECT * FROM "PROPERTIES" WHERE property_id = ? AND owner_id = ?', (property_id, owner_id), cur)
+            if property_details is None:
+                return None, None
+            return property_details, self._query('SELECT * FROM "ROOMS" WHERE property_id = ?', (property_id,), cur)
+
+    def booked_room_ids(self, property_id, day):
+        # Room status EXISTS query from SQL_COMMANDS.md, one index probe per room
+        rows = self._query(
+            'SELECT r.room_id FROM "ROOMS" r WHERE r.property_id = ? AND EXISTS ('
+            'SELECT 1 FROM "BOOKINGS" b WHERE b.room_id = r.room_id AND b.check_in_date <= ? AND b.check_out_date > ?)',
+            (property_id, day, day), prepare=True
+        )
+        return {r["room_id"] for r in rows}
+
+    def property_details(self, property_id, reviews_per_room):
+        with self._cursor() as cur:
+            prop = self._one('SELECT * FROM "PROPERTIES" WHERE property_id = ? AND deleted_at IS NULL', (property_id,),
+                             cur)
+            if prop is None:
+                return None
+            amenities = self._query(
+                'SELECT * FROM "AMENITIES" WHERE property_id = ? ORDER BY amenity_id', (property_id,), cur)
+            rooms = self._query('SELECT * FROM "ROOMS" WHERE property_id = ? ORDER BY room_id', (property_id,), cur)
+            room_reviews = {
+                str(room["room_id"]): self.room_reviews(room["room_id"], None, reviews_per_room, cur)
+                for room in rooms
+            }
+            ratings = self._query(
+                'SELECT v.room_id, COUNT(*) AS count, ROUND(AVG(v.rating), 2) AS average, '
+                'SUM(CASE WHEN v.rating = 1 THEN 1 ELSE 0 END) AS h1, SUM(CASE WHEN v.rating = 2 THEN 1 ELSE 0 END) AS h2, '
+                'SUM(CASE WHEN v.rating = 3 THEN 1 ELSE 0 END) AS h3, SUM(CASE WHEN v.rating = 4 THEN 1 ELSE 0 END) AS h4, '
+                'SUM(CASE WHEN v.rating = 5 THEN 1 ELSE 0 END) AS h5 '
+                'FROM "REVIEWS" v JOIN "ROOMS" r ON r.room_id = v.room_id '
+                'WHERE r.property_id = ? GROUP BY v.room_id', (property_id,), cur)
+        room_ratings = {
+            str(r["room_id"]): {
+                "count": r["count"], "average": r["average"],
+                "histogram": {str(star): r[f"h{star}"] for star in range(1, 6)}
+            } for r in ratings
+        }
+        return {"property": prop, "amenities": amenities, "rooms": rooms,
+                "room_reviews": room_reviews, "room_ratings": room_ratings}
+
+    # ------------------------------
+    # Rooms / amenities
+    # ------------------------------
+    def child_row(self, table, row_id):
+        return self._one(f'SELECT * FROM "{table}" WHERE {_child(table)} = ?', (row_id,))
+
+    def property_children(self, table, property_id):
+        _child(table)
+        return self._query(f'SELECT * FROM "{table}" WHERE property_id = ?', (property_id,))
+
+    def property_children_json(self, table, property_id):
+        _child(table)
+        return self._json_array(f'SELECT * FROM "{table}" WHERE property_id = ?', (property_id,), table)
+
+    def insert_rows(self, table, rows):
+        _child(table)
+        if not rows:
+            return []
+        with self._transaction() as cur:
+            return self._insert(table, rows, cur)
+
+    def update_row(self, table, row_id, values):
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        return self._write(f'UPDATE "{table}" SET {assignments} WHERE {_child(table)} = ? RETURNING *',
+                           [*values.values(), row_id])
+
+    def delete_row(self, table, row_id):
+        return self._write(f'DELETE FROM "{table}" WHERE {_child(table)} = ? RETURNING *', (row_id,))
+
+    def existing_ids(self, table, ids, property_id):
+        id_field = _child(table)
+        rows = self._query(f'SELECT {id_field} FROM "{table}" WHERE {id_field} IN ({self._in(ids)}) AND property_id = ?',
+                           [*ids, property_id])
+        return {r[id_field] for r in rows}
+
+    def update_rows(self, table, rows, property_id):
+        if not rows:
+            return []
+        id_field = _child(table)
+        columns = [id_field] + [column for column in rows[0] if column != id_field]
+        values = ", ".join(f"({self._in(columns)})" for _ in rows)
+        assignments = ", ".join(f"{column} = v.{column}" for column in columns[1:])
+        return self._write(
+            f'WITH v ({", ".join(columns)}) AS (VALUES {values}) '
+            f'UPDATE "{table}" AS t SET {assignments} FROM v '
+            f'WHERE t.{id_field} = v.{id_field} AND t.property_id = ? RETURNING {self.UPDATE_RETURNING}',
+            [row[c] for row in rows for c in columns] + [property_id]
+        )
+
+    def delete_ids(self, table, ids, property_id):
+        self._write(f'DELETE FROM "{table}" WHERE {_child(table)} IN ({self._in(ids)}) AND property_id = ?',
+                    [*ids, property_id])
+
+    # ------------------------------
+    # Bookings, payments, reviews
+    # ------------------------------
+    def book_room(self, user_id, room_id, check_in, check_out, payment_method, record_payment=True):
+        nights = (date.fromisoformat(check_out) - date.fromisoformat(check_in)).days
+        if nights <= 0:
+            raise RepositoryError("Invalid date range.")
+        with self._transaction() as cur:
+            room = self._one(self._lock_room_sql(), (room_id,), cur)
+            if room is None or not room["availability_status"]:
+                raise RepositoryError("This room is currently turned off by the admin.")
+            if room["deleted_at"] is not None:
+                raise RepositoryError("This property is no longer available.")
+            if self._one('SELECT 1 AS taken FROM "BOOKINGS" WHERE room_id = ? AND check_in_date < ? AND check_out_date > ?',
+                         (room_id, check_out, check_in), cur, prepare=True):
+                raise RepositoryError("Room is already booked for these dates.", "23P01")
+            total = round(nights * float(room["price_per_night"]), 2)
+            now = datetime.now().isoformat(sep=" ", timespec="seconds")
+            booking = self._one(
+                'INSERT INTO "BOOKINGS" (user_id, room_id, check_in_date, check_out_date, total_price, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) RETURNING booking_id',
+                (user_id, room_id, check_in, check_out, total, now, now), cur
+            )
+            if record_payment:
+                self._query(
+                    'INSERT INTO "PAYMENTS" (booking_id, payment_method, amount, payment_status, payment_date) '
+                    "VALUES (?, ?, ?, 'completed', ?)",
+                    (booking["booking_id"], payment_method, total, now), cur
+                )
+        return {"booking_id": booking["booking_id"], "total_price": total, "property_id": room["property_id"]}
+
+    def _lock_room_sql(self):
+        return ('SELECT r.availability_status, r.price_per_night, r.property_id, p.deleted_at '
+                'FROM "ROOMS" r JOIN "PROPERTIES" p ON p.property_id = r.property_id WHERE r.room_id = ?')
+
+    def user_booking(self, booking_id, user_id):
+        return self._one(
+            'SELECT b.*, r.property_id FROM "BOOKINGS" b LEFT JOIN "ROOMS" r ON r.room_id = b.room_id '
+            'WHERE b.booking_id = ? AND b.user_id = ?', (booking_id, user_id)
+        )
+
+    def delete_booking(self, booking_id):
+        self._write('DELETE FROM "BOOKINGS" WHERE booking_id = ?', (booking_id,))
+
+    def user_bookings(self, user_id, scope, today, after, limit):
+        ascending = scope == "upcoming"
+        direction = "ASC" if ascending else "DESC"
+        columns = ", ".join({"property_id": "r.property_id", "room_type": "r.room_type", "address": "p.address",
+                             "payment_status": "COALESCE(pay.payment_status, 'processing') AS payment_status"}
+                            .get(field, f"b.{field}") for field in BOOKING_FIELDS)
+        query = (f'SELECT {columns} FROM "BOOKINGS" b '
+                 f'JOIN "ROOMS" r ON r.room_id = b.room_id JOIN "PROPERTIES" p ON p.property_id = r.property_id '
+                 f'LEFT JOIN "PAYMENTS" pay ON pay.booking_id = b.booking_id '
+                 f'WHERE b.user_id = ?')
+        params = [user_id]
+        if scope == "upcoming":
+            query += " AND b.check_out_date > ?"
+            params.append(today)
+        elif scope == "past":
+            query += " AND b.check_out_date <= ?"
+            params.append(today)
+        if after:
+            query += f' AND (b.check_in_date, b.booking_id) {">" if ascending else "<"} (?, ?)'
+            params += [after["d"], int(after["id"])]
+        query += f" ORDER BY b.check_in_date {direction}, b.booking_id {direction} LIMIT ?"
+        return self._query(query, params + [limit])
+
+    def record_payment(self, row):
+        with self._transaction() as cur:
+            if not self._one('SELECT 1 AS ok FROM "BOOKINGS" WHERE booking_id = ?', (row["booking_id"],), cur):
+                return False
+            self._query(
+                'INSERT INTO "PAYMENTS" (booking_id, payment_method, amount, payment_status, payment_date) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT (booking_id) DO NOTHING',
+                (row["booking_id"], row["payment_method"], row["amount"], row["payment_status"], row["payment_date"]), cur
+            )
+        return True
+
+    def room_reviews(self, room_id, after, limit, cur=None):
+        query = ('SELECT v.review_id, v.rating, v.comment, COALESCE(u.name, \'Unknown User\') AS user_name, v.created_at '
+                 'FROM "REVIEWS" v LEFT JOIN "USERS" u ON u.user_id = v.user_id WHERE v.room_id = ?')
+        params = [room_id]
+        if after:
+            query += " AND (v.created_at, v.review_id) < (?, ?)"
+            params += [after["t"], int(after["id"])]
+        query += " ORDER BY v.created_at DESC, v.review_id DESC LIMIT ?"
+        return self._query(query, params + [limit], cur, prepare=True)
+
+    def insert_review(self, row):
+        with self._transaction() as cur:
+            return self._insert('REVIEWS', [row], cur)
+
+    # ------------------------------
+    # Scheduler
+    # ------------------------------
+    def scheduler_watermark(self, job_name):
+        row = self._one('SELECT watermark FROM "SCHEDULER_STATE" WHERE job_name = ?', (job_name,))
+        return row["watermark"] if row else None
+
+    def save_scheduler_state(self, row):
+        columns = list(row)
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "job_name")
+        self._write(
+            f'INSERT INTO "SCHEDULER_STATE" ({", ".join(columns)}) VALUES ({self._in(columns)}) '
+            f'ON CONFLICT (job_name) DO UPDATE SET {updates}', [row[c] for c in columns]
+        )
+
+    def checked_out_bookings(self, after, until):
+        query, params = 'SELECT booking_id, room_id FROM "BOOKINGS" WHERE check_out_date <= ?', [until]
+        if after:
+            query += " AND check_out_date > ?"
+            params.append(after)
+        return self._query(query + " ORDER BY booking_id", params)
+
+    def release_rooms(self, room_ids):
+        return self._write(
+            f'UPDATE "ROOMS" SET availability_status = TRUE WHERE room_id IN ({self._in(room_ids)}) RETURNING *', room_ids
+        )
+
+    def purge_archived(self, limit, grace_minutes):
+        cutoff = (datetime.now() - timedelta(minutes=grace_minutes)).isoformat(sep=" ", timespec="seconds")
+        with self._transaction() as cur:
+            ids = [r["property_id"] for r in self._query(
+                'SELECT property_id FROM "PROPERTIES" WHERE deleted_at IS NOT NULL AND deleted_at <= ? '
+                'ORDER BY deleted_at LIMIT ?', (cutoff, limit), cur)]
+            return [self._delete_graph(property_id, cur) for property_id in ids]
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS "USERS" (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password TEXT,
+    role TEXT NOT NULL,
+    phone_number TEXT,
+    auth_id TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "PROPERTIES" (
+    property_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner_id INTEGER NOT NULL REFERENCES "USERS"(user_id),
+    address TEXT, city TEXT, state TEXT, country TEXT,
+    description TEXT, image_url TEXT, image_description TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    deleted_at TEXT
+);
+CREATE TABLE IF NOT EXISTS "ROOMS" (
+    room_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    property_id INTEGER NOT NULL REFERENCES "PROPERTIES"(property_id) ON DELETE CASCADE,
+    room_type TEXT,
+    capacity INTEGER,
+    price_per_night REAL,
+    availability_status INTEGER DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS "AMENITIES" (
+    amenity_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    property_id INTEGER NOT NULL REFERENCES "PROPERTIES"(property_id) ON DELETE CASCADE,
+    name TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS "BOOKINGS" (
+    booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES "USERS"(user_id),
+    room_id INTEGER NOT NULL REFERENCES "ROOMS"(room_id) ON DELETE CASCADE,
+    check_in_date TEXT NOT NULL,
+    check_out_date TEXT NOT NULL,
+    total_price REAL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "PAYMENTS" (
+    payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    booking_id INTEGER NOT NULL UNIQUE REFERENCES "BOOKINGS"(booking_id) ON DELETE CASCADE,
+    payment_method TEXT,
+    amount REAL,
+    payment_status TEXT,
+    payment_date TEXT
+);
+CREATE TABLE IF NOT EXISTS "REVIEWS" (
+    review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_id INTEGER NOT NULL REFERENCES "ROOMS"(room_id) ON DELETE CASCADE,
+    user_id INTEGER REFERENCES "USERS"(user_id),
+    rating INTEGER NOT NULL,
+    comment TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "SCHEDULER_STATE" (
+    job_name TEXT PRIMARY KEY,
+    watermark TEXT,
+    last_run_at TEXT,
+    last_duration_ms INTEGER,
+    last_rows_touched INTEGER
+);
+CREATE INDEX IF NOT EXISTS properties_owner_idx ON "PROPERTIES" (owner_id);
+CREATE INDEX IF NOT EXISTS rooms_property_idx ON "ROOMS" (property_id);
+CREATE INDEX IF NOT EXISTS amenities_property_idx ON "AMENITIES" (property_id);
+CREATE INDEX IF NOT EXISTS bookings_room_dates_idx ON "BOOKINGS" (room_id, check_in_date, check_out_date);
+CREATE INDEX IF NOT EXISTS bookings_user_check_in_idx ON "BOOKINGS" (user_id, check_in_date, booking_id);
+CREATE INDEX IF NOT EXISTS bookings_check_out_date_idx ON "BOOKINGS" (check_out_date);
+CREATE INDEX IF NOT EXISTS reviews_room_created_idx ON "REVIEWS" (room_id, created_at DESC, review_id DESC);
+"""
+
+
+class SQLiteRepository(SQLRepository):
+    backend = "sqlite"
+    UPDATE_RETURNING = "*"  # SQLite rejects t.* there and returns only the target's columns
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._columns = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().executescript(SQLITE_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _cursor(self):
+        cur = self._connect().cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            yield cur
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        finally:
+            cur.close()
+
+    def _json_array(self, query, params, table):
+        if table not in self._columns:
+            with self._cursor() as cur:
+                cur.execute(f'PRAGMA table_info("{table}")')
+                self._columns[table] = [row[1] for row in cur.fetchall()]
+        values = []
+        for column in self._columns[table]:
+            value = f'"{column}"'
+            if column in BOOL_COLUMNS:
+                # Stored as 0/1; PostgREST returns true/false
+                value = f"json(CASE WHEN {value} IS NULL THEN 'null' WHEN {value} THEN 'true' ELSE 'false' END)"
+            values.append(f"'{column}', {value}")
+        row = self._one(f"SELECT json_group_array(json_object({', '.join(values)})) AS body FROM ({query})", params)
+        return row["body"]
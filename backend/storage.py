@@ -0,0 +1,89 @@
+# storage.py
+import os
+import shutil
+import tempfile
+
+CHUNK_SIZE = 256 * 1024
+
+
+def iter_chunks(fileobj, chunk_size=CHUNK_SIZE):
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class StorageBackend:
+    """Where uploaded property images end up. upload() consumes an iterator of byte chunks."""
+
+    def upload(self, path, chunks, content_type, size=None):
+        raise NotImplementedError
+
+    def upload_file(self, path, local_path, content_type):
+        with open(local_path, "rb") as f:
+            self.upload(path, iter_chunks(f), content_type, size=os.path.getsize(local_path))
+
+    def public_url(self, path):
+        raise NotImplementedError
+
+
+class SupabaseStorage(StorageBackend):
+    """Streams straight to the Storage REST API over the shared connection pool."""
+
+    def __init__(self, http, url, key, bucket):
+        self.http = http
+        self.url = url.rstrip("/") if url else ""
+        self.key = key
+        self.bucket = bucket
+
+    def upload(self, path, chunks, content_type, size=None):
+        headers = {
+            "Authorization": f"Bearer {self.key}",
+            "apikey": self.key,
+            "Content-Type": content_type,
+            "Cache-Control": "max-age=31536000",
+            "x-upsert": "true",
+        }
+        if size is not None:
+            headers["Content-Length"] = str(size)
+        response = self.http.post(
+            f"{self.url}/storage/v1/object/{self.bucket}/{path}",
+            content=chunks,
+            headers=headers,
+        )
+        if response.status_code >= 400:
+            raise RuntimeError(f"Storage upload failed ({response.status_code}): {response.text}")
+
+    def public_url(self, path):
+        return f"{self.url}/storage/v1/object/public/{self.bucket}/{path}"
+
+
+class LocalStorage(StorageBackend):
+    """Filesystem stand-in for development and tests; files are served by /api/media/<path>."""
+
+    def __init__(self, root, base_url="/api/media"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def upload(self, path, chunks, content_type, size=None):
+        target = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, target)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def upload_file(self, path, local_path, content_type):
+        target = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, target)
+
+    def public_url(self, path):
+        return f"{self.base_url}/{path}"
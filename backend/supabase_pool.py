@@ -0,0 +1,203 @@
+# supabase_pool.py
+import importlib.util
+import logging
+import threading
+import time
+import weakref
+
+import httpx
+from supabase import create_client
+from supabase.lib.client_options import SyncClientOptions
+
+log = logging.getLogger(__name__)
+
+# HTTP/2 support for httpx
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class PoolMetrics:
+    """Counters for the shared connection pool (saturation and connection reuse)."""
+
+    def __init__(self, max_connections):
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections_opened = 0
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finished(self, failed=False):
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.errors += 1
+
+    def opened(self, count):
+        if count:
+            with self._lock:
+                self.connections_opened += count
+
+    def snapshot(self):
+        with self._lock:
+            reused = max(self.requests - self.connections_opened, 0)
+            return {
+                "max_connections": self.max_connections,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "saturation": round(self.in_flight / self.max_connections, 4) if self.max_connections else 0.0,
+                "requests": self.requests,
+                "errors": self.errors,
+                "connections_opened": self.connections_opened,
+                "connection_reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0,
+            }
+
+
+class _MeteredStream(httpx.SyncByteStream):
+    """Counts response bytes and reports completion when the body is closed."""
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+        self.bytes_received = 0
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self.bytes_received += len(chunk)
+            yield chunk
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._stream.close()
+        finally:
+            self._on_close(self.bytes_received)
+
+
+class MeteredTransport(httpx.BaseTransport):
+    """
+    Wraps httpx.HTTPTransport to track in-flight requests and newly opened connections.
+    Listeners registered with add_listener() are called once per finished request as
+    listener(request, status_code, seconds, bytes_sent, bytes_received).
+    """
+
+    def __init__(self, inner, metrics):
+        self._inner = inner
+        self._metrics = metrics
+        self._known_connections = weakref.WeakSet()
+        self._listeners = []
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def handle_request(self, request):
+        started = time.perf_counter()
+        bytes_sent = int(request.headers.get("content-length", 0))
+        self._metrics.started()
+        try:
+            response = self._inner.handle_request(request)
+        except Exception:
+            self._metrics.finished(failed=True)
+            self._notify(request, 0, time.perf_counter() - started, bytes_sent, 0)
+            raise
+        self._count_new_connections()
+
+        def on_close(bytes_received):
+            self._metrics.finished()
+            self._notify(request, response.status_code, time.perf_counter() - started, bytes_sent, bytes_received)
+
+        response.stream = _MeteredStream(response.stream, on_close)
+        return response
+
+    def _count_new_connections(self):
+        pool = getattr(self._inner, "_pool", None)
+        new = 0
+        for connection in list(getattr(pool, "connections", ())):
+            if connection not in self._known_connections:
+                self._known_connections.add(connection)
+                new += 1
+        self._metrics.opened(new)
+
+    def _notify(self, request, status_code, seconds, bytes_sent, bytes_received):
+        for listener in self._listeners:
+            try:
+                listener(request, status_code, seconds, bytes_sent, bytes_received)
+            except Exception as err:
+                log.warning("HTTP metrics listener failed: %s", err)
+
+    def close(self):
+        self._inner.close()
+
+
+class SupabasePool:
+    """
+    One keep-alive (HTTP/2 when available) connection pool shared by lightweight
+    per-thread Supabase clients.
+
+    Data clients never authenticate, so their requests always carry the service key.
+    Sign-in/sign-up/sign-out go through auth_client(), a throwaway client whose
+    session state cannot leak into other requests.
+    """
+
+    def __init__(self, url, key, max_connections=50, max_keepalive=20,
+                 connect_timeout=5.0, read_timeout=15.0, keepalive_expiry=60.0):
+        self.url = url
+        self.key = key
+        self.metrics = PoolMetrics(max_connections)
+        inner = httpx.HTTPTransport(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            retries=1,
+        )
+        self.transport = MeteredTransport(inner, self.metrics)
+        self.http = httpx.Client(
+            transport=self.transport,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            follow_redirects=True,
+        )
+        self._local = threading.local()
+
+    def _new_client(self):
+        options = SyncClientOptions(
+            httpx_client=self.http,
+            persist_session=False,
+            auto_refresh_token=False,
+        )
+        return create_client(self.url, self.key, options=options)
+
+    def client(self):
+        """The calling thread's data client (created on first use)."""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._new_client()
+        return client
+
+    def auth_client(self):
+        """A fresh client for one auth operation; reuses the shared connections."""
+        return self._new_client()
+
+    def stats(self):
+        return {"http2": HTTP2_AVAILABLE, **self.metrics.snapshot()}
+
+
+class ThreadLocalClient:
+    """Drop-in stand-in for a supabase Client that routes every call to the thread's pooled client."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        return getattr(self._pool.client(), name)
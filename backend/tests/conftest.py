@@ -0,0 +1,69 @@
+# conftest.py
+"""
+Shared fixtures. Run from backend/: `python -m pytest tests`.
+
+The Postgres tests need DATABASE_URL pointing at a scratch database that
+`python migrate.py up` has been run on; they are skipped without it. Tests that
+need an empty schema create their own database next to it (scratch_database).
+
+Route tests use `client`: app.py imported once per session on a SQLite data layer,
+local storage and a job queue in a temp directory, with bearer-token auth.
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def pg_conninfo():
+    conninfo = os.getenv("DATABASE_URL")
+    if not conninfo:
+        pytest.skip("DATABASE_URL is not set")
+    return conninfo
+
+
+@contextmanager
+def scratch_database(conninfo, name):
+    """Creates an empty database `name` on conninfo's server; yields its conninfo and drops it."""
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+
+    name = f"{name}_{os.getpid()}"
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        conn.execute(f'CREATE DATABASE "{name}"')
+    try:
+        yield make_conninfo(conninfo, dbname=name)
+    finally:
+        with psycopg.connect(conninfo, autocommit=True) as conn:
+            conn.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+
+
+@pytest.fixture(scope="session")
+def flask_app(tmp_path_factory):
+    root = tmp_path_factory.mktemp("app")
+    env = {
+        "SUPABASE_URL": "http://localhost", "SUPABASE_KEY": "x", "SECRET_KEY": "test-secret",
+        "DATA_BACKEND": "sqlite", "SQLITE_PATH": str(root / "stayngo.sqlite3"),
+        "JOB_QUEUE_PATH": str(root / "jobs.sqlite3"), "AUTH_REVOCATIONS_PATH": str(root / "revocations.sqlite3"),
+        "STORAGE_BACKEND": "local", "LOCAL_STORAGE_DIR": str(root / "media"),
+        "UPLOAD_SPOOL_DIR": str(root / "spool"), "AUTH_MODE": "token", "REDIS_URL": "", "PROFILE_SAMPLE_RATE": "0",
+    }
+    with pytest.MonkeyPatch.context() as mp:
+        for key, value in env.items():
+            mp.setenv(key, value)
+        import app
+        yield app
+
+
+@pytest.fixture
+def client(flask_app):
+    client = flask_app.app.test_client()
+    client.token = lambda user_id, role="user", name="Test": {
+        "Authorization": f"Bearer {flask_app.auth_manager.verifier.issue(user_id, name, role)}"
+    }
+    return client
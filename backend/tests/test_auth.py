@@ -0,0 +1,151 @@
+# test_auth.py
+"""
+Bearer tokens and route guards (auth.py). Two TokenVerifier instances on one revocation
+store stand for two gunicorn workers.
+"""
+import pytest
+from flask import Flask, jsonify
+from itsdangerous import TimestampSigner
+
+import auth
+from auth import AuthManager, OwnerMap, RedisRevocations, RevocationStore, TokenVerifier
+from cache import RedisCache
+
+SECRET = "test-secret"
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def revocations(request, tmp_path, monkeypatch):
+    """Factory for one revocation store per worker, all backed by the same file / server."""
+    if request.param == "sqlite":
+        path = str(tmp_path / "revocations.sqlite3")
+        return lambda: RevocationStore(path)
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr("redis.Redis.from_url", lambda *args, **kwargs: fakeredis.FakeRedis(server=server))
+    return lambda: RedisRevocations(RedisCache("redis://fake", 60, prefix="stayngo-test:"))
+
+
+def test_issued_token_verifies(tmp_path):
+    verifier = TokenVerifier(SECRET, 3600, RevocationStore(str(tmp_path / "r.sqlite3")))
+    token = verifier.issue(7, "Asha", "admin")
+    assert verifier.verify(token) == {"uid": 7, "name": "Asha", "role": "admin"}
+    assert verifier.verify(token) is not None
+    assert (verifier.hits, verifier.misses) == (1, 1)
+
+
+def test_empty_secret_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        TokenVerifier("", 3600, RevocationStore(str(tmp_path / "r.sqlite3")))
+
+
+def test_forged_and_tampered_tokens_are_rejected(tmp_path):
+    store = RevocationStore(str(tmp_path / "r.sqlite3"))
+    verifier = TokenVerifier(SECRET, 3600, store)
+    forged = TokenVerifier("someone-else", 3600, store).issue(7, "Asha", "admin")
+    assert verifier.verify(forged) is None
+    token = verifier.issue(7, "Asha", "user")
+    assert verifier.verify(token[:-2] + ("AA" if token[-2:] != "AA" else "BB")) is None
+    assert verifier.verify("not-a-token") is None
+
+
+def test_expired_token_is_rejected(tmp_path, monkeypatch):
+    verifier = TokenVerifier(SECRET, 3600, RevocationStore(str(tmp_path / "r.sqlite3")))
+    real = TimestampSigner.get_timestamp
+    monkeypatch.setattr(TimestampSigner, "get_timestamp", lambda self: real(self) - 3601)
+    token = verifier.issue(7, "Asha", "admin")
+    monkeypatch.setattr(TimestampSigner, "get_timestamp", real)
+    assert verifier.verify(token) is None
+
+
+def test_logout_reaches_the_other_worker(revocations):
+    first = TokenVerifier(SECRET, 3600, revocations())
+    second = TokenVerifier(SECRET, 3600, revocations())
+    token = first.issue(7, "Asha", "admin")
+    assert first.verify(token) is not None
+
+    first.revoke(token)
+    assert first.verify(token) is None
+    assert second.verify(token) is None  # never verified there, so it asks the store
+
+
+def test_cached_verification_outlives_logout_by_at_most_cache_seconds(revocations, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth.time, "monotonic", lambda: now[0])
+    first = TokenVerifier(SECRET, 3600, revocations(), cache_seconds=60)
+    second = TokenVerifier(SECRET, 3600, revocations(), cache_seconds=60)
+    token = first.issue(7, "Asha", "admin")
+    assert second.verify(token) is not None
+
+    first.revoke(token)
+    now[0] += 59
+    assert second.verify(token) is not None  # still in the second worker's verified cache
+    now[0] += 2
+    assert second.verify(token) is None
+
+
+def test_revocations_survive_cache_churn(tmp_path):
+    verifier = TokenVerifier(SECRET, 3600, RevocationStore(str(tmp_path / "r.sqlite3")), max_entries=2)
+    token = verifier.issue(7, "Asha", "admin")
+    verifier.revoke(token)
+    for user_id in range(10):
+        verifier.verify(verifier.issue(user_id, "Guest", "user"))
+    assert verifier.verify(token) is None
+
+
+# ------------------------------
+# require_role / OwnerMap
+# ------------------------------
+@pytest.fixture
+def client(tmp_path):
+    """Owner 1 has property 10 (room 100); owner 2 has property 20; room 999's lookup fails."""
+    def room_property(room_id):
+        if room_id == 999:
+            raise ConnectionError("upstream down")
+        return {100: 10, 200: 20}.get(room_id)
+
+    owners = OwnerMap({10: 1, 20: 2}.get, room_property, {}.get)
+    verifier = TokenVerifier(SECRET, 3600, RevocationStore(str(tmp_path / "r.sqlite3")))
+    manager = AuthManager(verifier, owners, actor_factory=lambda p: None, mode="token")
+    app = Flask(__name__)
+    app.secret_key = SECRET
+
+    @app.route("/rooms/<int:room_id>")
+    @manager.require_role("admin", owns="room_id")
+    def edit_room(room_id):
+        return jsonify({"status": "success"})
+
+    @app.route("/logout")
+    def logout():
+        manager.logout()
+        return jsonify({"status": "success"})
+
+    client = app.test_client()
+    client.token = lambda user_id, role="admin": {"Authorization": f"Bearer {verifier.issue(user_id, 'X', role)}"}
+    return client
+
+
+def test_require_role_needs_a_principal_with_the_role(client):
+    assert client.get("/rooms/100").status_code == 401
+    assert client.get("/rooms/100", headers={"Authorization": "Bearer forged"}).status_code == 401
+    assert client.get("/rooms/100", headers=client.token(1, role="user")).status_code == 401
+    assert client.get("/rooms/100", headers=client.token(1)).status_code == 200
+
+
+def test_require_role_denies_other_owners(client):
+    assert client.get("/rooms/200", headers=client.token(1)).status_code == 403
+    assert client.get("/rooms/404", headers=client.token(1)).status_code == 403  # unknown room
+    assert client.get("/rooms/200", headers=client.token(2)).status_code == 200
+
+
+def test_failed_ownership_lookup_is_a_server_error(client):
+    response = client.get("/rooms/999", headers=client.token(1))
+    assert response.status_code == 500
+    assert response.get_json()["message"] == "Could not verify ownership."
+
+
+def test_logout_revokes_the_bearer_token(client):
+    headers = client.token(1)
+    assert client.get("/rooms/100", headers=headers).status_code == 200
+    client.get("/logout", headers=headers)
+    assert client.get("/rooms/100", headers=headers).status_code == 401
@@ -0,0 +1,182 @@
+# test_availability.py
+"""
+RoomAvailabilityIndex (availability.py) and the OccupancyBitmap it keeps in step
+(occupancy.py). Stays are [check_in, check_out): a check-out day is free for a new check-in.
+"""
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from availability import RoomAvailabilityIndex
+from occupancy import OccupancyBitmap
+
+
+def day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def booking(booking_id, room_id, check_in, check_out):
+    return {"booking_id": booking_id, "room_id": room_id, "check_in_date": day(check_in), "check_out_date": day(check_out)}
+
+
+@pytest.fixture
+def index():
+    index = RoomAvailabilityIndex(refresh_seconds=0, bitmap=OccupancyBitmap(horizon_days=60))
+    index.load([booking(1, 10, 5, 8), booking(2, 10, 10, 12), booking(3, 20, 0, 30)])
+    return index
+
+
+@pytest.mark.parametrize("check_in, check_out, free", [
+    (1, 5, True),    # checks out the day booking 1 checks in
+    (8, 10, True),   # between two bookings, back to back on both sides
+    (4, 6, False),   # overlaps the start
+    (7, 9, False),   # overlaps the end
+    (6, 7, False),   # inside
+    (3, 13, False),  # covers both
+    (12, 14, True),  # checks in the day booking 2 checks out
+])
+def test_is_free_edges(index, check_in, check_out, free):
+    assert index.is_free(10, day(check_in), day(check_out)) is free
+    assert (index.bitmap.free_for_range([10], day(check_in), day(check_out)) == [10]) is free
+
+
+def test_unknown_room_is_free(index):
+    assert index.is_free(99, day(0), day(3))
+
+
+def test_booking_on_and_next_free_window(index):
+    assert index.booking_on(10, day(5)) == 1
+    assert index.booking_on(10, day(8)) is None  # check-out night
+    assert index.next_free_window(10, day(6), 2) == (day(8), day(10))
+    assert index.next_free_window(10, day(6), 3) == (day(12), day(15))
+    assert index.occupancy_on([10, 20, 30], day(6)) == {10, 20}
+
+
+def test_add_and_remove(index):
+    index.add(4, 10, day(8), day(10))
+    assert not index.is_free(10, day(8), day(9))
+    assert index.booking_on(10, day(9)) == 4
+    assert not index.bitmap.free_for_range([10], day(8), day(9))
+
+    index.add(4, 10, day(8), day(10))  # replayed: no duplicate interval
+    index.remove(4)
+    assert index.is_free(10, day(8), day(10))
+    assert index.bitmap.free_for_range([10], day(8), day(10)) == [10]
+    index.remove(4)
+    index.remove(404)
+    assert not index.is_free(10, day(5), day(6))
+
+
+def test_writes_before_the_first_load_are_ignored():
+    index = RoomAvailabilityIndex(refresh_seconds=0)
+    index.add(1, 10, day(0), day(2))
+    index.remove(1)
+    index.load([])
+    assert index.is_free(10, day(0), day(2))
+
+
+def test_refresh_keeps_writes_made_while_the_loader_reads(index):
+    def loader():
+        # The database read has started: one booking made and one cancelled meanwhile.
+        # The read saw the cancellation (booking 2 is gone) but not the new booking 5.
+        index.add(5, 30, day(1), day(3))
+        index.remove(2)
+        index.add(6, 30, day(4), day(6))
+        return ([booking(1, 10, 5, 8), booking(3, 20, 0, 30), booking(6, 30, 4, 6)],)
+
+    index.expire()
+    index._refresh(loader)
+    assert not index.is_free(30, day(1), day(2))     # journaled add survived the swap
+    assert index.is_free(10, day(10), day(12))       # journaled remove applied
+    assert index.booking_on(30, day(4)) == 6         # seen by the read and journaled: once
+    assert index.next_free_window(30, day(4), 1) == (day(6), day(7))
+    assert not index.bitmap.free_for_range([30], day(1), day(2))
+
+
+def test_failed_refresh_keeps_the_old_data_and_stops_journaling(index):
+    def loader():
+        index.add(5, 30, day(1), day(3))
+        raise ConnectionError("upstream down")
+
+    index._refresh(loader)
+    assert index._journal is None
+    assert not index.is_free(10, day(5), day(6))
+    assert not index.is_free(30, day(1), day(2))  # applied to the live arrays as usual
+
+
+def test_expire_triggers_a_background_refresh(index, monkeypatch):
+    calls = []
+    monkeypatch.setattr(index, "_refresh", lambda loader: calls.append(loader))
+    index.refresh_seconds = 3600
+    index.ensure_loaded(lambda: ([],))
+    assert calls == []
+    index.expire()
+    index.ensure_loaded(lambda: ([],))
+    for _ in range(100):
+        if calls:
+            break
+        time.sleep(0.01)
+    assert len(calls) == 1
+
+
+# ------------------------------
+# OccupancyBitmap
+# ------------------------------
+def test_bitmap_matrix_and_ranges():
+    bitmap = OccupancyBitmap(horizon_days=30)
+    bitmap.load([booking(1, 10, 2, 4), booking(2, 10, 4, 5), booking(3, 20, -3, 1), booking(4, 30, 28, 40)])
+    matrix = bitmap.matrix([10, 20, 30, 40], day(0), 30)
+    assert OccupancyBitmap.ranges(matrix[0]) == [[2, 5]]   # back-to-back stays form one run
+    assert OccupancyBitmap.ranges(matrix[1]) == [[0, 1]]   # clipped at the origin
+    assert OccupancyBitmap.ranges(matrix[2]) == [[28, 30]]  # clipped at the horizon
+    assert not matrix[3].any()
+    assert bitmap.free_for_range([10, 20, 30, 40], day(1), day(2)) == [10, 20, 30, 40]
+    assert bitmap.free_for_range([10, 20, 30, 40], day(0), day(3)) == [30, 40]
+
+
+def test_bitmap_remove_clears_only_that_booking():
+    bitmap = OccupancyBitmap(horizon_days=30)
+    bitmap.load([booking(1, 10, 2, 4), booking(2, 10, 4, 6)])
+    bitmap.remove(1)
+    assert OccupancyBitmap.ranges(bitmap.matrix([10], day(0), 30)[0]) == [[4, 6]]
+    bitmap.remove(1)
+
+
+def test_bitmap_window_must_be_inside_the_horizon():
+    bitmap = OccupancyBitmap(horizon_days=30)
+    with pytest.raises(ValueError):
+        bitmap.matrix([10], day(-1), 5)
+    with pytest.raises(ValueError):
+        bitmap.matrix([10], day(28), 5)
+    with pytest.raises(ValueError):
+        bitmap.matrix([10], day(0), 0)
+
+
+def test_bitmap_encode_is_msb_first():
+    row = np.zeros(16, dtype=bool)
+    row[0] = row[9] = True
+    assert OccupancyBitmap.encode(row) == "gEA="
+
+
+def test_stale_index_does_not_reject_a_free_room(flask_app, client):
+    """A booking the index still holds (cancelled on another worker) must not block the room."""
+    repo = flask_app.repo
+    owner = repo.create_user({"name": "Owner", "email": "stale-owner@example.com", "role": "admin"})[0]
+    guest = repo.create_user({"name": "Guest", "email": "stale-guest@example.com", "role": "user"})[0]
+    prop = repo.insert_property({"owner_id": owner["user_id"], "address": "1 Main Road", "city": "Pune",
+                                 "state": "MH", "country": "India", "description": "Test"})[0]
+    room = repo.insert_rows("ROOMS", [{"property_id": prop["property_id"], "room_type": "Double", "capacity": 2,
+                                       "price_per_night": 1000, "availability_status": True}])[0]
+    assert flask_app.warm_availability()
+    flask_app.availability.add(-1, room["room_id"], day(20), day(22))
+
+    response = client.post(f"/api/book_room/{room['room_id']}/{prop['property_id']}", headers=client.token(guest["user_id"]),
+                           json={"check_in_date": day(20), "check_out_date": day(22), "payment_method": "card"})
+    assert response.status_code == 200, response.get_json()
+    assert flask_app.availability._expired  # the next request refreshes the index
+
+    response = client.post(f"/api/book_room/{room['room_id']}/{prop['property_id']}", headers=client.token(guest["user_id"]),
+                           json={"check_in_date": day(21), "check_out_date": day(23), "payment_method": "card"})
+    assert response.status_code == 400
@@ -0,0 +1,76 @@
+# test_book_room_concurrency.py
+"""book_room (sql/book_room.sql) under concurrent bookings of one room: exactly one wins."""
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+from pg_repository import PostgresRepository  # noqa: E402
+from repository import RepositoryError  # noqa: E402
+
+BOOKERS = 200
+
+
+@pytest.fixture
+def room(pg_conninfo):
+    """A fresh owner, property and room, plus BOOKERS guests; removed afterwards."""
+    with psycopg.connect(pg_conninfo, autocommit=True) as conn:
+        tag = f"concurrency-{threading.get_ident()}-{date.today().isoformat()}"
+        owner = conn.execute('INSERT INTO "USERS" (name, email, role) VALUES (%s, %s, %s) RETURNING user_id',
+                             ("Owner", f"owner-{tag}@example.com", "admin")).fetchone()[0]
+        guests = [conn.execute('INSERT INTO "USERS" (name, email, role) VALUES (%s, %s, %s) RETURNING user_id',
+                               (f"Guest {i}", f"guest{i}-{tag}@example.com", "user")).fetchone()[0]
+                  for i in range(BOOKERS)]
+        property_id = conn.execute(
+            'INSERT INTO "PROPERTIES" (owner_id, address, city, state, country) '
+            'VALUES (%s, %s, %s, %s, %s) RETURNING property_id', (owner, "1 Test Road", "Pune", "MH", "India")
+        ).fetchone()[0]
+        room_id = conn.execute(
+            'INSERT INTO "ROOMS" (property_id, room_type, capacity, price_per_night, availability_status) '
+            'VALUES (%s, %s, %s, %s, TRUE) RETURNING room_id', (property_id, "Double", 2, 1000)
+        ).fetchone()[0]
+    yield room_id, guests
+    with psycopg.connect(pg_conninfo, autocommit=True) as conn:
+        conn.execute('DELETE FROM "PAYMENTS" WHERE booking_id IN (SELECT booking_id FROM "BOOKINGS" WHERE room_id = %s)',
+                     (room_id,))
+        conn.execute('DELETE FROM "BOOKINGS" WHERE room_id = %s', (room_id,))
+        conn.execute('DELETE FROM "ROOMS" WHERE room_id = %s', (room_id,))
+        conn.execute('DELETE FROM "PROPERTIES" WHERE property_id = %s', (property_id,))
+        conn.execute('DELETE FROM "USERS" WHERE user_id = ANY(%s)', ([owner, *guests],))
+
+
+def test_one_of_many_concurrent_bookings_wins(pg_conninfo, room):
+    room_id, guests = room
+    check_in = date.today() + timedelta(days=30)
+    check_out = check_in + timedelta(days=2)
+    repo = PostgresRepository(pg_conninfo, min_size=20, max_size=40, timeout=60)
+    start = threading.Barrier(len(guests))
+    booked, rejected, errors = [], [], []
+
+    def book(user_id):
+        start.wait()
+        try:
+            booked.append(repo.book_room(user_id, room_id, check_in.isoformat(), check_out.isoformat(), "card"))
+        except RepositoryError as err:
+            rejected.append(err)
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=book, args=(user_id,)) for user_id in guests]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        repo.close()
+
+    assert errors == []
+    assert len(booked) == 1
+    assert len(rejected) == len(guests) - 1
+    assert all(err.code == "23P01" or "already booked" in str(err) for err in rejected)
+    with psycopg.connect(pg_conninfo) as conn:
+        rows = conn.execute('SELECT COUNT(*) FROM "BOOKINGS" WHERE room_id = %s', (room_id,)).fetchone()[0]
+    assert rows == 1
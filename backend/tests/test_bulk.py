@@ -0,0 +1,31 @@
+# test_bulk.py
+"""Row validation for /api/bulk_rooms and /api/bulk_amenities (bulk.py)."""
+import pytest
+
+from bulk import validate_amenity, validate_room
+
+ROOM = {"room_type": "Double", "capacity": 2, "price_per_night": 1500}
+
+
+@pytest.mark.parametrize("op", [1, True, ["create"], {"op": "create"}])
+def test_non_string_op_is_a_row_error(op):
+    with pytest.raises(ValueError, match="op must be one of"):
+        validate_room({**ROOM, "op": op})
+
+
+@pytest.mark.parametrize("price", ["NaN", "inf", "-inf", float("nan"), float("inf")])
+def test_price_must_be_finite(price):
+    with pytest.raises(ValueError, match="finite"):
+        validate_room({**ROOM, "price_per_night": price})
+
+
+@pytest.mark.parametrize("capacity", [float("inf"), "abc", None, 0])
+def test_bad_capacity_is_a_row_error(capacity):
+    with pytest.raises(ValueError):
+        validate_room({**ROOM, "capacity": capacity})
+
+
+def test_op_is_inferred_from_the_id():
+    assert validate_room(ROOM)[0] == "create"
+    assert validate_room({**ROOM, "room_id": "7"})[:2] == ("update", 7)
+    assert validate_amenity({"op": " Delete ", "id": 3}) == ("delete", 3, None)
@@ -0,0 +1,69 @@
+# test_cache_invalidation.py
+"""
+Cross-worker invalidation (cache.py): two cache instances stand for two gunicorn workers.
+With LocalCache, a write on one worker stays invisible to the other until the TTL expires;
+with RedisCache (REDIS_URL, or fakeredis when installed) it is visible at once.
+"""
+import os
+
+import pytest
+
+import cache
+from cache import LocalCache, RedisCache
+
+KEY = "property:1:rooms"
+
+
+class Database:
+    def __init__(self):
+        self.rooms = ["Single"]
+
+    def load(self):
+        return list(self.rooms)
+
+
+def write(worker, db):
+    """What a write path does: update the database, then invalidate_property() on its own cache."""
+    db.rooms.append("Suite")
+    worker.delete(KEY)
+
+
+def redis_pair(monkeypatch):
+    url = os.getenv("REDIS_URL")
+    if not url:
+        fakeredis = pytest.importorskip("fakeredis", reason="needs REDIS_URL or the fakeredis package")
+        server = fakeredis.FakeServer()  # one server, two clients: two workers
+        monkeypatch.setattr("redis.Redis.from_url", lambda *args, **kwargs: fakeredis.FakeRedis(server=server))
+        url = "redis://fake"
+    first, second = RedisCache(url, 60, prefix="stayngo-test:"), RedisCache(url, 60, prefix="stayngo-test:")
+    first.delete(KEY)
+    return first, second
+
+
+def test_local_cache_other_worker_is_stale_until_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    db = Database()
+    first, second = LocalCache(ttl_seconds=60), LocalCache(ttl_seconds=60)
+    assert first.get_or_load(KEY, db.load) == second.get_or_load(KEY, db.load) == ["Single"]
+
+    write(first, db)
+    assert first.get_or_load(KEY, db.load) == ["Single", "Suite"]
+    assert second.get_or_load(KEY, db.load) == ["Single"]  # stale on the other worker
+
+    now[0] += 59
+    assert second.get_or_load(KEY, db.load) == ["Single"]
+    now[0] += 2  # past CACHE_TTL_SECONDS
+    assert second.get_or_load(KEY, db.load) == ["Single", "Suite"]
+
+
+def test_redis_cache_invalidation_reaches_every_worker(monkeypatch):
+    first, second = redis_pair(monkeypatch)
+    db = Database()
+    assert first.get_or_load(KEY, db.load) == ["Single"]
+    assert second.get_or_load(KEY, db.load) == ["Single"]  # served from the shared store
+
+    write(first, db)
+    assert second.get_or_load(KEY, db.load) == ["Single", "Suite"]
+    assert first.get_or_load(KEY, db.load) == ["Single", "Suite"]
+    first.delete(KEY)
@@ -0,0 +1,97 @@
+# test_cursors.py
+"""
+Keyset cursors (app.read_cursor): they come back from the client, so a cursor with missing
+keys or values that are not a date / timestamp / row id is a 400, and no cursor text reaches
+a PostgREST filter string.
+"""
+import base64
+import json
+
+import pytest
+
+from repository import SupabaseRepository
+
+
+def encode(**values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+BAD_BOOKING_CURSORS = [
+    "not base64 !",
+    encode(id=1),                                           # missing d
+    encode(d="2030-01-01"),                                 # missing id
+    encode(d="2030-01-01", id=1, extra=True),
+    encode(d="2030-01-01,booking_id.gt.0", id=1),           # filter injection
+    encode(d="2030-01-01", id="1)"),
+    encode(d="2030-01-01", id=True),
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+]
+
+
+@pytest.mark.parametrize("cursor", BAD_BOOKING_CURSORS)
+def test_read_cursor_rejects_tampered_booking_cursors(flask_app, cursor):
+    with pytest.raises(ValueError, match="Invalid cursor."):
+        flask_app.read_cursor(cursor, d=flask_app.iso_date, id=flask_app.cursor_id)
+
+
+@pytest.mark.parametrize("t", ['2030-01-01T00:00:00",id.gt.0', "yesterday", 20300101])
+def test_read_cursor_rejects_bad_timestamps(flask_app, t):
+    with pytest.raises(ValueError, match="Invalid cursor."):
+        flask_app.read_cursor(encode(t=t, id=1), t=flask_app.iso_timestamp, id=flask_app.cursor_id)
+
+
+def test_read_cursor_round_trip(flask_app):
+    cursor = flask_app.make_cursor(t="2030-01-01 10:00:00.5+00:00", id=7)
+    assert flask_app.read_cursor(cursor, t=flask_app.iso_timestamp, id=flask_app.cursor_id) == \
+        {"t": "2030-01-01 10:00:00.5+00:00", "id": 7}
+    assert flask_app.read_cursor(None, d=flask_app.iso_date) is None
+
+
+def test_bad_cursor_is_a_400(flask_app, client):
+    guest = flask_app.repo.create_user({"name": "Guest", "email": "cursor@example.com", "role": "user"})[0]
+    headers = client.token(guest["user_id"])
+
+    response = client.get(f"/api/my_bookings?cursor={encode(id=1)}", headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {"status": "error", "message": "Invalid cursor."}
+    assert client.get(f"/api/my_bookings?cursor={encode(d='2030-01-01', id=1)}", headers=headers).status_code == 200
+
+    response = client.get(f"/api/room_reviews/1?cursor={encode(t='x', id=1)}", headers=headers)
+    assert response.status_code == 400
+
+
+class RecordingQuery:
+    """Stands in for a postgrest query builder; records the or_() filter."""
+
+    def __init__(self):
+        self.filters = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def or_(self, expression):
+        self.filters.append(expression)
+        return self
+
+    def execute(self):
+        return type("Response", (), {"data": []})()
+
+
+class RecordingClient:
+    def __init__(self):
+        self.query = RecordingQuery()
+
+    def table(self, name):
+        return self.query
+
+
+def test_supabase_filters_are_rendered_from_parsed_values():
+    repo = SupabaseRepository(RecordingClient())
+    repo.room_reviews(1, {"t": "2030-01-01 10:00:00+00:00", "id": 7}, 10)
+    repo.user_bookings(1, "all", "2030-01-01", {"d": "2030-01-02", "id": 8}, 10)
+    assert repo.client.query.filters == [
+        'created_at.lt."2030-01-01T10:00:00+00:00",and(created_at.eq."2030-01-01T10:00:00+00:00",review_id.lt.7)',
+        'check_in_date.lt.2030-01-02,and(check_in_date.eq.2030-01-02,booking_id.lt.8)',
+    ]
+    with pytest.raises(ValueError):
+        repo.room_reviews(1, {"t": '2030-01-01",id.gt.0', "id": 7}, 10)
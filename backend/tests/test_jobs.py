@@ -0,0 +1,152 @@
+# test_jobs.py
+"""
+JobQueue (jobs.py): idempotency keys, retry backoff, dead letters and leases. Two worker
+ids on one queue file stand for two jobs_worker.py processes.
+"""
+import threading
+
+import pytest
+
+import jobs
+from jobs import DEAD, DONE, QUEUED, RUNNING, JobQueue, PermanentJobError, run_worker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(jobs.time, "time", lambda: now[0])
+    monkeypatch.setattr(jobs.random, "uniform", lambda a, b: 1.0)  # no jitter
+    return now
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), retry_base_seconds=5, retry_max_seconds=60)
+
+
+def row(queue, job_id):
+    return dict(queue._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def test_idempotency_key_dedupes_until_pruned(queue, clock):
+    first = queue.enqueue("record_payment", {"booking_id": 1}, key="payment:1")
+    assert first is not None
+    assert queue.enqueue("record_payment", {"booking_id": 1}, key="payment:1") is None
+    assert queue.enqueue("record_payment", {"booking_id": 2}) != queue.enqueue("record_payment", {"booking_id": 2})
+
+    assert queue.complete(queue.claim("a"))
+    clock[0] += 3600
+    assert queue.prune(60) == 1
+    assert queue.enqueue("record_payment", {"booking_id": 1}, key="payment:1") is not None
+
+
+def test_claim_waits_for_run_at(queue, clock):
+    queue.enqueue("send_notification", {}, delay=30)
+    assert queue.claim("a") is None
+    clock[0] += 31
+    job = queue.claim("a")
+    assert (job["kind"], job["attempts"], job["locked_by"]) == ("send_notification", 1, "a")
+    assert queue.claim("b") is None  # leased
+
+
+def test_retry_backoff_is_exponential_and_capped(queue, clock):
+    job_id = queue.enqueue("record_payment", {}, max_attempts=10)
+    delays = []
+    for _ in range(6):
+        job = queue.claim("a")
+        assert queue.fail(job, ConnectionError("down")) == QUEUED
+        delays.append(row(queue, job_id)["run_at"] - clock[0])
+        clock[0] += delays[-1]
+    assert delays == [5, 10, 20, 40, 60, 60]
+    assert row(queue, job_id)["last_error"] == "down"
+
+
+def test_dead_letter_after_max_attempts(queue, clock):
+    job_id = queue.enqueue("record_payment", {}, key="payment:7", max_attempts=2)
+    assert queue.fail(queue.claim("a"), ValueError("first")) == QUEUED
+    clock[0] += 5
+    assert queue.fail(queue.claim("a"), ValueError("second")) == DEAD
+    clock[0] += 3600
+    assert queue.claim("a") is None
+    assert queue.dead_keys(["payment:7", "payment:8"]) == {"payment:7"}
+    assert [d["id"] for d in queue.dead_letters()] == [job_id]
+
+    assert queue.retry_dead(job_id)
+    assert queue.claim("a")["attempts"] == 1
+
+
+def test_expired_lease_is_reclaimed_and_the_old_worker_cannot_finish(queue, clock):
+    job_id = queue.enqueue("image_variants", {})
+    stale = queue.claim("a", lease_seconds=10)
+    clock[0] += 11
+    current = queue.claim("b", lease_seconds=10)
+    assert current["id"] == job_id and current["attempts"] == 2
+
+    assert queue.complete(stale) is False
+    assert queue.fail(stale, TimeoutError("late")) is None
+    assert (row(queue, job_id)["status"], row(queue, job_id)["locked_by"]) == (RUNNING, "b")
+
+    assert queue.complete(current)
+    assert row(queue, job_id)["status"] == DONE
+
+
+def test_job_that_kills_its_worker_is_dead_lettered(queue, clock):
+    job_id = queue.enqueue("image_variants", {}, max_attempts=2)
+    for worker in ("a", "b"):
+        assert queue.claim(worker, lease_seconds=10)["id"] == job_id
+        clock[0] += 11  # the worker died without complete() or fail()
+    assert queue.claim("c") is None
+    dead = row(queue, job_id)
+    assert (dead["status"], dead["attempts"], dead["locked_by"]) == (DEAD, 2, None)
+    assert "Lease expired" in dead["last_error"]
+
+
+def test_run_worker_completes_retries_and_dead_letters(queue):
+    ok = queue.enqueue("ok", {"n": 1})
+    flaky = queue.enqueue("flaky", {}, max_attempts=3)
+    permanent = queue.enqueue("permanent", {})
+    unknown = queue.enqueue("unknown", {})
+    stop, seen = threading.Event(), []
+
+    def flaky_handler(payload):
+        raise ConnectionError("try again")
+
+    def permanent_handler(payload):
+        raise PermanentJobError("bad payload")
+
+    def ok_handler(payload):
+        seen.append(payload)
+
+    queue.enqueue("stop", {})  # runs last: everything before it is due first
+    handlers = {"ok": ok_handler, "flaky": flaky_handler, "permanent": permanent_handler, "stop": lambda p: stop.set()}
+    run_worker(queue, handlers, stop_event=stop, poll_seconds=0.01)
+
+    assert seen == [{"n": 1}]
+    assert row(queue, ok)["status"] == DONE
+    assert (row(queue, flaky)["status"], row(queue, flaky)["attempts"]) == (QUEUED, 1)
+    assert (row(queue, permanent)["status"], row(queue, permanent)["attempts"]) == (DEAD, 1)
+    assert row(queue, unknown)["status"] == DEAD
+    assert "No handler" in row(queue, unknown)["last_error"]
+
+
+def test_booking_survives_a_queue_failure(flask_app, client, monkeypatch):
+    """The booking is committed before the jobs are queued; a queue error must not become a 400."""
+    repo = flask_app.repo
+    owner = repo.create_user({"name": "Owner", "email": "queue-owner@example.com", "role": "admin"})[0]
+    guest = repo.create_user({"name": "Guest", "email": "queue-guest@example.com", "role": "user"})[0]
+    prop = repo.insert_property({"owner_id": owner["user_id"], "address": "1 Main Road", "city": "Pune",
+                                 "state": "MH", "country": "India", "description": "Test"})[0]
+    room = repo.insert_rows("ROOMS", [{"property_id": prop["property_id"], "room_type": "Double", "capacity": 2,
+                                       "price_per_night": 1000, "availability_status": True}])[0]
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(flask_app.job_queue, "enqueue", broken)
+    response = client.post(f"/api/book_room/{room['room_id']}/{prop['property_id']}", headers=client.token(guest["user_id"]),
+                           json={"check_in_date": "2031-03-01", "check_out_date": "2031-03-03", "payment_method": "card"})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["payment_status"] == "completed"  # recorded inline instead
+    rows = repo.user_bookings(guest["user_id"], "all", "2031-01-01", None, 10)
+    assert [(r["booking_id"], r["payment_status"]) for r in rows] == [(body["booking_id"], "completed")]
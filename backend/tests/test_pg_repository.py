@@ -0,0 +1,31 @@
+# test_pg_repository.py
+"""qmark to psycopg placeholder translation (pg_repository.to_pyformat)."""
+import pytest
+
+from pg_repository import PostgresRepository, to_pyformat
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT * FROM t WHERE a = ? AND b IN (?, ?)", "SELECT * FROM t WHERE a = %s AND b IN (%s, %s)"),
+    ("SELECT '?', 'it''s ?', ?", "SELECT '?', 'it''s ?', %s"),
+    ('SELECT "odd?name" FROM t WHERE a = ?', 'SELECT "odd?name" FROM t WHERE a = %s'),
+    ("SELECT 1 -- why?\nWHERE a = ?", "SELECT 1 -- why?\nWHERE a = %s"),
+    ("SELECT /* a ? b */ ?", "SELECT /* a ? b */ %s"),
+    ("SELECT $$ ? $$, $f$ ? $f$, ?", "SELECT $$ ? $$, $f$ ? $f$, %s"),
+    ("SELECT doc ?? 'k', doc ??| ?, doc ??& ?", "SELECT doc ? 'k', doc ?| %s, doc ?& %s"),
+    ("SELECT a % 2, 'x%' WHERE b LIKE ?", "SELECT a %% 2, 'x%%' WHERE b LIKE %s"),
+])
+def test_to_pyformat(query, expected):
+    assert to_pyformat(query) == expected
+
+
+def test_literals_reach_postgres_intact(pg_conninfo):
+    repo = PostgresRepository(pg_conninfo, max_size=1)
+    try:
+        row = repo._one(
+            "SELECT ? AS a, '100% ?' AS b, 7 % 4 AS c, '{\"k\": 1}'::jsonb ?? 'k' AS d, "
+            "'{\"k\": 1}'::jsonb ??| ? AS e", (5, ["k", "z"])
+        )
+    finally:
+        repo.close()
+    assert row == {"a": 5, "b": "100% ?", "c": 3, "d": True, "e": True}
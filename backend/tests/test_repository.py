@@ -0,0 +1,185 @@
+# test_repository.py
+"""
+Repository contract tests (repository.py). Every backend runs the same tests:
+SQLiteRepository on a temp file, PostgresRepository on a migrated scratch database
+next to DATABASE_URL's (skipped without it).
+"""
+import pytest
+
+from conftest import scratch_database
+from repository import RepositoryError
+from sql_repository import SQLiteRepository
+
+
+@pytest.fixture(scope="module")
+def pg_schema(pg_conninfo):
+    """A database with migrations and sql/*.sql applied; tables are emptied before each test."""
+    psycopg = pytest.importorskip("psycopg")
+    from migrate import Migrator
+    with scratch_database(pg_conninfo, "stayngo_repository_test") as conninfo:
+        migrator = Migrator(conninfo)
+        try:
+            if migrator.conn.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gist'").fetchone():
+                migrator.up()
+            else:
+                # 0003 only adds the exclusion constraint; book_room's row lock still serializes bookings
+                migrator.up(to="0002")
+                for repeatable in migrator.repeatables:
+                    migrator.conn.execute(repeatable["sql"], prepare=False)
+        finally:
+            migrator.close()
+        with psycopg.connect(conninfo, autocommit=True) as conn:
+            tables = [row[0] for row in conn.execute(
+                "SELECT quote_ident(tablename) FROM pg_tables "
+                "WHERE schemaname = 'public' AND tablename <> 'SCHEMA_MIGRATIONS'")]
+        yield conninfo, f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def repo(request, tmp_path):
+    if request.param == "sqlite":
+        yield SQLiteRepository(str(tmp_path / "repo.sqlite3"))
+        return
+    from pg_repository import PostgresRepository
+    conninfo, truncate = request.getfixturevalue("pg_schema")
+    repo = PostgresRepository(conninfo, max_size=2)
+    repo._write(truncate)
+    yield repo
+    repo.close()
+
+
+@pytest.fixture
+def world(repo):
+    """Owner with a property of three rooms (the last one turned off) and a guest."""
+    owner = repo.create_user({"name": "Owner", "email": "owner@example.com", "role": "owner"})[0]
+    guest = repo.create_user({"name": "Guest", "email": "guest@example.com", "role": "guest"})[0]
+    prop = repo.insert_property({"owner_id": owner["user_id"], "address": "1 Main Road", "city": "Pune",
+                                 "state": "MH", "country": "India", "description": "Test"})[0]
+    rooms = repo.insert_rows("ROOMS", [
+        {"property_id": prop["property_id"], "room_type": "Double", "capacity": 2, "price_per_night": 1000,
+         "availability_status": available}
+        for available in (True, True, False)
+    ])
+    repo.insert_rows("AMENITIES", [{"property_id": prop["property_id"], "name": "WiFi", "description": "Fast"}])
+    return {"owner": owner["user_id"], "guest": guest["user_id"], "property": prop["property_id"],
+            "rooms": [room["room_id"] for room in rooms]}
+
+
+def test_search_catalog_lists_live_properties_and_their_rooms(repo, world):
+    properties, rooms, ratings = repo.search_catalog()
+    assert [p["property_id"] for p in properties] == [world["property"]]
+    assert [r["room_id"] for r in rooms] == world["rooms"]
+    assert ratings == []
+
+    repo.delete_property(world["property"], world["owner"])
+    assert repo.search_catalog()[0] == []
+
+
+def test_book_room_prices_the_stay(repo, world):
+    booking = repo.book_room(world["guest"], world["rooms"][0], "2030-01-01", "2030-01-04", "card")
+    assert booking["total_price"] == 3000
+    assert booking["property_id"] == world["property"]
+    assert repo.user_booking(booking["booking_id"], world["guest"])["room_id"] == world["rooms"][0]
+
+
+@pytest.mark.parametrize("check_in, check_out", [
+    ("2030-01-01", "2030-01-05"),  # same stay
+    ("2029-12-30", "2030-01-02"),  # overlaps the start
+    ("2030-01-04", "2030-01-08"),  # overlaps the end
+    ("2030-01-02", "2030-01-03"),  # inside
+])
+def test_book_room_rejects_overlaps(repo, world, check_in, check_out):
+    room_id = world["rooms"][0]
+    repo.book_room(world["guest"], room_id, "2030-01-01", "2030-01-05", "card")
+    with pytest.raises(RepositoryError) as excinfo:
+        repo.book_room(world["guest"], room_id, check_in, check_out, "card")
+    assert excinfo.value.code == "23P01"
+
+
+def test_book_room_allows_back_to_back_stays(repo, world):
+    room_id = world["rooms"][0]
+    repo.book_room(world["guest"], room_id, "2030-01-01", "2030-01-05", "card")
+    repo.book_room(world["guest"], room_id, "2030-01-05", "2030-01-07", "card")
+    repo.book_room(world["guest"], world["rooms"][1], "2030-01-01", "2030-01-05", "card")
+
+
+@pytest.mark.parametrize("check_in, check_out, message", [
+    ("2030-01-05", "2030-01-05", "Invalid date range."),
+    ("2030-01-05", "2030-01-01", "Invalid date range."),
+])
+def test_book_room_rejects_empty_stays(repo, world, check_in, check_out, message):
+    with pytest.raises(RepositoryError, match=message):
+        repo.book_room(world["guest"], world["rooms"][0], check_in, check_out, "card")
+
+
+def test_book_room_rejects_turned_off_and_archived_rooms(repo, world):
+    with pytest.raises(RepositoryError, match="turned off"):
+        repo.book_room(world["guest"], world["rooms"][2], "2030-01-01", "2030-01-02", "card")
+    repo.delete_property(world["property"], world["owner"])
+    with pytest.raises(RepositoryError, match="no longer available"):
+        repo.book_room(world["guest"], world["rooms"][0], "2030-01-01", "2030-01-02", "card")
+
+
+def _pages(repo, user_id, scope, today, limit):
+    """Follows the keyset cursor the way Guest.viewBookings does."""
+    pages, after = [], None
+    while True:
+        rows = repo.user_bookings(user_id, scope, today, after, limit + 1)
+        pages.append([row["booking_id"] for row in rows[:limit]])
+        if len(rows) <= limit:
+            return pages
+        after = {"d": rows[limit - 1]["check_in_date"], "id": rows[limit - 1]["booking_id"]}
+
+
+def test_user_bookings_keyset_pages(repo, world):
+    # Two rooms booked on the same dates, so check_in_date ties are broken by booking_id
+    stays = [(f"2030-01-{day:02d}", f"2030-01-{day + 1:02d}") for day in range(1, 8)]
+    ids = [repo.book_room(world["guest"], room_id, *stay, "card")["booking_id"]
+           for stay in stays for room_id in world["rooms"][:2]]
+    newest_first = [b for _, b in sorted(zip([s for s in stays for _ in (0, 1)], ids), reverse=True)]
+
+    assert _pages(repo, world["guest"], "all", "2030-01-01", 3) == [
+        newest_first[i:i + 3] for i in range(0, len(ids), 3)
+    ]
+    # upcoming: check_out_date after today, soonest first
+    upcoming = _pages(repo, world["guest"], "upcoming", "2030-01-05", 4)
+    assert sum(upcoming, []) == ids[8:]
+    # past: checked out by today, newest first
+    assert sum(_pages(repo, world["guest"], "past", "2030-01-05", 4), []) == newest_first[6:]
+    assert repo.user_bookings(world["owner"], "all", "2030-01-01", None, 10) == []
+
+
+def test_user_bookings_reports_payment_state(repo, world):
+    queued = repo.book_room(world["guest"], world["rooms"][0], "2030-01-01", "2030-01-02", "card",
+                            record_payment=False)
+    paid = repo.book_room(world["guest"], world["rooms"][1], "2030-01-01", "2030-01-02", "card")
+    rows = {row["booking_id"]: row for row in repo.user_bookings(world["guest"], "all", "2030-01-01", None, 10)}
+    assert rows[queued["booking_id"]]["payment_status"] == "processing"
+    assert rows[paid["booking_id"]]["payment_status"] == "completed"
+
+
+def test_cancelled_booking_drops_its_payment(repo, world):
+    booking = repo.book_room(world["guest"], world["rooms"][0], "2030-01-01", "2030-01-02", "card",
+                             record_payment=False)
+    repo.delete_booking(booking["booking_id"])
+    assert repo.user_booking(booking["booking_id"], world["guest"]) is None
+    row = {"booking_id": booking["booking_id"], "payment_method": "card", "amount": 1000,
+           "payment_status": "completed", "payment_date": "2030-01-01"}
+    assert repo.record_payment(row) is False
+
+
+def test_delete_property_archives_then_purges(repo, world):
+    booking = repo.book_room(world["guest"], world["rooms"][0], "2030-01-01", "2030-01-02", "card")
+    assert repo.delete_property(world["property"], world["guest"]) is None  # not the owner
+
+    archived = repo.delete_property(world["property"], world["owner"])
+    assert archived["room_ids"] == world["rooms"]
+    assert repo.owner_properties(world["owner"]) == []
+    assert repo.property_details(world["property"], 5) is None
+
+    purged = repo.delete_property(world["property"], world["owner"], purge=True)
+    assert purged["room_ids"] == world["rooms"]
+    assert (purged["bookings"], purged["payments"], purged["amenities"]) == (1, 1, 1)
+    assert repo.owner_property(world["property"], world["owner"]) is None
+    assert repo.user_booking(booking["booking_id"], world["guest"]) is None
+    assert repo.delete_property(world["property"], world["owner"], purge=True) is None
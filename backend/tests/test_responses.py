@@ -0,0 +1,234 @@
+# test_responses.py
+"""
+Response compression, conditional GET and the JSON provider (responses.py), through the
+Flask test client of a small app wired the way app.py wires them.
+"""
+import dataclasses
+import gzip
+import importlib.util
+import io
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from flask import Flask, Response, g, jsonify, request, send_file
+
+from cache import LocalCache
+from responses import (Compression, ConditionalGet, FastJSONProvider, RawJSON, VersionStamps, json_passthrough,
+                       skip_etag)
+
+ROWS = [{"room_id": i, "room_type": "Double", "price_per_night": 2000} for i in range(50)]
+
+
+def build_app(encoder="auto"):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app, encoder)
+    stamps = VersionStamps(LocalCache(ttl_seconds=60))
+    http_cache = ConditionalGet(identity=lambda: g.get("user"))
+    compression = Compression(min_bytes=256)
+    compression.init_app(app)
+    calls = []
+
+    @app.before_request
+    def who():
+        g.user = request.headers.get("X-User")
+
+    @app.route("/rooms")
+    @http_cache.conditional(lambda: stamps.get("rooms"))
+    def rooms():
+        calls.append("rooms")
+        return jsonify({"rooms": ROWS})
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/fallback")
+    @http_cache.conditional(lambda: stamps.get("rooms"))
+    def fallback():
+        skip_etag()
+        return jsonify({"rooms": ROWS})
+
+    @app.route("/precompressed")
+    def precompressed():
+        body = gzip.compress(json.dumps({"rooms": ROWS}).encode())
+        return Response(body, mimetype="application/json", headers={"Content-Encoding": "gzip"})
+
+    @app.route("/media")
+    def media():
+        return send_file(io.BytesIO(json.dumps({"rooms": ROWS}).encode()), mimetype="application/json")
+
+    @app.route("/image")
+    def image():
+        return Response(b"\x89PNG" + b"\0" * 4096, mimetype="image/png")
+
+    app.stamps, app.compression, app.calls = stamps, compression, calls
+    return app
+
+
+@pytest.fixture
+def app():
+    return build_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# ------------------------------
+# Compression
+# ------------------------------
+def test_gzip_when_accepted(client):
+    response = client.get("/rooms", headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data)) == {"rooms": ROWS}
+
+
+@pytest.mark.parametrize("accept", [None, "identity", "gzip;q=0", "deflate"])
+def test_identity_when_gzip_is_not_accepted(client, accept):
+    response = client.get("/rooms", headers={"Accept-Encoding": accept} if accept else {})
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.get_json() == {"rooms": ROWS}
+
+
+def test_brotli_preferred_when_installed(client):
+    brotli = pytest.importorskip("brotli")
+    response = client.get("/rooms", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert json.loads(brotli.decompress(response.data)) == {"rooms": ROWS}
+
+
+def test_br_only_client_gets_identity_without_brotli(app, client):
+    app.compression.encodings = ("gzip",)  # what Compression picks when brotli is not installed
+    response = client.get("/rooms", headers={"Accept-Encoding": "br"})
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json() == {"rooms": ROWS}
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert "Vary" not in response.headers
+    assert response.get_json() == {"ok": True}
+
+
+def test_already_encoded_bodies_pass_through(client):
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data)) == {"rooms": ROWS}  # compressed once, not twice
+
+
+@pytest.mark.parametrize("path", ["/media", "/image"])
+def test_files_and_binary_types_pass_through(client, path):
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert len(response.data) > 256
+
+
+# ------------------------------
+# Conditional GET
+# ------------------------------
+def test_matching_etag_is_a_304_without_running_the_view(app, client):
+    first = client.get("/rooms")
+    tag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    second = client.get("/rooms", headers={"If-None-Match": tag})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == tag
+    assert "Content-Encoding" not in second.headers
+    assert app.calls == ["rooms"]
+
+
+def test_compressed_etag_revalidates_in_either_encoding(client):
+    gzipped = client.get("/rooms", headers={"Accept-Encoding": "gzip"})
+    tag = gzipped.headers["ETag"].strip('"')
+    assert tag.endswith("-gzip")
+    plain_tag = client.get("/rooms").headers["ETag"].strip('"')
+    assert plain_tag == tag[:-len("-gzip")]
+
+    assert client.get("/rooms", headers={"If-None-Match": f'"{tag}"'}).status_code == 304
+    assert client.get("/rooms", headers={"If-None-Match": f'"{plain_tag}"', "Accept-Encoding": "gzip"}).status_code == 304
+
+
+def test_bump_invalidates_the_etag(app, client):
+    tag = client.get("/rooms").headers["ETag"]
+    app.stamps.bump("rooms")
+    response = client.get("/rooms", headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
+
+
+def test_etag_depends_on_caller_and_query(client):
+    tag = client.get("/rooms", headers={"X-User": "1"}).headers["ETag"]
+    assert client.get("/rooms", headers={"X-User": "2", "If-None-Match": tag}).status_code == 200
+    assert client.get("/rooms?page=2", headers={"X-User": "1", "If-None-Match": tag}).status_code == 200
+    assert client.get("/rooms", headers={"X-User": "1", "If-None-Match": f'"other", {tag}'}).status_code == 304
+
+
+def test_degraded_fallback_gets_no_etag(client):
+    response = client.get("/fallback")
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+# ------------------------------
+# JSON provider
+# ------------------------------
+@dataclasses.dataclass
+class Room:
+    room_id: int
+    room_type: str
+
+
+PAYLOAD = {
+    "zeta": 1, "alpha": "Pune – Café", "when": datetime(2030, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    "price": Decimal("2000.50"), "room": Room(1, "Double"), "by_id": {2: "b", 1: "a"}, "none": None,
+}
+
+
+def test_orjson_body_matches_the_stdlib_body():
+    pytest.importorskip("orjson")
+    fast, plain = build_app("orjson"), build_app("stdlib")
+    assert fast.json.encoder == "orjson" and plain.json.encoder == "stdlib"
+    with fast.test_request_context():
+        fast_body = fast.json.response(PAYLOAD).get_data()
+    with plain.test_request_context():
+        plain_body = plain.json.response(PAYLOAD).get_data()
+    assert json.loads(fast_body) == json.loads(plain_body)
+    assert json.loads(fast_body)["when"] == "Wed, 02 Jan 2030 03:04:05 GMT"
+    assert json.loads(fast_body)["room"] == {"room_id": 1, "room_type": "Double"}
+    assert fast_body.index(b'"alpha"') < fast_body.index(b'"zeta"')  # keys stay sorted
+    assert "Café".encode() in fast_body  # UTF-8, not \\u escapes
+
+
+def test_orjson_provider_parses_request_bodies():
+    pytest.importorskip("orjson")
+    app = build_app("orjson")
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return jsonify(request.get_json())
+
+    response = app.test_client().post("/echo", json={"rating": 5, "comment": "Très bien"})
+    assert response.get_json() == {"comment": "Très bien", "rating": 5}
+
+
+def test_json_passthrough_splices_raw_json():
+    app = build_app()
+    with app.test_request_context():
+        body = json_passthrough(rooms=RawJSON('[{"room_id":1}]'), count=1).get_data()
+    assert json.loads(body) == {"count": 1, "rooms": [{"room_id": 1}]}
+
+
+def test_unknown_or_missing_encoder_is_refused():
+    with pytest.raises(RuntimeError, match="Unknown JSON_ENCODER"):
+        build_app("simdjson")
+    if importlib.util.find_spec("msgspec") is None:
+        with pytest.raises(RuntimeError, match="not installed"):
+            build_app("msgspec")
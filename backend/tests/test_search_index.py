@@ -0,0 +1,58 @@
+# test_search_index.py
+"""PropertySearchIndex: filtered paging order and writes made during a background reload."""
+import threading
+
+from search_index import PropertySearchIndex
+
+CITIES = ("Pune", "Goa", "Delhi")
+
+
+def catalog(n=600):
+    properties = [{"property_id": pid, "address": f"{pid} {'Lake' if pid % 4 else 'Hill'} Road",
+                   "city": CITIES[pid % 3], "state": "MH", "country": "India"} for pid in range(n, 0, -1)]
+    rooms = [{"room_id": pid, "property_id": pid, "price_per_night": 1000 + pid, "capacity": 2} for pid in range(1, n + 1)]
+    return properties, rooms
+
+
+def pages(index, **query):
+    ids, cursor = [], None
+    while True:
+        rows, cursor = index.search(cursor=cursor, limit=25, **query)
+        ids += [row["property_id"] for row in rows]
+        if not cursor:
+            return ids
+
+
+def test_filtered_pages_follow_property_id_order():
+    properties, rooms = catalog()
+    index = PropertySearchIndex(0)
+    index.load(properties, rooms)
+    expected = sorted(p["property_id"] for p in properties if p["city"] == "Goa" and "Lake" in p["address"])
+    assert pages(index, city="goa", q="lake") == expected
+    index.upsert_property({**properties[0], "city": "Goa", "address": "1 Lake Road"})
+    assert properties[0]["property_id"] in pages(index, city="Goa", q="lake")
+
+
+def test_writes_during_reload_are_kept():
+    properties, rooms = catalog()
+    index = PropertySearchIndex(0)
+    index.load(properties, rooms)
+    building = threading.Event()
+    proceed = threading.Event()
+
+    def slow_rooms():
+        building.set()
+        proceed.wait(5)
+        yield from rooms
+
+    reload = threading.Thread(target=index.load, args=(properties, slow_rooms()))
+    reload.start()
+    assert building.wait(5)
+    # Searches are not blocked by the rebuild, and writes made now survive the swap
+    assert index.search(city="Pune", limit=1)[0]
+    index.remove_property(3)
+    index.upsert_room({"room_id": 9999, "property_id": 6, "price_per_night": 10, "capacity": 8})
+    proceed.set()
+    reload.join(5)
+    assert 3 not in pages(index, city="Pune")
+    assert pages(index, guests=8) == [6]
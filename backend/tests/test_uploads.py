@@ -0,0 +1,188 @@
+# test_uploads.py
+"""
+Property image uploads (uploads.py and the upload routes in app.py): size and type rules,
+spool cleanup on rejection, and the 'image_variants' job a stored image queues.
+"""
+import io
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from uploads import UploadRejected, UploadSpool, check_declared, spool_stream
+
+MB = 1024 * 1024
+
+
+def png_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 120, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def spooled(flask_app):
+    return sorted(os.listdir(flask_app.upload_spool.root))
+
+
+@pytest.fixture
+def admin(client):
+    return client.token(1, role="admin")
+
+
+@pytest.fixture
+def small_limit(flask_app, monkeypatch):
+    """A 1 MB upload limit, so the size rules can be hit without 20 MB bodies."""
+    monkeypatch.setattr(flask_app, "MAX_UPLOAD_BYTES", MB)
+    monkeypatch.setattr(flask_app.upload_spool, "max_bytes", MB)
+    monkeypatch.setitem(flask_app.app.config, "MAX_CONTENT_LENGTH", MB + 64 * 1024)
+
+
+def job_for(flask_app, stem):
+    row = flask_app.job_queue._connect().execute(
+        "SELECT * FROM jobs WHERE idempotency_key = ?", (f"variants:{stem}",)).fetchone()
+    return dict(row, payload=json.loads(row["payload"])) if row else None
+
+
+# ------------------------------
+# uploads.py
+# ------------------------------
+@pytest.mark.parametrize("filename", ["plan.pdf", "photo", "photo.png.exe", None])
+def test_check_declared_rejects_other_types(filename):
+    with pytest.raises(UploadRejected) as err:
+        check_declared(filename, 10, MB)
+    assert err.value.status == 400
+
+
+def test_check_declared_rejects_declared_size():
+    assert check_declared("Photo.JPG", MB, MB) == ".jpg"
+    with pytest.raises(UploadRejected) as err:
+        check_declared("photo.jpg", MB + 1, MB)
+    assert err.value.status == 413
+
+
+def test_spool_stream_checks_magic_bytes_and_size():
+    with pytest.raises(UploadRejected, match="not a supported image"):
+        spool_stream(io.BytesIO(b"%PDF-1.7" + b"\0" * 100), io.BytesIO(), MB)
+    with pytest.raises(UploadRejected) as err:
+        spool_stream(io.BytesIO(png_bytes() + b"\0" * MB), io.BytesIO(), MB)
+    assert err.value.status == 413
+    target = io.BytesIO()
+    assert spool_stream(io.BytesIO(png_bytes()), target, MB) == len(target.getvalue())
+
+
+def test_spool_session_is_private_and_checked_on_take(tmp_path):
+    spool = UploadSpool(str(tmp_path), MB)
+    upload_id = spool.create(1, "photo.png", 12, "image/png")
+    with pytest.raises(UploadRejected) as err:
+        spool.status(upload_id, 2)
+    assert err.value.status == 404
+    with pytest.raises(UploadRejected) as err:
+        spool.append(upload_id, 1, 5, io.BytesIO(b"x"))
+    assert err.value.status == 409
+
+    spool.append(upload_id, 1, 0, io.BytesIO(b"not an image"))
+    with pytest.raises(UploadRejected, match="not a supported image"):
+        spool.take(upload_id)
+    assert os.listdir(tmp_path) == []
+
+
+# ------------------------------
+# /api/upload_property_image
+# ------------------------------
+def test_upload_stores_the_original_and_queues_variants(flask_app, client, admin):
+    body = png_bytes((900, 600))
+    response = client.post("/api/upload_property_image", headers=admin,
+                           data={"image": (io.BytesIO(body), "front.png")})
+    assert response.status_code == 200, response.get_json()
+    result = response.get_json()
+    file_name = result["image_url"].rsplit("/", 1)[1]
+    stem = os.path.splitext(file_name)[0]
+    assert result["variants"] == {name: f"/api/media/variants/{stem}_{name}.webp" for name in ("thumbnail", "card", "full")}
+    assert client.get(result["image_url"]).data == body
+
+    job = job_for(flask_app, stem)
+    assert (job["kind"], job["status"], job["payload"]["stem"]) == ("image_variants", "queued", stem)
+    assert os.path.exists(job["payload"]["local_path"])  # kept in the spool for the worker
+
+    flask_app.image_variants_job(job["payload"])
+    assert not os.path.exists(job["payload"]["local_path"])
+    with Image.open(io.BytesIO(client.get(result["variants"]["thumbnail"]).data)) as thumbnail:
+        assert (thumbnail.format, max(thumbnail.size)) == ("WEBP", 320)
+
+
+def test_upload_needs_an_admin(client):
+    response = client.post("/api/upload_property_image", headers=client.token(2),
+                           data={"image": (io.BytesIO(png_bytes()), "front.png")})
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("filename, body", [
+    ("plan.pdf", b"%PDF-1.7"),
+    ("front.png", b"%PDF-1.7" + b"\0" * 100),  # allowed name, wrong content
+    ("front.png", b""),
+])
+def test_upload_rejects_other_types(flask_app, client, admin, filename, body):
+    before = spooled(flask_app)
+    response = client.post("/api/upload_property_image", headers=admin,
+                           data={"image": (io.BytesIO(body), filename)})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    assert spooled(flask_app) == before
+
+
+def test_upload_rejects_a_large_declared_length(flask_app, client, admin, small_limit):
+    response = client.post("/api/upload_property_image", headers=admin,
+                           data={"image": (io.BytesIO(png_bytes() + b"\0" * 2 * MB), "front.png")})
+    assert response.status_code == 413
+    assert response.get_json()["message"] == "Image is larger than 1 MB."
+
+
+def test_upload_rejects_a_large_file_inside_the_framing_allowance(flask_app, client, admin, small_limit):
+    before = spooled(flask_app)
+    response = client.post("/api/upload_property_image", headers=admin,
+                           data={"image": (io.BytesIO(png_bytes() + b"\0" * MB), "front.png")})
+    assert response.status_code == 413
+    assert spooled(flask_app) == before
+
+
+# ------------------------------
+# /api/uploads (resumable)
+# ------------------------------
+def test_resumable_upload_queues_variants_when_complete(flask_app, client, admin):
+    body = png_bytes()
+    created = client.post("/api/uploads", headers=admin, json={"filename": "front.png", "size": len(body)})
+    assert created.status_code == 201
+    upload_id = created.get_json()["upload_id"]
+
+    half = len(body) // 2
+    response = client.patch(f"/api/uploads/{upload_id}", headers={**admin, "Upload-Offset": "0"}, data=body[:half])
+    assert response.get_json()["offset"] == half
+    assert client.get(f"/api/uploads/{upload_id}", headers=admin).get_json()["offset"] == half
+
+    response = client.patch(f"/api/uploads/{upload_id}", headers={**admin, "Upload-Offset": str(half)}, data=body[half:])
+    assert response.status_code == 200, response.get_json()
+    stem = os.path.splitext(response.get_json()["image_url"].rsplit("/", 1)[1])[0]
+    assert job_for(flask_app, stem)["kind"] == "image_variants"
+
+
+@pytest.mark.parametrize("declared, status", [
+    ({"filename": "plan.pdf", "size": 100}, 400),
+    ({"filename": "front.png", "size": 0}, 400),
+    ({"filename": "front.png", "size": 2 * MB}, 413),
+])
+def test_resumable_upload_checks_declared_metadata(client, admin, small_limit, declared, status):
+    assert client.post("/api/uploads", headers=admin, json=declared).status_code == status
+
+
+def test_resumable_upload_rejects_overflow_and_content(flask_app, client, admin):
+    created = client.post("/api/uploads", headers=admin, json={"filename": "front.png", "size": 16})
+    upload_id = created.get_json()["upload_id"]
+    response = client.patch(f"/api/uploads/{upload_id}", headers={**admin, "Upload-Offset": "0"}, data=b"\0" * 17)
+    assert response.status_code == 413
+
+    before = spooled(flask_app)
+    response = client.patch(f"/api/uploads/{upload_id}", headers={**admin, "Upload-Offset": "0"}, data=b"\0" * 16)
+    assert response.status_code == 400
+    assert len(spooled(flask_app)) == len(before) - 2  # .part and .json discarded
+    assert client.get(f"/api/uploads/{upload_id}", headers=admin).status_code == 404
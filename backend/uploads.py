@@ -0,0 +1,139 @@
+# uploads.py
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+from images import ALLOWED_EXTENSIONS, looks_like_image
+from storage import CHUNK_SIZE, iter_chunks
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadRejected(ValueError):
+    """The upload broke a size/type rule; the message is safe to show to the client."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def check_declared(filename, size, max_bytes):
+    """Validation that needs only the client's declared metadata (nothing has been read yet)."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise UploadRejected(f"Unsupported image type. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+    if size is not None and size > max_bytes:
+        raise UploadRejected(f"Image is larger than {max_bytes // (1024 * 1024)} MB.", 413)
+    return ext
+
+
+def spool_stream(stream, target, max_bytes, offset=0, sniff=True):
+    """
+    Copies `stream` into the open file `target` chunk by chunk and returns the bytes written.
+    Only CHUNK_SIZE bytes are held in memory; the magic bytes are checked on the first chunk.
+    """
+    written = 0
+    for chunk in iter_chunks(stream, CHUNK_SIZE):
+        if sniff and written == 0 and offset == 0 and not looks_like_image(chunk[:16]):
+            raise UploadRejected("File content is not a supported image.")
+        written += len(chunk)
+        if offset + written > max_bytes:
+            raise UploadRejected(f"Image is larger than {max_bytes // (1024 * 1024)} MB.", 413)
+        target.write(chunk)
+    if sniff and written == 0 and offset == 0:
+        raise UploadRejected("File content is not a supported image.")
+    return written
+
+
+class UploadSpool:
+    """
+    Resumable upload sessions spooled to local disk (<id>.part + <id>.json).
+
+    A client creates a session with the final size, then appends chunks at the
+    current offset; after a dropped connection it asks for the offset and continues
+    from there. Sessions live on the worker's disk, so replicas need sticky routing
+    (or a shared spool directory) for resumes to land on the same machine.
+    """
+
+    def __init__(self, root, max_bytes, ttl_seconds=24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, upload_id):
+        if not _UPLOAD_ID_RE.match(upload_id or ""):
+            raise UploadRejected("Unknown upload.", 404)
+        base = os.path.join(self.root, upload_id)
+        return base + ".part", base + ".json"
+
+    def create(self, owner_id, filename, size, content_type):
+        ext = check_declared(filename, size, self.max_bytes)
+        if not size or size <= 0:
+            raise UploadRejected("Upload size is required.")
+        upload_id = uuid.uuid4().hex
+        part_path, meta_path = self._paths(upload_id)
+        meta = {"owner_id": owner_id, "ext": ext, "size": size,
+                "content_type": content_type or "application/octet-stream", "created": time.time()}
+        open(part_path, "wb").close()
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+        return upload_id
+
+    def status(self, upload_id, owner_id):
+        part_path, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise UploadRejected("Unknown upload.", 404)
+        if meta["owner_id"] != owner_id:
+            raise UploadRejected("Unknown upload.", 404)
+        meta["offset"] = os.path.getsize(part_path)
+        return meta
+
+    def append(self, upload_id, owner_id, offset, stream):
+        """Appends the request body at `offset`; returns the session metadata with the new offset."""
+        meta = self.status(upload_id, owner_id)
+        if offset != meta["offset"]:
+            raise UploadRejected(f"Offset mismatch, expected {meta['offset']}.", 409)
+        part_path, _ = self._paths(upload_id)
+        with self._lock:
+            with open(part_path, "ab") as f:
+                written = spool_stream(stream, f, meta["size"], offset=offset, sniff=False)
+        meta["offset"] = offset + written
+        return meta
+
+    def take(self, upload_id):
+        """Hands the completed .part file over to the caller (who deletes it) and drops the session."""
+        part_path, meta_path = self._paths(upload_id)
+        with open(part_path, "rb") as f:
+            if not looks_like_image(f.read(16)):
+                self.discard(upload_id)
+                raise UploadRejected("File content is not a supported image.")
+        fd, taken = tempfile.mkstemp(dir=self.root, suffix=".img")
+        os.close(fd)
+        os.replace(part_path, taken)
+        os.unlink(meta_path)
+        return taken
+
+    def discard(self, upload_id):
+        for path in self._paths(upload_id):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def sweep(self):
+        """Removes sessions that were abandoned for longer than ttl_seconds."""
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.getmtime(path) < cutoff:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
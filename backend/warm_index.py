@@ -0,0 +1,72 @@
+# warm_index.py
+import itertools
+import logging
+import threading
+import time
+import uuid
+
+log = logging.getLogger(__name__)
+
+# Index versions are unique per process, so a version from another worker never matches
+_PROCESS = uuid.uuid4().hex[:8]
+_changes = itertools.count(1)
+
+
+class WarmIndex:
+    """
+    Base for in-process indexes that are warmed from Supabase on first use.
+
+    Subclasses implement load(...) and must set self._loaded_at when done. Every
+    worker holds its own copy, so the index is rebuilt in the background once it
+    is older than refresh_seconds to pick up writes made by other workers/replicas.
+
+    expire() asks for that refresh early, when the index is known to be stale.
+
+    `version` changes on every load and incremental update (subclasses call
+    _changed()); responses built from the index use it as their ETag stamp.
+    """
+
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._refreshing = False
+        self._expired = False
+        self._loaded_at = None
+        self.version = None
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def ensure_loaded(self, loader):
+        """`loader()` returns the tuple of positional arguments for load()."""
+        if self._loaded_at is None:
+            with self._lock:
+                if self._loaded_at is None:
+                    self.load(*loader())
+            return
+        if self._expired or (self.refresh_seconds and time.monotonic() - self._loaded_at > self.refresh_seconds):
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            threading.Thread(target=self._refresh, args=(loader,), daemon=True).start()
+
+    def expire(self):
+        """Known to be stale: the next ensure_loaded() starts a background refresh."""
+        self._expired = True
+
+    def _refresh(self, loader):
+        self._expired = False
+        try:
+            self.load(*loader())
+        except Exception as err:
+            log.warning("%s refresh failed: %s", type(self).__name__, err)
+        finally:
+            self._refreshing = False
+
+    def load(self, *data):
+        raise NotImplementedError
+
+    def _changed(self):
+        self.version = f"{_PROCESS}.{next(_changes)}"
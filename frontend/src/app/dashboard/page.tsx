@@ -9,7 +9,7 @@ import {
 } from "lucide-react";
 import Link from "next/link";
 import Navbar from "@/components/Navbar";
-import { getDashboard, deleteProperty } from "@/lib/api";
+import { getDashboardSummary, deleteProperty } from "@/lib/api";
 
 interface Property {
   property_id: number;
@@ -19,19 +19,36 @@ interface Property {
   country: string;
   description: string;
   image_url: string;
+  room_count: number;
+  occupied_today: number;
+  occupancy_rate: number;
+  revenue_mtd: number;
+  upcoming_check_ins: number;
+  average_rating: number;
+  review_count: number;
+}
+
+interface Totals {
+  room_count: number;
+  occupied_today: number;
+  occupancy_rate: number;
+  revenue_mtd: number;
+  upcoming_check_ins: number;
 }
 
 export default function AdminDashboard() {
   const [properties, setProperties] = useState<Property[]>([]);
+  const [totals, setTotals] = useState<Totals | null>(null);
   const [name, setName] = useState("");
   const [loading, setLoading] = useState(true);
   const router = useRouter();
 
   const fetchData = () => {
     setLoading(true);
-    getDashboard()
+    getDashboardSummary()
       .then((res) => {
         setProperties(res.data.properties);
+        setTotals(res.data.totals);
         setName(res.data.name);
       })
       .catch(() => router.push("/"))
@@ -65,6 +82,11 @@ export default function AdminDashboard() {
               </div>
               <h1 className="section-title">Welcome back, {name} 👋</h1>
               <p className="section-sub">{properties.length} {properties.length === 1 ? "property" : "properties"} listed</p>
+              {totals && (
+                <p style={{ color: "var(--text-secondary)", fontSize: "0.85rem", marginTop: 6 }}>
+                  {totals.occupied_today}/{totals.room_count} rooms occupied tonight · {totals.upcoming_check_ins} check-ins this week · ₹{Number(totals.revenue_mtd).toLocaleString()} this month
+                </p>
+              )}
             </div>
             <Link href="/admin/add-property" className="btn-primary">
               <Plus size={16} />
@@ -115,6 +137,9 @@ export default function AdminDashboard() {
                         {p.description}
                       </p>
                     )}
+                    <p style={{ color: "var(--text-secondary)", fontSize: "0.8rem", marginTop: 6 }}>
+                      {p.room_count} rooms · {Math.round(p.occupancy_rate * 100)}% occupied · {p.upcoming_check_ins} upcoming check-ins · ₹{Number(p.revenue_mtd).toLocaleString()} MTD · {p.review_count ? `★ ${Number(p.average_rating).toFixed(1)}` : "No reviews"}
+                    </p>
                   </div>
 
                   {/* Actions */}
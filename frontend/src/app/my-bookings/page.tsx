@@ -22,16 +22,28 @@ export default function MyBookings() {
   const [bookings, setBookings] = useState<Booking[]>([]);
   const [loading, setLoading] = useState(true);
   const [cancelling, setCancelling] = useState<number | null>(null);
+  const [scope, setScope] = useState<"all" | "upcoming" | "past">("all");
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const router = useRouter();
 
   const fetchBookings = () => {
-    getMyBookings()
-      .then((res) => setBookings(res.data.bookings))
+    getMyBookings(scope)
+      .then((res) => { setBookings(res.data.bookings); setNextCursor(res.data.next_cursor); })
       .catch(() => { toast.error("Unauthorized"); router.push("/"); })
       .finally(() => setLoading(false));
   };
 
-  useEffect(() => { fetchBookings(); }, []);
+  const loadMore = () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    getMyBookings(scope, nextCursor)
+      .then((res) => { setBookings((prev) => [...prev, ...res.data.bookings]); setNextCursor(res.data.next_cursor); })
+      .catch(() => toast.error("Failed to load more bookings"))
+      .finally(() => setLoadingMore(false));
+  };
+
+  useEffect(() => { setLoading(true); fetchBookings(); }, [scope]);
 
   const handleCancel = async (id: number) => {
     if (!confirm("Cancel this booking?")) return;
@@ -59,7 +71,14 @@ export default function MyBookings() {
               <p style={{ color: "var(--text-secondary)", fontSize: "0.85rem" }}>Booking History</p>
             </div>
             <h1 className="section-title">My Bookings</h1>
-            <p className="section-sub">{bookings.length} total booking{bookings.length !== 1 ? "s" : ""}</p>
+            <p className="section-sub">{bookings.length}{nextCursor ? "+" : ""} booking{bookings.length !== 1 ? "s" : ""}</p>
+            <div style={{ display: "flex", gap: 8, marginTop: 16 }}>
+              {(["all", "upcoming", "past"] as const).map((s) => (
+                <button key={s} className={scope === s ? "btn-primary" : "btn-secondary"} onClick={() => setScope(s)}>
+                  {s.charAt(0).toUpperCase() + s.slice(1)}
+                </button>
+              ))}
+            </div>
           </div>
 
           {loading ? (
@@ -110,6 +129,12 @@ export default function MyBookings() {
                   </button>
                 </motion.div>
               ))}
+              {nextCursor && (
+                <button className="btn-secondary" onClick={loadMore} disabled={loadingMore} style={{ justifySelf: "center" }}>
+                  {loadingMore ? <Loader2 size={13} /> : null}
+                  Load more
+                </button>
+              )}
             </div>
           )}
         </div>
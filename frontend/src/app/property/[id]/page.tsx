@@ -22,6 +22,7 @@ interface Room {
 
 interface Amenity { amenity_id: number; name: string; description: string; }
 interface Review { user_name: string; rating: number; comment: string; created_at: string; }
+interface RoomRating { count: number; average: number; histogram: Record<string, number>; }
 
 interface Property {
   property_id: number;
@@ -40,6 +41,7 @@ export default function PropertyDetails() {
   const [amenities, setAmenities] = useState<Amenity[]>([]);
   const [rooms, setRooms] = useState<Room[]>([]);
   const [reviews, setReviews] = useState<Record<string, Review[]>>({});
+  const [ratings, setRatings] = useState<Record<string, RoomRating>>({});
   const [loading, setLoading] = useState(true);
   const [reviewState, setReviewState] = useState<Record<number, { rating: number; comment: string }>>({});
   const [submitting, setSubmitting] = useState<number | null>(null);
@@ -51,6 +53,7 @@ export default function PropertyDetails() {
         setAmenities(res.data.amenities);
         setRooms(res.data.rooms);
         setReviews(res.data.room_reviews);
+        setRatings(res.data.room_ratings ?? {});
       })
       .catch(() => { toast.error("Unauthorized"); router.push("/"); })
       .finally(() => setLoading(false));
@@ -131,7 +134,12 @@ export default function PropertyDetails() {
               ) : (
                 rooms.map((room, i) => {
                   const roomReviews = reviews[String(room.room_id)] ?? [];
-                  const avgRating = roomReviews.length
+                  // Reviews are a newest-first page; totals come from the server-side aggregates
+                  const roomRating = ratings[String(room.room_id)];
+                  const reviewCount = roomRating?.count ?? roomReviews.length;
+                  const avgRating = roomRating
+                    ? Number(roomRating.average).toFixed(1)
+                    : roomReviews.length
                     ? (roomReviews.reduce((a, r) => a + r.rating, 0) / roomReviews.length).toFixed(1)
                     : null;
                   const rv = reviewState[room.room_id] ?? { rating: 5, comment: "" };
@@ -159,7 +167,7 @@ export default function PropertyDetails() {
                             {avgRating && (
                               <span style={{ display: "flex", alignItems: "center", gap: 4, fontSize: "0.8rem" }}>
                                 <Star size={12} color="#fbbf24" fill="#fbbf24" />
-                                <span style={{ color: "var(--text-secondary)" }}>{avgRating} ({roomReviews.length})</span>
+                                <span style={{ color: "var(--text-secondary)" }}>{avgRating} ({reviewCount})</span>
                               </span>
                             )}
                           </div>
@@ -190,7 +198,7 @@ export default function PropertyDetails() {
                       {roomReviews.length > 0 && (
                         <div style={{ borderTop: "1px solid var(--border)", paddingTop: 16, marginBottom: 16 }}>
                           <p style={{ fontWeight: 600, fontSize: "0.85rem", marginBottom: 10, color: "var(--text-secondary)" }}>
-                            Reviews ({roomReviews.length})
+                            Reviews ({reviewCount})
                           </p>
                           <div style={{ display: "flex", flexDirection: "column", gap: 10 }}>
                             {roomReviews.slice(0, 3).map((rev, ri) => (
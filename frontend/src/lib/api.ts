@@ -34,6 +34,8 @@ export const uploadPropertyImage = async (file: File): Promise<string> => {
 
 // ── Admin – Properties ────────────────────────────────────────────────────────
 export const getDashboard = () => api.get("/dashboard");
+export const getDashboardSummary = (upcomingDays = 7) =>
+  api.get("/dashboard_summary", { params: { upcoming_days: upcomingDays } });
 export const addProperty = (data: Record<string, string>) =>
   api.post("/add_property", data);
 export const getProperty = (id: number) => api.get(`/edit_property/${id}`);
@@ -73,9 +75,21 @@ export const updateRoom = (id: number, data: Record<string, string | boolean>) =
   api.put(`/edit_room/${id}`, data);
 export const getRoomStatus = (propertyId: number) =>
   api.get(`/room_status/${propertyId}`);
+// Rows (or a CSV / JSONL file) with an optional op: "create" | "update" | "delete"
+export const bulkRooms = (propertyId: number, rows: Record<string, unknown>[] | File) =>
+  api.post(`/bulk_rooms/${propertyId}`, rows instanceof File ? toFileForm(rows) : rows);
+export const bulkAmenities = (propertyId: number, rows: Record<string, unknown>[] | File) =>
+  api.post(`/bulk_amenities/${propertyId}`, rows instanceof File ? toFileForm(rows) : rows);
+
+const toFileForm = (file: File) => {
+  const form = new FormData();
+  form.append("file", file);
+  return form;
+};
 
 // ── Guest ─────────────────────────────────────────────────────────────────────
-export const getUserDashboard = () => api.get("/user_dashboard");
+export const getUserDashboard = (params?: Record<string, string | number>) =>
+  api.get("/user_dashboard", { params });
 export const getPropertyDetails = (id: number) =>
   api.get(`/view_more/${id}`);
 export const bookRoom = (
@@ -83,7 +97,17 @@ export const bookRoom = (
   propertyId: number,
   data: Record<string, string>
 ) => api.post(`/book_room/${roomId}/${propertyId}`, data);
-export const getMyBookings = () => api.get("/my_bookings");
+export const getRoomReviews = (roomId: number, cursor?: string, limit?: number) =>
+  api.get(`/room_reviews/${roomId}`, { params: { cursor, limit } });
+export const getFreeRooms = (propertyId: number, check_in: string, check_out: string) =>
+  api.get(`/free_rooms/${propertyId}`, { params: { check_in, check_out } });
+// Per-room nightly occupancy; start is YYYY-MM, months 1-12
+export const getAvailabilityCalendar = (
+  propertyId: number,
+  params?: { start?: string; months?: number; check_in?: string; check_out?: string; format?: "ranges" | "bitmap" }
+) => api.get(`/availability/${propertyId}`, { params });
+export const getMyBookings = (scope: "all" | "upcoming" | "past" = "all", cursor?: string, limit?: number) =>
+  api.get("/my_bookings", { params: { scope, cursor, limit } });
 export const cancelBooking = (id: number) =>
   api.post(`/cancel_booking/${id}`);
 export const addReview = (